@@ -0,0 +1,130 @@
+# app/caches/services_cache.py
+import asyncio
+import hashlib
+import logging
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from sqlalchemy.engine import Row
+from pydantic import TypeAdapter
+from app.database import engine
+from app.models.payments import UtilityService
+from app.schemas.payments import UtilityServiceResponseSchema
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Канал Postgres, через который воркеры сообщают друг другу об изменении справочника
+SERVICES_CHANNEL = 'utility_services_changed'
+SERVICES_CACHE_NOTIFY = os.getenv('SERVICES_CACHE_NOTIFY', '1') == '1'
+
+_services_adapter = TypeAdapter(List[UtilityServiceResponseSchema])
+
+class UtilityServicesCache:
+    """Кэш справочника услуг ЖКХ в памяти процесса.
+
+    Хранит строки таблицы (с Decimal-тарифами для расчетов) и готовые
+    JSON-ответы. Каждое изменение справочника увеличивает version;
+    загрузка, начатая до изменения, результат в кэш не кладет.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._rows: Optional[List[Row]] = None
+        self._payloads: Dict[bool, Tuple[bytes, str]] = {}
+        self._by_id: Optional[Tuple[List[Row], Dict[int, UtilityServiceResponseSchema]]] = None
+        self._lock = asyncio.Lock()
+
+    async def get_all(self, session: AsyncSession) -> List[Row]:
+        """Все услуги (активные первыми, по названию)"""
+        rows = self._rows
+        if rows is not None:
+            return rows
+        async with self._lock:
+            if self._rows is not None:
+                return self._rows
+            version = self.version
+            result = await session.execute(
+                select(
+                    UtilityService.id,
+                    UtilityService.name,
+                    UtilityService.description,
+                    UtilityService.unit,
+                    UtilityService.rate,
+                    UtilityService.is_active
+                )
+                .order_by(UtilityService.is_active.desc(), UtilityService.name)
+            )
+            rows = result.all()
+            if version == self.version:
+                self._rows = rows
+            return rows
+
+    async def get_active(self, session: AsyncSession) -> List[Row]:
+        """Только активные услуги"""
+        return [row for row in await self.get_all(session) if row.is_active]
+
+    async def schemas_by_id(self, session: AsyncSession) -> Dict[int, UtilityServiceResponseSchema]:
+        """Все услуги по id, уже проверенные схемой ответа - для списков платежей и показаний"""
+        rows = await self.get_all(session)
+        index = self._by_id
+        if index is None or index[0] is not rows:
+            index = self._by_id = (rows, {row.id: UtilityServiceResponseSchema.model_validate(row) for row in rows})
+        return index[1]
+
+    async def serialized(self, session: AsyncSession, active_only: bool = True) -> Tuple[bytes, str]:
+        """Готовый JSON-ответ и его ETag"""
+        payload = self._payloads.get(active_only)
+        if payload is not None:
+            return payload
+        version = self.version
+        rows = await self.get_active(session) if active_only else await self.get_all(session)
+        body = _services_adapter.dump_json(
+            [UtilityServiceResponseSchema.model_validate(row) for row in rows]
+        )
+        payload = (body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+        if version == self.version:
+            self._payloads[active_only] = payload
+        return payload
+
+    def invalidate(self) -> None:
+        """Сбросить кэш этого процесса (вызывать после коммита изменений)"""
+        self.version += 1
+        self._rows = None
+        self._payloads = {}
+        self._by_id = None
+
+    @staticmethod
+    async def notify(session: AsyncSession) -> None:
+        """Оповестить другие воркеры; уходит при коммите текущей транзакции"""
+        if SERVICES_CACHE_NOTIFY:
+            await session.execute(select(func.pg_notify(SERVICES_CHANNEL, '')))
+
+services_cache = UtilityServicesCache()
+
+async def listen_for_invalidation(retry_delay: float = 5.0) -> None:
+    """Слушать LISTEN-канал и сбрасывать кэш при изменениях в других воркерах"""
+    import asyncpg
+
+    dsn = engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(SERVICES_CHANNEL, lambda *args: services_cache.invalidate())
+            # Пока соединения не было, уведомления могли потеряться
+            services_cache.invalidate()
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda *args: closed.set())
+            await closed.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Ошибка подписки на изменения справочника услуг", exc_info=True)
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(retry_delay)
@@ -0,0 +1,107 @@
+# app/caches/user_cache.py
+import os
+import time
+from collections import OrderedDict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from app.models.users import Users
+from app.schemas.users import UserResponseSchema
+from app.metrics import Counter
+from typing import Optional, Set, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Сколько секунд профиль живет в кэше и сколько профилей хранить в процессе
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', '10000'))
+
+USER_CACHE_REQUESTS = Counter('app_user_cache_requests_total', 'Обращения к кэшу профилей', ('result',))
+
+# Ключ в session.info: пользователи, чей профиль сбросить после коммита
+PENDING_INVALIDATIONS = 'user_cache_invalidate'
+
+class UserProfileCache:
+    """Кэш готовых JSON-ответов /Authorization/me в памяти процесса.
+
+    Изменения баланса и профиля сбрасывают запись после коммита в этом
+    воркере; в остальных воркерах профиль обновится не позже чем через
+    USER_CACHE_TTL секунд. Загрузка, начатая до сброса профиля этого же
+    пользователя, результат в кэш не кладет; сбросы других пользователей
+    ей не мешают.
+    """
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version = 0  # Номер последнего сброса
+        self._entries: 'OrderedDict[int, Tuple[float, bytes]]' = OrderedDict()
+        # Номер последнего сброса по пользователям; вытесненные учитываются в _versions_floor
+        self._versions: 'OrderedDict[int, int]' = OrderedDict()
+        self._versions_floor = 0
+
+    def _invalidated_after(self, user_id: int, version: int) -> bool:
+        return max(self._versions.get(user_id, 0), self._versions_floor) > version
+
+    async def get_profile(self, session: AsyncSession, user_id: int) -> Optional[bytes]:
+        """JSON профиля пользователя или None, если пользователя нет"""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            USER_CACHE_REQUESTS.inc(result='hit')
+            return entry[1]
+
+        USER_CACHE_REQUESTS.inc(result='miss')
+        version = self.version
+        result = await session.execute(
+            select(
+                Users.id,
+                Users.email,
+                Users.full_name,
+                Users.role,
+                Users.address,
+                Users.phone,
+                Users.balance
+            )
+            .where(Users.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            self._entries.pop(user_id, None)
+            return None
+
+        body = UserResponseSchema.model_validate(row).model_dump_json().encode()
+        if not self._invalidated_after(user_id, version) and self.ttl > 0:
+            self._entries[user_id] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return body
+
+    def invalidate(self, user_id: int) -> None:
+        """Сбросить профиль пользователя (вызывать после коммита изменений)"""
+        self.version += 1
+        self._entries.pop(user_id, None)
+        self._versions[user_id] = self.version
+        self._versions.move_to_end(user_id)
+        while len(self._versions) > self.max_size:
+            _, evicted = self._versions.popitem(last=False)
+            self._versions_floor = max(self._versions_floor, evicted)
+
+    @staticmethod
+    def invalidate_on_commit(session: AsyncSession, user_id: int) -> None:
+        """Сбросить профиль после коммита текущей транзакции сессии (при откате - ничего)"""
+        session.info.setdefault(PENDING_INVALIDATIONS, set()).add(user_id)
+
+user_cache = UserProfileCache()
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session: Session) -> None:
+    pending: Set[int] = session.info.pop(PENDING_INVALIDATIONS, set())
+    for user_id in pending:
+        user_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(PENDING_INVALIDATIONS, None)
@@ -1,20 +1,104 @@
 # app/database.py
+import asyncio
+import logging
 import os
+import time
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import as_declarative, declared_attr
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
+from app.query_stats import instrument_engine
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-engine = create_async_engine(DATABASE_URL)
+# Настройки пула и соединений (по умолчанию - как у SQLAlchemy/asyncpg, кроме recycle и pre-ping)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # секунды, -1 - не пересоздавать
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') == '1'
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))  # 0 - для pgbouncer в режиме transaction
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))  # 0 - без ограничения
+DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.getenv('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', '0'))
+
+def _connect_args() -> dict:
+    server_settings = {}
+    if DB_STATEMENT_TIMEOUT_MS:
+        server_settings['statement_timeout'] = str(DB_STATEMENT_TIMEOUT_MS)
+    if DB_IDLE_IN_TRANSACTION_TIMEOUT_MS:
+        server_settings['idle_in_transaction_session_timeout'] = str(DB_IDLE_IN_TRANSACTION_TIMEOUT_MS)
+    connect_args = {'prepared_statement_cache_size': DB_STATEMENT_CACHE_SIZE}
+    if server_settings:
+        connect_args['server_settings'] = server_settings
+    return connect_args
+
+def _create_engine(url: str) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=_connect_args()
+    )
+    instrument_engine(new_engine)
+    return new_engine
+
+engine = _create_engine(DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
 
+# Реплика для read-only эндпоинтов; без DATABASE_READ_URL все идет в основную БД
+DATABASE_READ_URL = os.getenv('DATABASE_READ_URL')
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '5'))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '2'))
+
+read_engine = _create_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+ReadSessionLocal = async_sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+# Отставание реплики в секундах; 0, если весь полученный WAL уже применен
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+_replica_state = {'checked_at': float('-inf'), 'usable': False, 'lag': None}
+
+async def _replica_usable() -> bool:
+    """Можно ли читать с реплики (результат проверки кэшируется на DB_REPLICA_CHECK_INTERVAL)"""
+    if read_engine is engine:
+        return False
+    now = time.monotonic()
+    if now - _replica_state['checked_at'] < DB_REPLICA_CHECK_INTERVAL:
+        return _replica_state['usable']
+    # Остальные запросы пока пользуются прошлым результатом
+    _replica_state['checked_at'] = now
+    try:
+        async with read_engine.connect() as connection:
+            lag = (await connection.execute(REPLICA_LAG_SQL)).scalar()
+        _replica_state['lag'] = float(lag)
+        _replica_state['usable'] = float(lag) <= DB_REPLICA_MAX_LAG_SECONDS
+    except Exception as e:
+        logger.warning("Реплика недоступна, чтение идет с основной БД: %s", e)
+        _replica_state['lag'] = None
+        _replica_state['usable'] = False
+    return _replica_state['usable']
+
+async def get_read_sessionmaker() -> async_sessionmaker:
+    """Фабрика сессий для чтения: реплика или основная БД, если реплика отстает"""
+    return ReadSessionLocal if await _replica_usable() else AsyncSessionLocal
+
 @as_declarative()
 class AbstractModel:
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -24,6 +108,28 @@ class AbstractModel:
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
 
+def get_pool_stats() -> dict:
+    """Текущее состояние пула соединений"""
+    pool = engine.pool
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'max_overflow': DB_MAX_OVERFLOW,
+        'timeout': DB_POOL_TIMEOUT,
+        'recycle': DB_POOL_RECYCLE,
+        'pre_ping': DB_POOL_PRE_PING,
+        'statement_cache_size': DB_STATEMENT_CACHE_SIZE,
+        'statement_timeout_ms': DB_STATEMENT_TIMEOUT_MS,
+        'replica': {
+            'configured': read_engine is not engine,
+            'usable': _replica_state['usable'],
+            'lag_seconds': _replica_state['lag'],
+            'checked_out': read_engine.pool.checkedout() if read_engine is not engine else 0,
+        },
+    }
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         try:
@@ -31,13 +137,45 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
-async def init_db():
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для read-only эндпоинтов"""
+    session_factory = await get_read_sessionmaker()
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+async def create_schema():
+    """Создать недостающие таблицы без миграций (для разработки)"""
     async with engine.begin() as conn:
         # Импортируем все модели для регистрации
-        from app.models import users, payments
+        from app.models import users, payments, idempotency, imports, summaries, analytics, balances, billing
         await conn.run_sync(AbstractModel.metadata.create_all)
-    
-    # Заполняем базу начальными данными
+    # Секции секционированных таблиц на ближайшие месяцы
+    from app.partitions import maintain_partitions
+    async with AsyncSessionLocal() as session:
+        await maintain_partitions(session, retention_months=0)
+
+async def seed():
+    """Заполнить пустую базу начальными данными"""
     async with AsyncSessionLocal() as session:
         from app.seed_data import seed_database
         await seed_database(session)
+
+async def init_db():
+    await create_schema()
+    await seed()
+
+DB_WARMUP_CONNECTIONS = int(os.getenv('DB_WARMUP_CONNECTIONS', str(DB_POOL_SIZE)))
+
+async def warm_up_pool(connections: int = DB_WARMUP_CONNECTIONS) -> None:
+    """Заранее открыть соединения пула, чтобы первые запросы не ждали подключения"""
+    async def touch(bind: AsyncEngine):
+        async with bind.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+
+    # Соединения держатся одновременно, иначе пул переиспользует одно и то же
+    await asyncio.gather(*[touch(engine) for _ in range(min(connections, DB_POOL_SIZE))])
+    if read_engine is not engine:
+        await asyncio.gather(*[touch(read_engine) for _ in range(min(connections, DB_POOL_SIZE))])
@@ -0,0 +1,192 @@
+# app/metrics.py
+"""Метрики в текстовом формате Prometheus (без сторонних зависимостей).
+
+Значения хранятся в памяти процесса: при нескольких воркерах uvicorn
+каждый отдает свои метрики. Обновление метрики - несколько операций со
+словарем в event loop, поэтому учет можно держать включенным в проде.
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+_registry: List['_Metric'] = []
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}'] + self.samples()
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        # Метрика без меток видна с нуля сразу после старта
+        self._values: Dict[Tuple, float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + float(amount)
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}' for key, value in self._values.items()]
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        # Метрика без меток видна с нуля сразу после старта
+        self._values: Dict[Tuple, float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = float(value)
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}' for key, value in self._values.items()]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Ключ меток -> [счетчики по корзинам (последняя - +Inf), сумма]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                bucket_label = f'le="{le}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, bucket_label)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP-запроса', ('method', 'route', 'status')
+)
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'HTTP-запросы в обработке')
+
+PAYMENTS = Counter('app_payments_total', 'Проведенные оплаты с баланса', ('kind',))
+PAYMENTS_AMOUNT = Counter('app_payments_amount_rub_total', 'Сумма оплат с баланса, руб.', ('kind',))
+DEPOSITS = Counter('app_deposits_total', 'Пополнения баланса')
+DEPOSITS_AMOUNT = Counter('app_deposits_amount_rub_total', 'Сумма пополнений баланса, руб.')
+
+RECEIPT_GENERATION_DURATION = Histogram(
+    'app_receipt_generation_seconds', 'Длительность генерации квитанций за период', ('result',), JOB_BUCKETS
+)
+RECEIPT_GENERATION_BATCH_DURATION = Histogram(
+    'app_receipt_generation_batch_seconds', 'Длительность одной пачки генерации квитанций', (), JOB_BUCKETS
+)
+RECEIPTS_GENERATED = Counter('app_receipts_generated_total', 'Сгенерированные квитанции')
+RECEIPT_GENERATION_LAST_SUCCESS = Gauge(
+    'app_receipt_generation_last_success_timestamp_seconds', 'Время последней успешной генерации квитанций'
+)
+
+def _pool_lines() -> List[str]:
+    """Состояние пулов соединений читается в момент запроса метрик"""
+    from app.database import engine, read_engine
+    engines = [('primary', engine)] + ([('replica', read_engine)] if read_engine is not engine else [])
+    lines = []
+    for name, documentation, read in (
+        ('db_pool_size', 'Размер пула соединений', lambda pool: pool.size()),
+        ('db_pool_checked_in', 'Свободные соединения в пуле', lambda pool: pool.checkedin()),
+        ('db_pool_checked_out', 'Выданные соединения', lambda pool: pool.checkedout()),
+        ('db_pool_overflow', 'Соединения сверх размера пула', lambda pool: max(pool.overflow(), 0)),
+    ):
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} gauge']
+        lines += [f'{name}{{engine="{label}"}} {read(bind.pool)}' for label, bind in engines]
+    return lines
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    lines += _pool_lines()
+    return '\n'.join(lines) + '\n'
+
+class MetricsMiddleware:
+    """ASGI-middleware: время обработки по шаблону маршрута и запросы в обработке"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # Несовпавшие пути в одну метку, чтобы 404 не плодили ряды
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=scope['method'], route=route, status=status_code
+            )
@@ -0,0 +1,40 @@
+# app/models/analytics.py
+from sqlalchemy import Numeric, DateTime, Integer, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from app.database import AbstractModel
+
+class ServicePeriodStats(AbstractModel):
+    """Потребление и выручка по услуге за месяц (часть shard).
+
+    Строки одного (услуга, месяц) разнесены по shard = user_id % AGGREGATE_SHARDS,
+    чтобы параллельные оплаты не ждали блокировку одной строки; отчеты
+    суммируют shard.
+    """
+    __tablename__ = "service_period_stats"
+    __table_args__ = (
+        Index('ux_service_period_stats_key', 'period', 'service_id', 'shard', unique=True),
+    )
+
+    service_id: Mapped[int] = mapped_column(ForeignKey('utility_services.id'), nullable=False)
+    period: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # Начало месяца
+    shard: Mapped[int] = mapped_column(Integer, nullable=False)
+    consumption: Mapped[float] = mapped_column(Numeric(14, 2), server_default='0')  # Объем по квитанциям
+    billed_amount: Mapped[float] = mapped_column(Numeric(14, 2), server_default='0')  # Начислено по квитанциям
+    paid_amount: Mapped[float] = mapped_column(Numeric(14, 2), server_default='0')  # Из них оплачено
+    payments_count: Mapped[int] = mapped_column(Integer, server_default='0')  # Проведенные платежи по услуге
+    payments_amount: Mapped[float] = mapped_column(Numeric(14, 2), server_default='0')
+
+class PeriodDebtStats(AbstractModel):
+    """Начисления и задолженность по квитанциям за месяц (часть shard)"""
+    __tablename__ = "period_debt_stats"
+    __table_args__ = (
+        Index('ux_period_debt_stats_key', 'period', 'shard', unique=True),
+    )
+
+    period: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # Начало месяца
+    shard: Mapped[int] = mapped_column(Integer, nullable=False)
+    receipts_count: Mapped[int] = mapped_column(Integer, server_default='0')
+    billed_total: Mapped[float] = mapped_column(Numeric(14, 2), server_default='0')
+    unpaid_count: Mapped[int] = mapped_column(Integer, server_default='0')
+    unpaid_total: Mapped[float] = mapped_column(Numeric(14, 2), server_default='0')
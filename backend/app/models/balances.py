@@ -0,0 +1,22 @@
+# app/models/balances.py
+from sqlalchemy import Numeric, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from app.database import AbstractModel
+
+class BalanceSnapshot(AbstractModel):
+    """Баланс пользователя по журналу balance_transactions на момент snapshot_date.
+
+    Учтены проведенные транзакции с transaction_date < snapshot_date.
+    Баланс на любую дату - последний снимок не позже нее плюс
+    транзакции после снимка.
+    """
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (
+        Index('ux_balance_snapshots_user_id_date', 'user_id', 'snapshot_date', unique=True),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
+    snapshot_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    balance: Mapped[float] = mapped_column(Numeric(12, 2), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
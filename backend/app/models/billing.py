@@ -0,0 +1,21 @@
+# app/models/billing.py
+from sqlalchemy import String, DateTime, Integer, ForeignKey, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+from app.database import AbstractModel
+
+class ReceiptGenerationJob(AbstractModel):
+    """Фоновая генерация квитанций за расчетный месяц"""
+    __tablename__ = "receipt_generation_jobs"
+
+    period: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # Начало расчетного месяца
+    status: Mapped[str] = mapped_column(String(20), default='pending')  # 'pending', 'running', 'completed', 'failed'
+    created_by: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
+    receipts_generated: Mapped[int] = mapped_column(Integer, default=0)
+    items_generated: Mapped[int] = mapped_column(Integer, default=0)
+    receipts_skipped: Mapped[int] = mapped_column(Integer, default=0)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,23 @@
+# app/models/idempotency.py
+from sqlalchemy import String, DateTime, JSON, Integer, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+from app.database import AbstractModel
+
+class IdempotencyKey(AbstractModel):
+    """Сохраненный ответ на запрос с заголовком Idempotency-Key"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index('ux_idempotency_keys_user_scope_key', 'user_id', 'scope', 'key', unique=True),
+        Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
+    scope: Mapped[str] = mapped_column(String(50), nullable=False)  # 'balance.deposit', 'payments.pay_receipt', ...
+    key: Mapped[str] = mapped_column(String(100), nullable=False)
+    request_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)  # sha256 тела запроса
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False, default=200)
+    response_body: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
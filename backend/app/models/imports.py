@@ -0,0 +1,23 @@
+# app/models/imports.py
+from sqlalchemy import String, DateTime, JSON, Integer, ForeignKey, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+from app.database import AbstractModel
+
+class ImportJob(AbstractModel):
+    """Фоновая загрузка файла с данными (например, показаний от поставщика)"""
+    __tablename__ = "import_jobs"
+
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)  # 'meter_readings'
+    status: Mapped[str] = mapped_column(String(20), default='pending')  # 'pending', 'running', 'completed', 'failed'
+    filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    created_by: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
+    rows_processed: Mapped[int] = mapped_column(Integer, default=0)
+    rows_imported: Mapped[int] = mapped_column(Integer, default=0)
+    rows_rejected: Mapped[int] = mapped_column(Integer, default=0)
+    errors: Mapped[list] = mapped_column(JSON, default=list)  # Первые ошибки по строкам
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -1,5 +1,5 @@
 # app/models/payments.py
-from sqlalchemy import String, Numeric, DateTime, Text, ForeignKey
+from sqlalchemy import String, Numeric, DateTime, Text, Integer, ForeignKey, ForeignKeyConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from typing import TYPE_CHECKING, List, Optional
@@ -21,6 +21,10 @@ class UtilityService(AbstractModel):
 class Payment(AbstractModel):
     """Модель платежа"""
     __tablename__ = "payments"
+    __table_args__ = (
+        Index('ix_payments_period_id', 'period', 'id'),  # Keyset-пагинация в админке
+        Index('ix_payments_user_id_period', 'user_id', 'period'),  # Платежи пользователя по периодам
+    )
     
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
     service_id: Mapped[int] = mapped_column(ForeignKey('utility_services.id'), nullable=False)
@@ -35,26 +39,40 @@ class Payment(AbstractModel):
     service: Mapped["UtilityService"] = relationship("UtilityService")
 
 class MeterReading(AbstractModel):
-    """Модель показаний счетчиков"""
+    """Модель показаний счетчиков (секции по месяцам period, см. app/partitions.py)"""
     __tablename__ = "meter_readings"
+    __table_args__ = (
+        Index('ix_meter_readings_period_id', 'period', 'id'),  # Keyset-пагинация в админке
+        Index('ix_meter_readings_user_id_period', 'user_id', 'period'),  # Показания пользователя
+        {'postgresql_partition_by': 'RANGE (period)'},
+    )
     
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
     service_id: Mapped[int] = mapped_column(ForeignKey('utility_services.id'), nullable=False)
     value: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
     reading_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    period: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Ключ секционирования входит в первичный ключ
+    period: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
     
     # Relationships
     user: Mapped["Users"] = relationship("Users", back_populates="meter_readings")
     service: Mapped["UtilityService"] = relationship("UtilityService")
 
 class Receipt(AbstractModel):
-    """Модель квитанции"""
+    """Модель квитанции (секции по годам period).
+
+    Квитанция ищется по одному id: он уникален за счет общей
+    последовательности receipts_id_seq (см. app/partitions.py).
+    """
     __tablename__ = "receipts"
+    __table_args__ = (
+        Index('ix_receipts_user_id_period', 'user_id', 'period'),  # Квитанции пользователя, поиск по периоду
+        {'postgresql_partition_by': 'RANGE (period)'},
+    )
     
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
     total_amount: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
-    period: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    period: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
     generated_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     status: Mapped[str] = mapped_column(String(20), default='generated')
     verified_amount: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True)
@@ -65,25 +83,35 @@ class Receipt(AbstractModel):
     receipt_items: Mapped[List["ReceiptItem"]] = relationship("ReceiptItem", back_populates="receipt")
 
 class BalanceTransaction(AbstractModel):
-    """Модель транзакции баланса"""
+    """Модель транзакции баланса (секции по месяцам transaction_date)"""
     __tablename__ = "balance_transactions"
+    __table_args__ = (
+        Index('ix_balance_transactions_user_id_date', 'user_id', 'transaction_date'),  # История пользователя
+        {'postgresql_partition_by': 'RANGE (transaction_date)'},
+    )
     
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
     amount: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
     transaction_type: Mapped[str] = mapped_column(String(20), nullable=False)  # 'deposit', 'payment', 'refund'
     description: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     status: Mapped[str] = mapped_column(String(20), default='completed')
-    transaction_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    transaction_date: Mapped[datetime] = mapped_column(DateTime, primary_key=True, default=datetime.utcnow)
     reference_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     
     # Relationships
     user: Mapped["Users"] = relationship("Users")
 
 class ReceiptItem(AbstractModel):
-    """Модель элемента квитанции"""
+    """Модель элемента квитанции (секции по годам периода квитанции)"""
     __tablename__ = "receipt_items"
+    __table_args__ = (
+        ForeignKeyConstraint(['receipt_id', 'period'], ['receipts.id', 'receipts.period']),
+        Index('ix_receipt_items_receipt_id_period', 'receipt_id', 'period'),  # Элементы квитанции
+        {'postgresql_partition_by': 'RANGE (period)'},
+    )
     
-    receipt_id: Mapped[int] = mapped_column(ForeignKey('receipts.id'), nullable=False)
+    receipt_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    period: Mapped[datetime] = mapped_column(DateTime, primary_key=True)  # Копия receipts.period
     service_id: Mapped[int] = mapped_column(ForeignKey('utility_services.id'), nullable=False)
     quantity: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
     rate: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
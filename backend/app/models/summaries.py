@@ -0,0 +1,28 @@
+# app/models/summaries.py
+from sqlalchemy import Numeric, String, DateTime, Integer, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+from app.database import AbstractModel
+
+class UserSummary(AbstractModel):
+    """Сводка по пользователю для главной страницы (обновляется по событиям).
+
+    Баланс здесь не хранится: он читается из users в том же запросе.
+    """
+    __tablename__ = "user_summaries"
+    __table_args__ = (
+        Index('ux_user_summaries_user_id', 'user_id', unique=True),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
+    unpaid_receipts_count: Mapped[int] = mapped_column(Integer, server_default='0')
+    unpaid_receipts_total: Mapped[float] = mapped_column(Numeric(12, 2), server_default='0')
+    last_payment_amount: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True)
+    last_payment_date: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_payment_description: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    # {"<service_id>": {"value": ..., "period": ..., "reading_date": ...}}
+    latest_readings: Mapped[dict] = mapped_column(JSONB, server_default=text("'{}'"))
+    rebuilt_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # NULL - полный расчет еще не выполнен
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
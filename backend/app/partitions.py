@@ -0,0 +1,259 @@
+# app/partitions.py
+"""Секционирование растущих таблиц по времени (PARTITION BY RANGE).
+
+receipts и receipt_items делятся по годам периода квитанции (на
+receipts ссылается внешний ключ, поэтому секций DEFAULT у них нет),
+meter_readings и balance_transactions - по месяцам, с секцией DEFAULT
+для строк вне созданных диапазонов. Секции создаются заранее (секции
+квитанций - еще и при вставке в год без секции), а старые
+отсоединяются (остаются отдельными таблицами для архива) командой
+
+    uv run python manage.py maintain-partitions --ahead-months 3 --retention-months 36
+
+Баланс по журналу (app/repositories/ledger_repo.py) - последний снимок
+пользователя плюс транзакции после него; без снимка журнал читается с
+начала. Поэтому секция balance_transactions отсоединяется, только если у
+каждого пользователя с транзакциями в ней есть снимок не раньше конца
+секции, иначе она остается на месте. maintain-partitions перед
+отсоединением снимает балансы на границу хранения.
+
+Первичный ключ секционированной таблицы включает ключ секций, поэтому
+PostgreSQL не гарантирует уникальность одного id. Ее обеспечивает общая
+последовательность <таблица>_id_seq: id не задаются явно, а секции
+наследуют значение по умолчанию родителя. На этом держатся поиски по
+одному id (/receipts/{id}, оплата и проверка квитанции); проверка -
+check_id_sequences, ее выполняет maintain-partitions.
+"""
+import logging
+import os
+import re
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Dict, List, Optional, Sequence
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# таблица -> (ключ секционирования, шаг, есть ли секция DEFAULT)
+PARTITIONED_TABLES = {
+    'receipts': ('period', 'year', False),
+    'receipt_items': ('period', 'year', False),
+    'meter_readings': ('period', 'month', True),
+    'balance_transactions': ('transaction_date', 'month', True),
+}
+# Секции receipt_items отсоединяются раньше секций receipts, на которые они ссылаются
+DETACH_ORDER = ('receipt_items', 'receipts', 'meter_readings', 'balance_transactions')
+
+# Ключ advisory-блокировки на создание секций
+PARTITION_DDL_LOCK = 7302
+
+PARTITIONS_AHEAD_MONTHS = int(os.getenv('PARTITIONS_AHEAD_MONTHS', '3'))
+PARTITION_RETENTION_MONTHS = int(os.getenv('PARTITION_RETENTION_MONTHS', '0'))  # 0 - не отсоединять
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def retention_cutoff(retention_months: int, now: Optional[datetime] = None) -> datetime:
+    """Граница хранения: секции, целиком лежащие раньше нее, отсоединяются"""
+    return add_months(partition_start('month', now or datetime.utcnow()), -retention_months)
+
+def partition_start(step: str, value: datetime) -> datetime:
+    start = value.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    return start.replace(month=1) if step == 'year' else start
+
+def next_start(step: str, start: datetime) -> datetime:
+    return add_months(start, 12 if step == 'year' else 1)
+
+def partition_name(table: str, step: str, start: datetime) -> str:
+    return f'{table}_y{start:%Y}' if step == 'year' else f'{table}_p{start:%Y_%m}'
+
+def _parse_partition_start(table: str, name: str) -> Optional[datetime]:
+    """Начало диапазона из имени секции (секции с другими именами не трогаем)"""
+    match = re.fullmatch(re.escape(table) + r'_(?:y(\d{4})|p(\d{4})_(\d{2}))', name)
+    if match is None:
+        return None
+    if match.group(1):
+        return datetime(int(match.group(1)), 1, 1)
+    return datetime(int(match.group(2)), int(match.group(3)), 1)
+
+def _literal(value: datetime) -> str:
+    return f"'{value:%Y-%m-%d %H:%M:%S}'"
+
+async def partitioned_tables(session: AsyncSession) -> List[str]:
+    """Таблицы из PARTITIONED_TABLES, которые в этой базе уже секционированы"""
+    result = await session.execute(
+        text("""
+            SELECT c.relname FROM pg_partitioned_table p
+            JOIN pg_class c ON c.oid = p.partrelid
+            WHERE c.relname = ANY(:tables) AND pg_table_is_visible(c.oid)
+        """),
+        {'tables': list(PARTITIONED_TABLES)}
+    )
+    return list(result.scalars().all())
+
+async def list_partitions(session: AsyncSession, table: str) -> List[str]:
+    result = await session.execute(
+        text("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :table AND pg_table_is_visible(p.oid)
+            ORDER BY c.relname
+        """),
+        {'table': table}
+    )
+    return list(result.scalars().all())
+
+async def _create_partition(session: AsyncSession, table: str, name: str, start: datetime, end: datetime) -> None:
+    key, _, has_default = PARTITIONED_TABLES[table]
+    bounds = f'FROM ({_literal(start)}) TO ({_literal(end)})'
+    default = f'{table}_default'
+    if has_default:
+        misplaced = await session.execute(
+            text(f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {key} >= :start AND {key} < :end)'),
+            {'start': start, 'end': end}
+        )
+        if misplaced.scalar():
+            # Строки диапазона уже попали в DEFAULT: переносим их в новую секцию
+            await session.execute(text(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+            await session.execute(
+                text(f"""
+                    WITH moved AS (DELETE FROM {default} WHERE {key} >= :start AND {key} < :end RETURNING *)
+                    INSERT INTO {name} SELECT * FROM moved
+                """),
+                {'start': start, 'end': end}
+            )
+            await session.execute(text(f'ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {bounds}'))
+            return
+    await session.execute(text(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}'))
+
+async def ensure_partitions(
+    session: AsyncSession,
+    start: datetime,
+    end: datetime,
+    tables: Sequence[str] = tuple(PARTITIONED_TABLES)
+) -> List[str]:
+    """Создать недостающие секции, покрывающие [start, end), без коммита; вернуть созданные.
+
+    Если чего-то не хватает, секции создаются под advisory-блокировкой до
+    конца транзакции: параллельные вызовы (например, из запросов) не
+    создают одну секцию дважды.
+    """
+    created = []
+    locked = False
+    for table in await partitioned_tables(session):
+        if table not in tables:
+            continue
+        _, step, has_default = PARTITIONED_TABLES[table]
+        names = []
+        current = partition_start(step, start)
+        while current < end:
+            names.append((partition_name(table, step, current), current))
+            current = next_start(step, current)
+        existing = set(await list_partitions(session, table))
+        missing_default = has_default and f'{table}_default' not in existing
+        if not locked and (missing_default or any(name not in existing for name, _ in names)):
+            await session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': PARTITION_DDL_LOCK})
+            locked = True
+            existing = set(await list_partitions(session, table))
+            missing_default = has_default and f'{table}_default' not in existing
+        if missing_default:
+            await session.execute(text(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT'))
+            created.append(f'{table}_default')
+        for name, current in names:
+            if name not in existing:
+                await _create_partition(session, table, name, current, next_start(step, current))
+                created.append(name)
+    return created
+
+async def check_id_sequences(session: AsyncSession) -> List[str]:
+    """Нарушения единой последовательности id в секционированных таблицах (пусто, если их нет).
+
+    У родителя и каждой секции id по умолчанию берется из <таблица>_id_seq,
+    и ни один id не больше последнего выданного последовательностью.
+    """
+    problems = []
+    for table in await partitioned_tables(session):
+        sequence_default = f"nextval('{table}_id_seq'::regclass)"
+        defaults = await session.execute(
+            text("""
+                SELECT c.relname, pg_get_expr(d.adbin, d.adrelid) FROM pg_class c
+                JOIN pg_attribute a ON a.attrelid = c.oid AND a.attname = 'id'
+                LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+                WHERE c.oid = CAST(:table AS regclass)
+                   OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass))
+                ORDER BY c.relname
+            """),
+            {'table': table}
+        )
+        for name, default in defaults.all():
+            if default != sequence_default:
+                problems.append(f'{name}.id: значение по умолчанию {default or "нет"} вместо {sequence_default}')
+        # max(id) читается по первичным ключам секций
+        max_id = (await session.execute(text(f'SELECT max(id) FROM {table}'))).scalar()
+        last_value = (await session.execute(text(f'SELECT last_value FROM {table}_id_seq'))).scalar()
+        if max_id is not None and max_id > last_value:
+            problems.append(f'{table}: id {max_id} больше последнего значения {table}_id_seq ({last_value})')
+    return problems
+
+async def _ledger_covered(session: AsyncSession, name: str, end: datetime) -> bool:
+    """У всех пользователей с транзакциями в секции есть снимок баланса не раньше end"""
+    result = await session.execute(
+        text(f"""
+            SELECT NOT EXISTS (
+                SELECT 1 FROM {name} t
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM balance_snapshots s
+                    WHERE s.user_id = t.user_id AND s.snapshot_date >= :end
+                )
+            )
+        """),
+        {'end': end}
+    )
+    return result.scalar()
+
+async def detach_partitions(session: AsyncSession, before: datetime) -> List[str]:
+    """Отсоединить секции, целиком лежащие раньше before, без коммита; вернуть их имена.
+
+    Секции balance_transactions, не покрытые снимками балансов, не
+    отсоединяются: без них баланс по журналу стал бы неверным.
+    """
+    partitioned = set(await partitioned_tables(session))
+    detached = []
+    for table in DETACH_ORDER:
+        if table not in partitioned:
+            continue
+        _, step, _ = PARTITIONED_TABLES[table]
+        for name in await list_partitions(session, table):
+            start = _parse_partition_start(table, name)
+            if start is None or next_start(step, start) > before:
+                continue
+            if table == 'balance_transactions' and not await _ledger_covered(session, name, next_start(step, start)):
+                logger.warning("Секция %s не отсоединена: не у всех пользователей есть снимок баланса после нее", name)
+                continue
+            await session.execute(text(f'ALTER TABLE {table} DETACH PARTITION {name}'))
+            detached.append(name)
+    return detached
+
+async def maintain_partitions(
+    session: AsyncSession,
+    ahead_months: int = PARTITIONS_AHEAD_MONTHS,
+    retention_months: int = PARTITION_RETENTION_MONTHS,
+    now: Optional[datetime] = None
+) -> Dict[str, List[str]]:
+    """Создать секции до now + ahead_months и отсоединить старше retention_months (с коммитом)"""
+    this_month = partition_start('month', now or datetime.utcnow())
+    try:
+        created = await ensure_partitions(session, this_month, add_months(this_month, ahead_months + 1))
+        detached = []
+        if retention_months > 0:
+            detached = await detach_partitions(session, retention_cutoff(retention_months, now))
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    return {'created': created, 'detached': detached}
@@ -0,0 +1,135 @@
+# app/query_stats.py
+"""Учет SQL-запросов по HTTP-запросам.
+
+Хуки SQLAlchemy на каждом движке считают выполненные запросы и время в
+БД для текущего сборщика (contextvar). QueryStatsMiddleware заводит
+сборщик на каждый HTTP-запрос, отдает итог в заголовках X-DB-Queries и
+X-DB-Time-Ms и пишет в лог медленные маршруты и повторяющиеся запросы
+(признак N+1). Для проверок в скриптах и тестах - capture_queries() и
+assert_max_queries().
+"""
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+QUERY_STATS = os.getenv('QUERY_STATS', '1') == '1'
+# Писать в лог маршруты, проведшие в БД не меньше стольких мс (0 - все)
+QUERY_STATS_LOG_MS = float(os.getenv('QUERY_STATS_LOG_MS', '200'))
+# Столько одинаковых запросов за один HTTP-запрос считаем признаком N+1
+QUERY_STATS_REPEAT_THRESHOLD = int(os.getenv('QUERY_STATS_REPEAT_THRESHOLD', '5'))
+
+class QueryStats:
+    """Счетчик запросов одного HTTP-запроса или блока кода"""
+
+    def __init__(self, parent: Optional['QueryStats'] = None):
+        self.parent = parent
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+        if self.parent is not None:
+            self.parent.record(statement, seconds)
+
+    def repeated(self, threshold: int = QUERY_STATS_REPEAT_THRESHOLD) -> list:
+        """Запросы, выполненные threshold и более раз: [(текст, число)]"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None and context is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, '_query_started', None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключить учет запросов к движку"""
+    event.listen(engine.sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine.sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Считать запросы, выполненные внутри блока (вложенные блоки учитываются и во внешних)"""
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """AssertionError, если блок выполнил больше limit запросов"""
+    with capture_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        statements = '\n'.join(f'  {count} x {statement}' for statement, count in stats.statements.most_common())
+        raise AssertionError(f"Выполнено {stats.count} SQL-запросов, допустимо {limit}:\n{statements}")
+
+def _shorten(statement: Optional[str], length: int = 300) -> str:
+    statement = ' '.join((statement or '').split())
+    return statement if len(statement) <= length else statement[:length] + '...'
+
+class QueryStatsMiddleware:
+    """ASGI-middleware: запросы к БД на каждый HTTP-запрос"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not QUERY_STATS:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        with capture_queries() as stats:
+            async def send_with_stats(message):
+                # Заголовки уходят до тела: запросы потоковой выгрузки попадут только в лог
+                if message['type'] == 'http.response.start':
+                    headers = list(message.get('headers', []))
+                    headers.append((b'x-db-queries', str(stats.count).encode()))
+                    headers.append((b'x-db-time-ms', f'{stats.total_seconds * 1000:.1f}'.encode()))
+                    message = {**message, 'headers': headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                self._log(scope, stats, time.perf_counter() - started)
+
+    @staticmethod
+    def _log(scope, stats: QueryStats, elapsed: float) -> None:
+        route = scope.get('route')
+        name = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+        if stats.total_seconds * 1000 >= QUERY_STATS_LOG_MS:
+            logger.warning(
+                "SQL %s: %d запросов, %.1f мс в БД из %.1f мс; самый долгий (%.1f мс): %s",
+                name, stats.count, stats.total_seconds * 1000, elapsed * 1000,
+                stats.slowest_seconds * 1000, _shorten(stats.slowest_statement)
+            )
+        for statement, count in stats.repeated():
+            logger.warning("Возможный N+1 в %s: %d раз %s", name, count, _shorten(statement))
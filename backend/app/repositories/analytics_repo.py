@@ -0,0 +1,229 @@
+# app/repositories/analytics_repo.py
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import and_, delete, func, case, literal, literal_column, text, DateTime
+from sqlalchemy.engine import Row
+from app.models.payments import Payment, Receipt, ReceiptItem
+from app.models.analytics import ServicePeriodStats, PeriodDebtStats
+from typing import List, Optional
+from datetime import datetime
+from decimal import Decimal
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# На сколько строк делится каждый (услуга, месяц); менять только вместе с rebuild
+AGGREGATE_SHARDS = int(os.getenv('AGGREGATE_SHARDS', '16'))
+
+SERVICE_STAT_VALUES = ['consumption', 'billed_amount', 'paid_amount', 'payments_count', 'payments_amount']
+DEBT_STAT_VALUES = ['receipts_count', 'billed_total', 'unpaid_count', 'unpaid_total']
+
+def _month(period_column):
+    # Константы без параметров: выражение в SELECT и GROUP BY должно совпадать
+    return func.date_trunc(literal_column("'month'"), period_column, type_=DateTime)
+
+def _shard(user_id_column):
+    return user_id_column % literal_column(str(AGGREGATE_SHARDS))
+
+def _signed(expression, sign: int):
+    return expression if sign > 0 else -expression
+
+def _upsert(model, keys: List[str], values: List[str], rows):
+    """INSERT ... SELECT с прибавлением к существующим строкам агрегата"""
+    statement = insert(model).from_select(keys + values, rows)
+    return statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: getattr(model, name) + getattr(statement.excluded, name) for name in values}
+    )
+
+def _upsert_service_stats(rows):
+    return _upsert(ServicePeriodStats, ['period', 'service_id', 'shard'], SERVICE_STAT_VALUES, rows)
+
+def _upsert_debt_stats(rows):
+    return _upsert(PeriodDebtStats, ['period', 'shard'], DEBT_STAT_VALUES, rows)
+
+class AnalyticsRepository:
+    """Помесячные агрегаты для отчетов администратора.
+
+    Агрегаты меняются в тех же транзакциях, что и данные: генерация
+    квитанций, оплата квитанции, проведение платежа. Отчет читает
+    несколько строк на месяц вместо receipt_items и payments целиком.
+    """
+
+    @staticmethod
+    def _receipt_rows(sign: int, criteria):
+        """Вклад квитанций, отобранных criteria, в оба агрегата (строки для upsert)"""
+        month = _month(Receipt.period)
+        shard = _shard(Receipt.user_id)
+        unpaid = Receipt.status != 'paid'
+        items = (
+            select(
+                month,
+                ReceiptItem.service_id,
+                shard,
+                _signed(func.sum(ReceiptItem.quantity), sign),
+                _signed(func.sum(ReceiptItem.amount), sign),
+                _signed(func.sum(case((unpaid, 0), else_=ReceiptItem.amount)), sign),
+                literal(0),
+                literal(0)
+            )
+            .join(Receipt, and_(Receipt.id == ReceiptItem.receipt_id, Receipt.period == ReceiptItem.period))
+            .where(*criteria)
+            .group_by(month, ReceiptItem.service_id, shard)
+            .order_by(month, ReceiptItem.service_id, shard)
+        )
+        receipts = (
+            select(
+                month,
+                shard,
+                _signed(func.count(Receipt.id), sign),
+                _signed(func.sum(Receipt.total_amount), sign),
+                _signed(func.sum(case((unpaid, 1), else_=0)), sign),
+                _signed(func.sum(case((unpaid, Receipt.total_amount), else_=0)), sign)
+            )
+            .where(*criteria)
+            .group_by(month, shard)
+            .order_by(month, shard)
+        )
+        return items, receipts
+
+    @staticmethod
+    async def add_receipts(session: AsyncSession, sign: int, *criteria) -> None:
+        """Прибавить (sign=1) или вычесть (sign=-1) квитанции из агрегатов (без коммита)"""
+        items, receipts = AnalyticsRepository._receipt_rows(sign, criteria)
+        await session.execute(_upsert_service_stats(items))
+        await session.execute(_upsert_debt_stats(receipts))
+
+    @staticmethod
+    async def record_receipt_paid(session: AsyncSession, receipt_id: int) -> None:
+        """Событие: квитанция только что оплачена (без коммита)"""
+        month = _month(Receipt.period)
+        shard = _shard(Receipt.user_id)
+        await session.execute(_upsert_service_stats(
+            select(
+                month, ReceiptItem.service_id, shard,
+                literal(0), literal(0), func.sum(ReceiptItem.amount), literal(0), literal(0)
+            )
+            .join(Receipt, and_(Receipt.id == ReceiptItem.receipt_id, Receipt.period == ReceiptItem.period))
+            .where(ReceiptItem.receipt_id == receipt_id)
+            .group_by(month, ReceiptItem.service_id, shard)
+        ))
+        await session.execute(_upsert_debt_stats(
+            select(month, shard, literal(0), literal(0), literal(-1), -Receipt.total_amount)
+            .where(Receipt.id == receipt_id)
+        ))
+
+    @staticmethod
+    async def record_payment(
+        session: AsyncSession,
+        user_id: int,
+        service_id: int,
+        period: datetime,
+        amount: Decimal
+    ) -> None:
+        """Событие: платеж по услуге проведен (без коммита)"""
+        statement = insert(ServicePeriodStats).values(
+            period=period.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None),
+            service_id=service_id,
+            shard=user_id % AGGREGATE_SHARDS,
+            payments_count=1,
+            payments_amount=amount
+        )
+        await session.execute(statement.on_conflict_do_update(
+            index_elements=['period', 'service_id', 'shard'],
+            set_={
+                'payments_count': ServicePeriodStats.payments_count + 1,
+                'payments_amount': ServicePeriodStats.payments_amount + statement.excluded.payments_amount
+            }
+        ))
+
+    @staticmethod
+    async def rebuild(session: AsyncSession, start: Optional[datetime] = None, end: Optional[datetime] = None) -> None:
+        """Пересчитать агрегаты за месяцы [start, end) (все, если границ нет), с коммитом.
+
+        Таблицы агрегатов блокируются на время пересчета: события ждут
+        и применяют свои поправки поверх пересчитанных строк.
+        """
+        def in_range(column):
+            conditions = []
+            if start is not None:
+                conditions.append(column >= start)
+            if end is not None:
+                conditions.append(column < end)
+            return conditions
+
+        try:
+            await session.execute(text('LOCK TABLE service_period_stats, period_debt_stats IN EXCLUSIVE MODE'))
+            await session.execute(delete(ServicePeriodStats).where(*in_range(ServicePeriodStats.period)))
+            await session.execute(delete(PeriodDebtStats).where(*in_range(PeriodDebtStats.period)))
+
+            await AnalyticsRepository.add_receipts(session, 1, *in_range(_month(Receipt.period)))
+
+            month = _month(Payment.period)
+            shard = _shard(Payment.user_id)
+            await session.execute(_upsert_service_stats(
+                select(
+                    month, Payment.service_id, shard,
+                    literal(0), literal(0), literal(0), func.count(Payment.id), func.sum(Payment.amount)
+                )
+                .where(Payment.status == 'completed', *in_range(month))
+                .group_by(month, Payment.service_id, shard)
+                .order_by(month, Payment.service_id, shard)
+            ))
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+    @staticmethod
+    async def get_service_stats(
+        session: AsyncSession,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        service_id: Optional[int] = None
+    ) -> List[Row]:
+        """Потребление и выручка по услугам помесячно"""
+        query = (
+            select(
+                ServicePeriodStats.service_id,
+                ServicePeriodStats.period,
+                func.sum(ServicePeriodStats.consumption).label('consumption'),
+                func.sum(ServicePeriodStats.billed_amount).label('billed_amount'),
+                func.sum(ServicePeriodStats.paid_amount).label('paid_amount'),
+                func.sum(ServicePeriodStats.payments_count).label('payments_count'),
+                func.sum(ServicePeriodStats.payments_amount).label('payments_amount')
+            )
+            .group_by(ServicePeriodStats.period, ServicePeriodStats.service_id)
+            .order_by(ServicePeriodStats.period, ServicePeriodStats.service_id)
+        )
+        if start is not None:
+            query = query.where(ServicePeriodStats.period >= start)
+        if end is not None:
+            query = query.where(ServicePeriodStats.period < end)
+        if service_id is not None:
+            query = query.where(ServicePeriodStats.service_id == service_id)
+        result = await session.execute(query)
+        return result.all()
+
+    @staticmethod
+    async def get_debt_stats(session: AsyncSession, start: Optional[datetime], end: Optional[datetime]) -> List[Row]:
+        """Начисления и задолженность по квитанциям помесячно"""
+        query = (
+            select(
+                PeriodDebtStats.period,
+                func.sum(PeriodDebtStats.receipts_count).label('receipts_count'),
+                func.sum(PeriodDebtStats.billed_total).label('billed_total'),
+                func.sum(PeriodDebtStats.unpaid_count).label('unpaid_count'),
+                func.sum(PeriodDebtStats.unpaid_total).label('unpaid_total')
+            )
+            .group_by(PeriodDebtStats.period)
+            .order_by(PeriodDebtStats.period)
+        )
+        if start is not None:
+            query = query.where(PeriodDebtStats.period >= start)
+        if end is not None:
+            query = query.where(PeriodDebtStats.period < end)
+        result = await session.execute(query)
+        return result.all()
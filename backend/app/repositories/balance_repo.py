@@ -1,9 +1,13 @@
 # app/repositories/balance_repo.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update, insert
 from sqlalchemy.orm import selectinload
+from sqlalchemy.engine import Row
 from app.models.users import Users
 from app.models.payments import BalanceTransaction
+from app.caches.user_cache import user_cache
+from app.repositories.summary_repo import SummaryRepository
 from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
@@ -24,30 +28,32 @@ class BalanceRepository:
         session: AsyncSession, 
         user_id: int, 
         amount: float, 
-        description: str = "Пополнение баланса"
-    ) -> Users:
-        """Пополнить баланс пользователя"""
-        user = await session.get(Users, user_id)
-        if not user:
-            raise ValueError("Пользователь не найден")
-        
+        description: str = "Пополнение баланса",
+        reference_id: str = None,
+        commit: bool = True
+    ) -> Decimal:
+        """Пополнить баланс пользователя, вернуть новый баланс"""
         # Конвертируем float в Decimal для корректной операции
         amount_decimal = Decimal(str(amount))
-        user.balance += amount_decimal
         
-        # Создаем запись о транзакции
-        transaction = BalanceTransaction(
-            user_id=user_id,
-            amount=amount_decimal,
-            transaction_type='deposit',
-            description=description,
-            status='completed'
+        result = await session.execute(
+            update(Users)
+            .where(Users.id == user_id)
+            .values(balance=Users.balance + amount_decimal)
+            .returning(Users.balance)
         )
-        session.add(transaction)
+        new_balance = result.scalar_one_or_none()
+        if new_balance is None:
+            raise ValueError("Пользователь не найден")
         
-        await session.commit()
-        await session.refresh(user)
-        return user
+        await BalanceRepository._insert_transaction(
+            session, user_id, amount_decimal, 'deposit', description, reference_id
+        )
+        # Профиль в кэше сбрасывается при коммите, кто бы его ни выполнил
+        user_cache.invalidate_on_commit(session, user_id)
+        if commit:
+            await session.commit()
+        return new_balance
     
     @staticmethod
     async def withdraw_balance(
@@ -55,50 +61,87 @@ class BalanceRepository:
         user_id: int,
         amount: float,
         description: str = "Оплата услуг",
-        reference_id: str = None
-    ) -> Users:
-        """Списать средства с баланса"""
-        user = await session.get(Users, user_id)
-        if not user:
-            raise ValueError("Пользователь не найден")
+        reference_id: str = None,
+        commit: bool = True
+    ) -> Decimal:
+        """Списать средства с баланса, вернуть новый баланс.
         
+        Проверка и списание выполняются одним условным UPDATE, поэтому
+        параллельные списания не могут увести баланс в минус.
+        """
         # Конвертируем float в Decimal
         amount_decimal = Decimal(str(amount))
         
-        if user.balance < amount_decimal:
+        result = await session.execute(
+            update(Users)
+            .where(Users.id == user_id, Users.balance >= amount_decimal)
+            .values(balance=Users.balance - amount_decimal)
+            .returning(Users.balance)
+        )
+        new_balance = result.scalar_one_or_none()
+        if new_balance is None:
+            exists_result = await session.execute(select(Users.id).where(Users.id == user_id))
+            if exists_result.scalar_one_or_none() is None:
+                raise ValueError("Пользователь не найден")
             raise ValueError("Недостаточно средств на балансе")
         
-        user.balance -= amount_decimal
-        
-        # Создаем запись о транзакции
-        transaction = BalanceTransaction(
-            user_id=user_id,
-            amount=amount_decimal,
-            transaction_type='payment',
-            description=description,
-            status='completed',
-            reference_id=reference_id
+        paid_at = await BalanceRepository._insert_transaction(
+            session, user_id, amount_decimal, 'payment', description, reference_id
         )
-        session.add(transaction)
-        
-        await session.commit()
-        await session.refresh(user)
-        return user
+        await SummaryRepository.record_payment(session, user_id, amount_decimal, description, paid_at)
+        # Профиль в кэше сбрасывается при коммите, кто бы его ни выполнил
+        user_cache.invalidate_on_commit(session, user_id)
+        if commit:
+            await session.commit()
+        return new_balance
+    
+    @staticmethod
+    async def _insert_transaction(
+        session: AsyncSession,
+        user_id: int,
+        amount: Decimal,
+        transaction_type: str,
+        description: Optional[str],
+        reference_id: Optional[str]
+    ) -> datetime:
+        """Запись в журнал транзакций без загрузки ORM-объекта, вернуть ее дату"""
+        transaction_date = datetime.utcnow()
+        await session.execute(
+            insert(BalanceTransaction).values(
+                user_id=user_id,
+                amount=amount,
+                transaction_type=transaction_type,
+                description=description,
+                status='completed',
+                transaction_date=transaction_date,
+                reference_id=reference_id
+            )
+        )
+        return transaction_date
     
     @staticmethod
     async def get_user_transactions(
         session: AsyncSession, 
         user_id: int, 
         limit: int = 50
-    ) -> List[BalanceTransaction]:
+    ) -> List[Row]:
         """Получить историю транзакций пользователя"""
         result = await session.execute(
-            select(BalanceTransaction)
+            select(
+                BalanceTransaction.id,
+                BalanceTransaction.user_id,
+                BalanceTransaction.amount,
+                BalanceTransaction.transaction_type,
+                BalanceTransaction.description,
+                BalanceTransaction.status,
+                BalanceTransaction.transaction_date,
+                BalanceTransaction.reference_id
+            )
             .where(BalanceTransaction.user_id == user_id)
             .order_by(BalanceTransaction.transaction_date.desc())
             .limit(limit)
         )
-        return result.scalars().all()
+        return result.all()
     
     @staticmethod
     async def create_transaction(
@@ -0,0 +1,267 @@
+# app/repositories/billing_repo.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete, func, and_, exists, literal
+from app.database import AsyncSessionLocal
+from app.models.payments import MeterReading, UtilityService, Receipt, ReceiptItem
+from app.models.billing import ReceiptGenerationJob
+from app.repositories.summary_repo import SummaryRepository
+from app.repositories.analytics_repo import AnalyticsRepository
+from app.partitions import ensure_partitions
+from app.metrics import (
+    RECEIPT_GENERATION_DURATION, RECEIPT_GENERATION_BATCH_DURATION,
+    RECEIPTS_GENERATED, RECEIPT_GENERATION_LAST_SUCCESS
+)
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from datetime import datetime
+
+# Пространство имен для advisory-блокировки генерации квитанций
+RECEIPT_GENERATION_LOCK = 7301
+
+class BillingRepository:
+
+    @staticmethod
+    def period_bounds(period: datetime) -> Tuple[datetime, datetime]:
+        """Границы расчетного месяца [начало, начало следующего)"""
+        start = period.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+        if start.month == 12:
+            end = start.replace(year=start.year + 1, month=1)
+        else:
+            end = start.replace(month=start.month + 1)
+        return start, end
+
+    @staticmethod
+    async def generate_receipts(
+        session: AsyncSession,
+        period: datetime,
+        batch_size: int = 50000,
+        on_batch: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict:
+        """Сгенерировать квитанции за период для всех пользователей.
+
+        Расчет выполняется набором SQL-запросов по диапазонам user_id:
+        последние показания за месяц умножаются на активные тарифы,
+        квитанции и их элементы вставляются через INSERT ... SELECT.
+        Повторный запуск за тот же период пересчитывает неоплаченные
+        квитанции ('generated') и не трогает оплаченные и проверенные.
+        on_batch получает накопленную статистику после каждой пачки.
+        """
+        started = time.perf_counter()
+        try:
+            stats = await BillingRepository._generate_all(session, period, batch_size, on_batch)
+        except Exception:
+            RECEIPT_GENERATION_DURATION.observe(time.perf_counter() - started, result='error')
+            raise
+        RECEIPT_GENERATION_DURATION.observe(time.perf_counter() - started, result='success')
+        RECEIPT_GENERATION_LAST_SUCCESS.set(time.time())
+        return stats
+
+    @staticmethod
+    async def _generate_all(
+        session: AsyncSession,
+        period: datetime,
+        batch_size: int,
+        on_batch: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict:
+        start, end = BillingRepository.period_bounds(period)
+
+        # Секции квитанций за период (обычно уже созданы maintain-partitions)
+        await ensure_partitions(session, start, end, tables=('receipts', 'receipt_items'))
+        bounds = await session.execute(
+            select(func.min(MeterReading.user_id), func.max(MeterReading.user_id))
+            .where(MeterReading.period >= start, MeterReading.period < end)
+        )
+        min_user_id, max_user_id = bounds.one()
+        await session.commit()
+
+        stats = {'receipts_generated': 0, 'items_generated': 0, 'receipts_skipped': 0}
+        if min_user_id is None:
+            return stats
+
+        for low in range(min_user_id, max_user_id + 1, batch_size):
+            high = low + batch_size
+            batch_started = time.perf_counter()
+            batch_stats = await BillingRepository._generate_batch(session, start, end, low, high)
+            RECEIPT_GENERATION_BATCH_DURATION.observe(time.perf_counter() - batch_started)
+            RECEIPTS_GENERATED.inc(batch_stats['receipts_generated'])
+            for key, value in batch_stats.items():
+                stats[key] += value
+            if on_batch is not None:
+                await on_batch(dict(stats))
+
+        return stats
+
+    @staticmethod
+    async def create_job(session: AsyncSession, period: datetime, created_by: int) -> ReceiptGenerationJob:
+        start, _ = BillingRepository.period_bounds(period)
+        job = ReceiptGenerationJob(period=start, status='pending', created_by=created_by)
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+        return job
+
+    @staticmethod
+    async def get_job(session: AsyncSession, job_id: int) -> Optional[ReceiptGenerationJob]:
+        return await session.get(ReceiptGenerationJob, job_id)
+
+    @staticmethod
+    async def _update_job(session: AsyncSession, job_id: int, **values) -> None:
+        await session.execute(
+            update(ReceiptGenerationJob).where(ReceiptGenerationJob.id == job_id).values(**values)
+        )
+        await session.commit()
+
+    @staticmethod
+    async def run_generation_job(job_id: int, period: datetime) -> None:
+        """Фоновая генерация квитанций с прогрессом в receipt_generation_jobs.
+
+        Каждая пачка пользователей фиксируется отдельно, поэтому при
+        ошибке задача помечается 'failed', а повторный запуск за тот же
+        период досчитывает и пересчитывает неоплаченные квитанции.
+        """
+        async with AsyncSessionLocal() as session:
+            async def progress(stats: Dict) -> None:
+                await BillingRepository._update_job(session, job_id, **stats)
+
+            try:
+                await BillingRepository._update_job(session, job_id, status='running', started_at=datetime.utcnow())
+                stats = await BillingRepository.generate_receipts(session, period, on_batch=progress)
+                await BillingRepository._update_job(
+                    session, job_id, status='completed', finished_at=datetime.utcnow(), **stats
+                )
+            except Exception as e:
+                await session.rollback()
+                await BillingRepository._update_job(
+                    session, job_id,
+                    status='failed',
+                    error_message=str(e),
+                    finished_at=datetime.utcnow()
+                )
+
+    @staticmethod
+    async def _generate_batch(
+        session: AsyncSession,
+        start: datetime,
+        end: datetime,
+        low: int,
+        high: int
+    ) -> Dict:
+        """Сгенерировать квитанции для пользователей с user_id в [low, high)"""
+        generated_date = datetime.utcnow()
+        period_key = start.year * 100 + start.month
+
+        try:
+            # Не допускаем параллельную генерацию одного и того же периода
+            await session.execute(select(func.pg_advisory_xact_lock(RECEIPT_GENERATION_LOCK, period_key)))
+
+            in_batch = and_(
+                Receipt.user_id >= low,
+                Receipt.user_id < high,
+                Receipt.period >= start,
+                Receipt.period < end
+            )
+
+            # Удаляем ранее сгенерированные неоплаченные квитанции этого периода
+            # (и вычитаем их из сводок пользователей и агрегатов)
+            await SummaryRepository.adjust_unpaid_receipts(session, -1, in_batch, Receipt.status == 'generated')
+            await AnalyticsRepository.add_receipts(session, -1, in_batch, Receipt.status == 'generated')
+            stale_receipts = select(Receipt.id).where(in_batch, Receipt.status == 'generated')
+            await session.execute(
+                delete(ReceiptItem).where(
+                    ReceiptItem.period >= start,
+                    ReceiptItem.period < end,
+                    ReceiptItem.receipt_id.in_(stale_receipts)
+                )
+            )
+            await session.execute(
+                delete(Receipt)
+                .where(in_batch, Receipt.status == 'generated')
+                .execution_options(synchronize_session=False)
+            )
+
+            skipped = await session.execute(select(func.count(Receipt.id)).where(in_batch))
+            receipts_skipped = skipped.scalar()
+
+            # Последнее показание по каждой услуге за месяц
+            latest = (
+                select(MeterReading.user_id, MeterReading.service_id, MeterReading.value)
+                .where(
+                    MeterReading.period >= start,
+                    MeterReading.period < end,
+                    MeterReading.user_id >= low,
+                    MeterReading.user_id < high
+                )
+                .distinct(MeterReading.user_id, MeterReading.service_id)
+                .order_by(
+                    MeterReading.user_id,
+                    MeterReading.service_id,
+                    MeterReading.reading_date.desc(),
+                    MeterReading.id.desc()
+                )
+                .cte('latest_readings')
+            )
+
+            item_amount = func.round(latest.c.value * UtilityService.rate, 2)
+            already_billed = exists().where(
+                Receipt.user_id == latest.c.user_id,
+                Receipt.period >= start,
+                Receipt.period < end
+            )
+
+            receipts_result = await session.execute(
+                insert(Receipt).from_select(
+                    ['user_id', 'total_amount', 'period', 'generated_date', 'status'],
+                    select(
+                        latest.c.user_id,
+                        func.sum(item_amount),
+                        literal(start),
+                        literal(generated_date),
+                        literal('generated')
+                    )
+                    .join(UtilityService, and_(
+                        UtilityService.id == latest.c.service_id,
+                        UtilityService.is_active == True
+                    ))
+                    .where(~already_billed)
+                    .group_by(latest.c.user_id)
+                )
+            )
+
+            # Элементы только что созданных квитанций
+            items_result = await session.execute(
+                insert(ReceiptItem).from_select(
+                    ['receipt_id', 'period', 'service_id', 'quantity', 'rate', 'amount'],
+                    select(
+                        Receipt.id,
+                        Receipt.period,
+                        latest.c.service_id,
+                        latest.c.value,
+                        UtilityService.rate,
+                        item_amount
+                    )
+                    .join(UtilityService, and_(
+                        UtilityService.id == latest.c.service_id,
+                        UtilityService.is_active == True
+                    ))
+                    .join(Receipt, and_(
+                        Receipt.user_id == latest.c.user_id,
+                        Receipt.period == start,
+                        Receipt.status == 'generated',
+                        Receipt.generated_date == generated_date
+                    ))
+                )
+            )
+
+            new_receipts = (in_batch, Receipt.status == 'generated', Receipt.generated_date == generated_date)
+            await SummaryRepository.adjust_unpaid_receipts(session, 1, *new_receipts)
+            await AnalyticsRepository.add_receipts(session, 1, *new_receipts)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+        return {
+            'receipts_generated': receipts_result.rowcount,
+            'items_generated': items_result.rowcount,
+            'receipts_skipped': receipts_skipped
+        }
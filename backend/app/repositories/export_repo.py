@@ -0,0 +1,131 @@
+# app/repositories/export_repo.py
+import csv
+import io
+import json
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, Select
+from app.models.payments import Payment, MeterReading, BalanceTransaction, UtilityService
+from typing import AsyncIterator, List, Optional, Sequence
+from datetime import datetime
+from decimal import Decimal
+
+# Сколько строк забирать с серверного курсора за один раз
+EXPORT_BATCH_SIZE = 1000
+
+def _plain(value):
+    """Значение ячейки для выгрузки (суммы отдаем строкой без потери точности)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def format_ndjson(columns: Sequence[str], rows: Sequence) -> str:
+    return ''.join(
+        json.dumps({column: _plain(value) for column, value in zip(columns, row)}, ensure_ascii=False) + '\n'
+        for row in rows
+    )
+
+def format_csv(columns: Sequence[str], rows: Sequence, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([['' if value is None else _plain(value) for value in row] for row in rows])
+    return buffer.getvalue()
+
+class ExportRepository:
+
+    @staticmethod
+    def payments_query(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> Select:
+        """Платежи для выгрузки"""
+        query = (
+            select(
+                Payment.id,
+                Payment.user_id,
+                Payment.service_id,
+                UtilityService.name.label('service_name'),
+                Payment.amount,
+                Payment.period,
+                Payment.status,
+                Payment.payment_date,
+                Payment.transaction_id
+            )
+            .join(UtilityService, UtilityService.id == Payment.service_id)
+            .order_by(Payment.id)
+        )
+        if start is not None:
+            query = query.where(Payment.period >= start, Payment.period < end)
+        if user_id is not None:
+            query = query.where(Payment.user_id == user_id)
+        return query
+
+    @staticmethod
+    def readings_query(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> Select:
+        """Показания счетчиков для выгрузки"""
+        query = (
+            select(
+                MeterReading.id,
+                MeterReading.user_id,
+                MeterReading.service_id,
+                UtilityService.name.label('service_name'),
+                MeterReading.value,
+                MeterReading.reading_date,
+                MeterReading.period
+            )
+            .join(UtilityService, UtilityService.id == MeterReading.service_id)
+            .order_by(MeterReading.id)
+        )
+        if start is not None:
+            query = query.where(MeterReading.period >= start, MeterReading.period < end)
+        if user_id is not None:
+            query = query.where(MeterReading.user_id == user_id)
+        return query
+
+    @staticmethod
+    def transactions_query(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> Select:
+        """Транзакции баланса для выгрузки (период - месяц даты транзакции)"""
+        query = (
+            select(
+                BalanceTransaction.id,
+                BalanceTransaction.user_id,
+                BalanceTransaction.amount,
+                BalanceTransaction.transaction_type,
+                BalanceTransaction.description,
+                BalanceTransaction.status,
+                BalanceTransaction.transaction_date,
+                BalanceTransaction.reference_id
+            )
+            .order_by(BalanceTransaction.id)
+        )
+        if start is not None:
+            query = query.where(
+                BalanceTransaction.transaction_date >= start,
+                BalanceTransaction.transaction_date < end
+            )
+        if user_id is not None:
+            query = query.where(BalanceTransaction.user_id == user_id)
+        return query
+
+    @staticmethod
+    async def stream_rows(
+        session: AsyncSession,
+        query: Select,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[List]:
+        """Читать результат серверным курсором пачками по batch_size строк"""
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
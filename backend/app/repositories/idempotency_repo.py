@@ -0,0 +1,127 @@
+# app/repositories/idempotency_repo.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from app.models.idempotency import IdempotencyKey
+from app.database import AsyncSessionLocal
+from typing import Optional
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Сколько хранится ответ для повторов с тем же ключом
+IDEMPOTENCY_TTL = timedelta(hours=float(os.getenv('IDEMPOTENCY_TTL_HOURS', '24')))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv('IDEMPOTENCY_PURGE_INTERVAL_SECONDS', '600'))
+
+class IdempotencyRepository:
+
+    @staticmethod
+    def request_hash(payload: dict) -> str:
+        """Хэш тела запроса: повтор с тем же ключом должен совпадать с оригиналом"""
+        body = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    async def get_response(
+        session: AsyncSession,
+        user_id: int,
+        scope: str,
+        key: str,
+        request_hash: str
+    ) -> Optional[JSONResponse]:
+        """Сохраненный ответ для ключа (один поиск по уникальному индексу).
+
+        Если ключ уже использован с другим телом запроса - 422.
+        """
+        result = await session.execute(
+            select(IdempotencyKey.status_code, IdempotencyKey.response_body, IdempotencyKey.request_hash)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at > datetime.utcnow()
+            )
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        # У ключей, сохраненных до появления хэша, request_hash пустой
+        if row.request_hash is not None and row.request_hash != request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Ключ идемпотентности уже использован с другими параметрами запроса"
+            )
+        return JSONResponse(
+            content=row.response_body,
+            status_code=row.status_code,
+            headers={'Idempotent-Replayed': 'true'}
+        )
+
+    @staticmethod
+    async def save_response(
+        session: AsyncSession,
+        user_id: int,
+        scope: str,
+        key: str,
+        request_hash: str,
+        response_body: dict,
+        status_code: int = 200
+    ) -> bool:
+        """Сохранить ответ в текущей транзакции (без коммита).
+
+        Возвращает False, если живой ответ для этого ключа уже сохранил
+        параллельный запрос - тогда вызывающий должен откатить свою работу
+        и отдать сохраненный ответ.
+        """
+        now = datetime.utcnow()
+        values = {
+            'user_id': user_id,
+            'scope': scope,
+            'key': key,
+            'request_hash': request_hash,
+            'status_code': status_code,
+            'response_body': response_body,
+            'created_at': now,
+            'expires_at': now + IDEMPOTENCY_TTL,
+        }
+        statement = insert(IdempotencyKey).values(**values)
+        result = await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=['user_id', 'scope', 'key'],
+                set_={column: statement.excluded[column] for column in values if column not in ('user_id', 'scope', 'key')},
+                # Просроченную запись можно переиспользовать
+                where=IdempotencyKey.expires_at <= now
+            )
+            .returning(IdempotencyKey.id)
+        )
+        return result.scalar_one_or_none() is not None
+
+    @staticmethod
+    async def purge_expired(session: AsyncSession) -> int:
+        """Удалить просроченные ключи"""
+        result = await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+        )
+        await session.commit()
+        return result.rowcount
+
+async def purge_expired_keys_forever(interval: float = IDEMPOTENCY_PURGE_INTERVAL) -> None:
+    """Фоновая очистка просроченных ключей"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as session:
+                await IdempotencyRepository.purge_expired(session)
+        except Exception as e:
+            logger.warning("Ошибка очистки ключей идемпотентности: %s", e)
@@ -0,0 +1,225 @@
+# app/repositories/import_repo.py
+import asyncio
+import csv
+import os
+import tempfile
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import text, update
+from app.database import AsyncSessionLocal
+from app.models.imports import ImportJob
+from app.models.users import Users
+from app.repositories.summary_repo import SummaryRepository
+from app.caches.services_cache import services_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Строк в одной пачке COPY и сколько ошибок по строкам хранить в задаче
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '10000'))
+IMPORT_MAX_STORED_ERRORS = 100
+
+READING_COLUMNS = ['user_id', 'service_id', 'value', 'reading_date', 'period']
+
+# Временная таблица загрузки: живет до конца транзакции импорта
+STAGING_TABLE = 'meter_readings_import'
+CREATE_STAGING_SQL = text(f"""
+    CREATE TEMP TABLE {STAGING_TABLE} (
+        user_id integer NOT NULL,
+        service_id integer NOT NULL,
+        value numeric(10, 2) NOT NULL,
+        reading_date timestamp NOT NULL,
+        period timestamp NOT NULL
+    ) ON COMMIT DROP
+""")
+# Перенос в meter_readings одним запросом; уже загруженные показания
+# (тот же пользователь, услуга, период и дата) повторно не вставляются.
+# Вставленные строки возвращаются для обновления сводок
+INSERT_FROM_STAGING_SQL = text(f"""
+    INSERT INTO meter_readings (user_id, service_id, value, reading_date, period)
+    SELECT DISTINCT s.user_id, s.service_id, s.value, s.reading_date, s.period
+    FROM {STAGING_TABLE} s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM meter_readings m
+        WHERE m.user_id = s.user_id
+          AND m.period = s.period
+          AND m.service_id = s.service_id
+          AND m.reading_date = s.reading_date
+    )
+    RETURNING user_id, service_id, value, reading_date, period
+""")
+
+class ImportRepository:
+
+    @staticmethod
+    async def save_upload(chunks: AsyncIterator[bytes]) -> str:
+        """Сохранить тело запроса во временный файл, не держа его в памяти.
+
+        Запись на диск идет в потоке, чтобы не блокировать цикл событий.
+        """
+        handle, path = tempfile.mkstemp(prefix='import_', suffix='.csv')
+        file = os.fdopen(handle, 'wb')
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await asyncio.to_thread(file.write, chunk)
+            await asyncio.to_thread(file.close)
+        except Exception:
+            file.close()
+            os.unlink(path)
+            raise
+        return path
+
+    @staticmethod
+    async def create_job(session: AsyncSession, kind: str, created_by: int, filename: Optional[str] = None) -> ImportJob:
+        job = ImportJob(kind=kind, status='pending', created_by=created_by, filename=filename, errors=[])
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+        return job
+
+    @staticmethod
+    async def get_job(session: AsyncSession, job_id: int) -> Optional[ImportJob]:
+        return await session.get(ImportJob, job_id)
+
+    @staticmethod
+    async def _update_job(session: AsyncSession, job_id: int, **values) -> None:
+        await session.execute(update(ImportJob).where(ImportJob.id == job_id).values(**values))
+        await session.commit()
+
+    @staticmethod
+    def _read_chunk(reader: csv.DictReader, size: int) -> List[Tuple[int, Dict]]:
+        chunk = []
+        for row in reader:
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= size:
+                break
+        return chunk
+
+    @staticmethod
+    def _parse_row(row: Dict, accounts: Dict[str, int], services: Dict[str, int]) -> Tuple:
+        """Строка CSV -> запись для COPY; ValueError с причиной, если строка некорректна.
+
+        Без reading_date датой показания считается начало периода: при
+        повторной загрузке того же файла дата совпадает и дубли отсекаются.
+        """
+        account = (row.get('account') or '').strip()
+        user_id = accounts.get(account)
+        if user_id is None:
+            raise ValueError(f"неизвестный лицевой счет '{account}'")
+        service_name = (row.get('service') or '').strip()
+        service_id = services.get(service_name)
+        if service_id is None:
+            raise ValueError(f"неизвестная или неактивная услуга '{service_name}'")
+        try:
+            value = Decimal((row.get('value') or '').strip().replace(',', '.'))
+        except InvalidOperation:
+            raise ValueError("некорректное значение показания")
+        if value < 0 or not value.is_finite():
+            raise ValueError("некорректное значение показания")
+        try:
+            period = datetime.fromisoformat((row.get('period') or '').strip())
+            reading_date = (row.get('reading_date') or '').strip()
+            reading_date = datetime.fromisoformat(reading_date) if reading_date else period
+        except ValueError:
+            raise ValueError("некорректная дата")
+        return (user_id, service_id, round(value, 2), reading_date.replace(tzinfo=None), period.replace(tzinfo=None))
+
+    @staticmethod
+    async def _map_accounts(session: AsyncSession, chunk: List[Tuple[int, Dict]]) -> Dict[str, int]:
+        """Лицевые счета (email) пачки -> id пользователей одним запросом"""
+        accounts = {(row.get('account') or '').strip() for _, row in chunk}
+        accounts.discard('')
+        if not accounts:
+            return {}
+        result = await session.execute(
+            select(Users.id, Users.email).where(Users.email.in_(accounts))
+        )
+        return {email: user_id for user_id, email in result.all()}
+
+    @staticmethod
+    async def _copy_readings(session: AsyncSession, records: List[Tuple]) -> None:
+        """Загрузить записи во временную таблицу импорта через asyncpg COPY"""
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            STAGING_TABLE, records=records, columns=READING_COLUMNS
+        )
+
+    @staticmethod
+    async def import_meter_readings(job_id: int, path: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> None:
+        """Фоновая загрузка CSV показаний (account,service,value,period[,reading_date]).
+
+        Весь файл загружается одной транзакцией: пачки по chunk_size
+        строк копируются (COPY) во временную таблицу, затем показания
+        переносятся в meter_readings одним INSERT ... SELECT. При ошибке
+        в БД ничего не остается, и файл можно загрузить заново без
+        дублей. Прогресс задачи пишется отдельной сессией.
+        """
+        processed = imported = rejected = 0
+        errors = []
+        async with AsyncSessionLocal() as session, AsyncSessionLocal() as job_session:
+            try:
+                await ImportRepository._update_job(job_session, job_id, status='running', started_at=datetime.utcnow())
+                services = {service.name: service.id for service in await services_cache.get_active(session)}
+                await session.execute(CREATE_STAGING_SQL)
+
+                with open(path, newline='', encoding='utf-8-sig') as file:
+                    reader = csv.DictReader(file)
+                    missing = {'account', 'service', 'value', 'period'} - set(reader.fieldnames or [])
+                    if missing:
+                        raise ValueError(f"В файле нет колонок: {', '.join(sorted(missing))}")
+
+                    while True:
+                        chunk = await asyncio.to_thread(ImportRepository._read_chunk, reader, chunk_size)
+                        if not chunk:
+                            break
+
+                        accounts = await ImportRepository._map_accounts(session, chunk)
+                        records = []
+                        for line_number, row in chunk:
+                            try:
+                                records.append(ImportRepository._parse_row(row, accounts, services))
+                            except ValueError as e:
+                                rejected += 1
+                                if len(errors) < IMPORT_MAX_STORED_ERRORS:
+                                    errors.append(f"строка {line_number}: {e}")
+
+                        if records:
+                            await ImportRepository._copy_readings(session, records)
+                        processed += len(chunk)
+
+                        await ImportRepository._update_job(
+                            job_session, job_id,
+                            rows_processed=processed,
+                            rows_rejected=rejected,
+                            errors=errors
+                        )
+
+                inserted = (await session.execute(INSERT_FROM_STAGING_SQL)).mappings().all()
+                imported = len(inserted)
+                # Сводки - одним событием по реально вставленным строкам, перед самым коммитом:
+                # их строки блокируются только до конца транзакции импорта
+                await SummaryRepository.merge_readings(session, inserted)
+                await session.commit()
+                await ImportRepository._update_job(
+                    job_session, job_id,
+                    status='completed',
+                    rows_imported=imported,
+                    finished_at=datetime.utcnow()
+                )
+            except Exception as e:
+                await session.rollback()
+                await job_session.rollback()
+                await ImportRepository._update_job(
+                    job_session, job_id,
+                    status='failed',
+                    error_message=str(e),
+                    errors=errors,
+                    finished_at=datetime.utcnow()
+                )
+            finally:
+                await asyncio.to_thread(os.unlink, path)
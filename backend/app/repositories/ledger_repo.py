@@ -0,0 +1,163 @@
+# app/repositories/ledger_repo.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import func, case, or_, literal, true, DateTime
+from sqlalchemy.engine import Row
+from app.models.users import Users
+from app.models.payments import BalanceTransaction
+from app.models.balances import BalanceSnapshot
+from typing import List, Optional
+from datetime import datetime
+
+def _signed_amount():
+    """Изменение баланса транзакцией: списания уменьшают баланс, остальные увеличивают"""
+    return case(
+        (BalanceTransaction.transaction_type == 'payment', -BalanceTransaction.amount),
+        else_=BalanceTransaction.amount
+    )
+
+def _latest_snapshot(until: Optional[datetime] = None, inclusive: bool = True):
+    """Последний снимок пользователя из внешнего запроса (не позже until или раньше until)"""
+    query = (
+        select(BalanceSnapshot.snapshot_date, BalanceSnapshot.balance)
+        .where(BalanceSnapshot.user_id == Users.id)
+        .order_by(BalanceSnapshot.snapshot_date.desc())
+        .limit(1)
+    )
+    if until is not None:
+        query = query.where(
+            BalanceSnapshot.snapshot_date <= until if inclusive else BalanceSnapshot.snapshot_date < until
+        )
+    return query.lateral('snapshot')
+
+def _ledger_balance(snapshot, until: Optional[datetime] = None):
+    """Снимок плюс проведенные транзакции после него (до until, если задан).
+
+    Транзакции читаются по индексу (user_id, transaction_date) только
+    начиная с даты снимка.
+    """
+    since = (
+        select(func.coalesce(func.sum(_signed_amount()), 0))
+        .where(
+            BalanceTransaction.user_id == Users.id,
+            BalanceTransaction.status == 'completed',
+            or_(snapshot.c.snapshot_date.is_(None), BalanceTransaction.transaction_date >= snapshot.c.snapshot_date)
+        )
+    )
+    if until is not None:
+        since = since.where(BalanceTransaction.transaction_date < until)
+    return func.coalesce(snapshot.c.balance, 0) + since.scalar_subquery()
+
+class LedgerRepository:
+    """Баланс по журналу balance_transactions и его сверка с users.balance.
+
+    Периодические снимки (manage.py snapshot-balances) ограничивают
+    пересчет: баланс на дату - ближайший снимок плюс транзакции после
+    него, без обхода всей истории.
+    """
+
+    @staticmethod
+    async def take_snapshots(session: AsyncSession, snapshot_date: datetime, low: int, high: int) -> int:
+        """Снимки на snapshot_date для пользователей с id в [low, high), с коммитом.
+
+        Каждый снимок считается от предыдущего снимка пользователя;
+        повторный запуск на ту же дату пересчитывает снимок.
+        """
+        previous = _latest_snapshot(snapshot_date, inclusive=False)
+        rows = (
+            select(
+                Users.id,
+                literal(snapshot_date, DateTime),
+                _ledger_balance(previous, snapshot_date),
+                literal(datetime.utcnow(), DateTime)
+            )
+            .outerjoin(previous, true())
+            .where(Users.id >= low, Users.id < high)
+        )
+        statement = insert(BalanceSnapshot).from_select(['user_id', 'snapshot_date', 'balance', 'created_at'], rows)
+        try:
+            result = await session.execute(statement.on_conflict_do_update(
+                index_elements=['user_id', 'snapshot_date'],
+                set_={'balance': statement.excluded.balance, 'created_at': statement.excluded.created_at}
+            ))
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        return result.rowcount
+
+    @staticmethod
+    async def take_all_snapshots(session: AsyncSession, snapshot_date: datetime, batch_size: int = 10000) -> int:
+        """Снимки всех пользователей пачками по диапазонам id"""
+        bounds = await session.execute(select(func.min(Users.id), func.max(Users.id)))
+        min_user_id, max_user_id = bounds.one()
+        await session.commit()
+        if min_user_id is None:
+            return 0
+
+        taken = 0
+        for low in range(min_user_id, max_user_id + 1, batch_size):
+            taken += await LedgerRepository.take_snapshots(session, snapshot_date, low, low + batch_size)
+        return taken
+
+    @staticmethod
+    async def get_balance_as_of(session: AsyncSession, user_id: int, as_of: datetime) -> Optional[Row]:
+        """Баланс по журналу на момент as_of (транзакции с датой < as_of).
+
+        Возвращает (user_id, balance, ledger_balance, snapshot_date) или None,
+        если пользователя нет; balance - текущее значение users.balance.
+        """
+        snapshot = _latest_snapshot(as_of)
+        result = await session.execute(
+            select(
+                Users.id.label('user_id'),
+                Users.balance,
+                _ledger_balance(snapshot, as_of).label('ledger_balance'),
+                snapshot.c.snapshot_date
+            )
+            .outerjoin(snapshot, true())
+            .where(Users.id == user_id)
+        )
+        return result.one_or_none()
+
+    @staticmethod
+    async def reconcile(session: AsyncSession, low: int, high: int) -> List[Row]:
+        """Пользователи с id в [low, high), у которых users.balance не совпадает с журналом.
+
+        Баланс и журнал читаются одним запросом: списание меняет их в
+        одной транзакции, поэтому параллельные оплаты расхождений не дают.
+        """
+        snapshot = _latest_snapshot()
+        balances = (
+            select(
+                Users.id.label('user_id'),
+                Users.balance,
+                _ledger_balance(snapshot).label('ledger_balance'),
+                snapshot.c.snapshot_date
+            )
+            .outerjoin(snapshot, true())
+            .where(Users.id >= low, Users.id < high)
+            .subquery()
+        )
+        result = await session.execute(
+            select(balances)
+            .where(func.coalesce(balances.c.balance, 0) != balances.c.ledger_balance)
+            .order_by(balances.c.user_id)
+        )
+        return result.all()
+
+    @staticmethod
+    async def reconcile_all(session: AsyncSession, batch_size: int = 10000) -> List[Row]:
+        """Сверить балансы всех пользователей пачками по диапазонам id"""
+        bounds = await session.execute(select(func.min(Users.id), func.max(Users.id)))
+        min_user_id, max_user_id = bounds.one()
+        if min_user_id is None:
+            return []
+
+        mismatches = []
+        for low in range(min_user_id, max_user_id + 1, batch_size):
+            mismatches.extend(await LedgerRepository.reconcile(session, low, low + batch_size))
+            # Не держим транзакцию открытой на все пачки
+            await session.commit()
+        return mismatches
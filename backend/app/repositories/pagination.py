@@ -0,0 +1,58 @@
+# app/repositories/pagination.py
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Размер страницы по умолчанию и верхняя граница для админских списков
+ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', '50'))
+ADMIN_MAX_PAGE_SIZE = int(os.getenv('ADMIN_MAX_PAGE_SIZE', '500'))
+
+def encode_cursor(*key: Any) -> str:
+    """Упаковать ключ последней строки страницы в непрозрачный курсор"""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _decode(cursor: str) -> list:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Некорректный курсор")
+    if not isinstance(values, list):
+        raise ValueError("Некорректный курсор")
+    return values
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Курсор по id"""
+    if not cursor:
+        return None
+    values = _decode(cursor)
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise ValueError("Некорректный курсор")
+    return values[0]
+
+def decode_period_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Курсор по (period, id)"""
+    if not cursor:
+        return None
+    values = _decode(cursor)
+    if len(values) != 2 or not isinstance(values[1], int):
+        raise ValueError("Некорректный курсор")
+    try:
+        return datetime.fromisoformat(values[0]), values[1]
+    except (ValueError, TypeError):
+        raise ValueError("Некорректный курсор")
+
+def split_page(rows: Sequence, limit: int, key: Callable[[Any], tuple]) -> Tuple[List, Optional[str]]:
+    """Отрезать лишнюю строку (запрашивается limit + 1) и построить курсор следующей страницы"""
+    items = list(rows[:limit])
+    if len(rows) > limit and items:
+        return items, encode_cursor(*key(items[-1]))
+    return items, None
@@ -2,11 +2,29 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
+from sqlalchemy import tuple_, update, func, insert
+from sqlalchemy.engine import Row
 from app.models.payments import Payment, UtilityService, MeterReading, Receipt
-from typing import List, Optional
+from app.repositories.summary_repo import SummaryRepository
+from app.repositories.analytics_repo import AnalyticsRepository
+from app.partitions import add_months, ensure_partitions
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
 
+# Колонки для списков: строки отдаются без ORM-объектов, услуга - из кэша справочника
+PAYMENT_COLUMNS = (
+    Payment.id, Payment.user_id, Payment.service_id, Payment.amount, Payment.status,
+    Payment.period, Payment.payment_date, Payment.transaction_id
+)
+READING_COLUMNS = (
+    MeterReading.id, MeterReading.user_id, MeterReading.service_id, MeterReading.value,
+    MeterReading.reading_date, MeterReading.period
+)
+RECEIPT_COLUMNS = (
+    Receipt.id, Receipt.user_id, Receipt.total_amount, Receipt.period, Receipt.generated_date, Receipt.status
+)
+
 class PaymentRepository:
     
     @staticmethod
@@ -17,14 +35,30 @@ class PaymentRepository:
         return result.scalars().all()
     
     @staticmethod
-    async def get_user_payments(session: AsyncSession, user_id: int) -> List[Payment]:
+    async def get_user_payments(session: AsyncSession, user_id: int) -> List[Row]:
         result = await session.execute(
-            select(Payment)
-            .options(selectinload(Payment.service))
+            select(*PAYMENT_COLUMNS)
             .where(Payment.user_id == user_id)
             .order_by(Payment.period.desc())
         )
-        return result.scalars().all()
+        return result.all()
+    
+    @staticmethod
+    async def get_payments_page(
+        session: AsyncSession,
+        after: Optional[Tuple[datetime, int]],
+        limit: int
+    ) -> List[Row]:
+        """Страница всех платежей по (period, id) в убывающем порядке (до limit + 1 строк)"""
+        query = (
+            select(*PAYMENT_COLUMNS)
+            .order_by(Payment.period.desc(), Payment.id.desc())
+            .limit(limit + 1)
+        )
+        if after is not None:
+            query = query.where(tuple_(Payment.period, Payment.id) < tuple_(*after))
+        result = await session.execute(query)
+        return result.all()
     
     @staticmethod
     async def create_payment(session: AsyncSession, payment_data: dict) -> Payment:
@@ -59,6 +93,36 @@ class PaymentRepository:
             await session.commit()
             await session.refresh(payment)
         return payment
+    
+    @staticmethod
+    async def complete_payment(session: AsyncSession, payment_id: int, user_id: int) -> Optional[Row]:
+        """Отметить платеж пользователя оплаченным без коммита.
+        
+        Возвращает (id, amount, period, service_id, service_name) или None, если платежа
+        нет, он чужой или уже обработан.
+        """
+        result = await session.execute(
+            update(Payment)
+            .where(
+                Payment.id == payment_id,
+                Payment.user_id == user_id,
+                Payment.status != 'completed',
+                UtilityService.id == Payment.service_id
+            )
+            .values(
+                status='completed',
+                payment_date=datetime.utcnow(),
+                transaction_id=func.concat('balance_', Payment.id)
+            )
+            .returning(
+                Payment.id, Payment.amount, Payment.period, Payment.service_id,
+                UtilityService.name.label('service_name')
+            )
+        )
+        payment = result.one_or_none()
+        if payment is not None:
+            await AnalyticsRepository.record_payment(session, user_id, payment.service_id, payment.period, payment.amount)
+        return payment
 
 class MeterReadingRepository:
     
@@ -70,19 +134,63 @@ class MeterReadingRepository:
             
         reading = MeterReading(**reading_data)
         session.add(reading)
+        await session.flush()
+        await SummaryRepository.merge_readings(session, [{
+            'user_id': reading.user_id,
+            'service_id': reading.service_id,
+            'value': reading.value,
+            'period': reading.period,
+            'reading_date': reading.reading_date
+        }])
         await session.commit()
         await session.refresh(reading)
         return reading
     
     @staticmethod
-    async def get_user_readings(session: AsyncSession, user_id: int) -> List[MeterReading]:
+    async def submit_readings_bulk(session: AsyncSession, readings: List[Dict]) -> List[int]:
+        """Сохранить пачку показаний многострочным INSERT ... RETURNING, вернуть id в порядке входа"""
+        if not readings:
+            return []
+        # Одна дата на пачку: ее же получит сводка пользователя
+        reading_date = datetime.utcnow()
+        rows = [
+            {**reading, 'value': Decimal(str(reading['value'])), 'reading_date': reading_date}
+            for reading in readings
+        ]
+        result = await session.execute(
+            insert(MeterReading).returning(MeterReading.id, sort_by_parameter_order=True),
+            rows
+        )
+        reading_ids = list(result.scalars().all())
+        await SummaryRepository.merge_readings(session, rows)
+        await session.commit()
+        return reading_ids
+    
+    @staticmethod
+    async def get_user_readings(session: AsyncSession, user_id: int) -> List[Row]:
         result = await session.execute(
-            select(MeterReading)
-            .options(selectinload(MeterReading.service))
+            select(*READING_COLUMNS)
             .where(MeterReading.user_id == user_id)
             .order_by(MeterReading.period.desc())
         )
-        return result.scalars().all()
+        return result.all()
+    
+    @staticmethod
+    async def get_readings_page(
+        session: AsyncSession,
+        after: Optional[Tuple[datetime, int]],
+        limit: int
+    ) -> List[Row]:
+        """Страница всех показаний по (period, id) в убывающем порядке (до limit + 1 строк)"""
+        query = (
+            select(*READING_COLUMNS)
+            .order_by(MeterReading.period.desc(), MeterReading.id.desc())
+            .limit(limit + 1)
+        )
+        if after is not None:
+            query = query.where(tuple_(MeterReading.period, MeterReading.id) < tuple_(*after))
+        result = await session.execute(query)
+        return result.all()
 
 class ReceiptRepository:
     
@@ -92,6 +200,10 @@ class ReceiptRepository:
         if 'total_amount' in receipt_data and isinstance(receipt_data['total_amount'], float):
             receipt_data['total_amount'] = Decimal(str(receipt_data['total_amount']))
             
+        # У receipts нет секции DEFAULT: секция года квитанции нужна до вставки
+        period = receipt_data['period']
+        await ensure_partitions(session, period, add_months(period, 1), tables=('receipts', 'receipt_items'))
+        
         receipt = Receipt(**receipt_data)
         session.add(receipt)
         await session.commit()
@@ -99,13 +211,68 @@ class ReceiptRepository:
         return receipt
     
     @staticmethod
-    async def get_user_receipts(session: AsyncSession, user_id: int) -> List[Receipt]:
+    async def mark_receipt_paid(session: AsyncSession, receipt_id: int, user_id: int) -> Optional[Row]:
+        """Отметить квитанцию пользователя оплаченной без коммита.
+        
+        Возвращает (id, total_amount, period) или None, если квитанции нет,
+        она чужая или уже оплачена.
+        """
+        result = await session.execute(
+            update(Receipt)
+            .where(Receipt.id == receipt_id, Receipt.user_id == user_id, Receipt.status != 'paid')
+            .values(status='paid')
+            .returning(Receipt.id, Receipt.total_amount, Receipt.period)
+        )
+        receipt = result.one_or_none()
+        if receipt is not None:
+            await SummaryRepository.record_receipt_paid(session, user_id, receipt.total_amount)
+            await AnalyticsRepository.record_receipt_paid(session, receipt.id)
+        return receipt
+    
+    @staticmethod
+    async def mark_matching_receipt_paid(
+        session: AsyncSession,
+        user_id: int,
+        period: datetime,
+        amount: Decimal
+    ) -> Optional[int]:
+        """Отметить оплаченной неоплаченную квитанцию за период с близкой суммой (без коммита)"""
+        # Сравниваем суммы с допуском (на случай округления)
+        target = (
+            select(Receipt.id)
+            .where(
+                Receipt.user_id == user_id,
+                Receipt.period == period,
+                Receipt.status == 'generated',
+                func.abs(Receipt.total_amount - amount) < 1
+            )
+            .order_by(Receipt.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        result = await session.execute(
+            update(Receipt)
+            # period - чтобы не обходить все секции; статус перепроверяется после
+            # блокировки строки, если квитанцию параллельно оплатили
+            .where(Receipt.id == target, Receipt.period == period, Receipt.status == 'generated')
+            .values(status='paid')
+            .returning(Receipt.id, Receipt.total_amount)
+        )
+        receipt = result.one_or_none()
+        if receipt is None:
+            return None
+        await SummaryRepository.record_receipt_paid(session, user_id, receipt.total_amount)
+        await AnalyticsRepository.record_receipt_paid(session, receipt.id)
+        return receipt.id
+    
+    @staticmethod
+    async def get_user_receipts(session: AsyncSession, user_id: int) -> List[Row]:
         result = await session.execute(
-            select(Receipt)
+            select(*RECEIPT_COLUMNS)
             .where(Receipt.user_id == user_id)
             .order_by(Receipt.period.desc())
         )
-        return result.scalars().all()
+        return result.all()
     
     @staticmethod
     async def get_utility_services(session: AsyncSession) -> List[UtilityService]:
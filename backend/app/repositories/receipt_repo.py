@@ -1,9 +1,12 @@
 # app/repositories/receipt_repo.py
+from collections import defaultdict
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from app.models.payments import Receipt, ReceiptItem
-from typing import List, Optional, Dict
+from sqlalchemy import and_, func, or_, case
+from sqlalchemy.engine import Row
+from app.models.payments import Receipt, ReceiptItem, UtilityService
+from typing import Any, List, Optional, Dict
 from datetime import datetime
 from decimal import Decimal
 
@@ -23,72 +26,159 @@ class ReceiptRepository:
         return result.scalar_one_or_none()
     
     @staticmethod
-    async def get_user_receipts_with_details(session: AsyncSession, user_id: int) -> List[Receipt]:
-        """Получить все квитанции пользователя с деталями"""
-        result = await session.execute(
-            select(Receipt)
-            .options(
-                selectinload(Receipt.receipt_items)
-                .selectinload(ReceiptItem.service)
+    async def get_user_receipts_with_details(session: AsyncSession, user_id: int) -> List[Dict]:
+        """Все квитанции пользователя с элементами (строки по колонкам, двумя запросами)"""
+        receipts_result = await session.execute(
+            select(
+                Receipt.id, Receipt.user_id, Receipt.total_amount, Receipt.period,
+                Receipt.generated_date, Receipt.status
             )
             .where(Receipt.user_id == user_id)
             .order_by(Receipt.period.desc())
         )
-        return result.scalars().all()
+        items_result = await session.execute(
+            select(
+                ReceiptItem.id, ReceiptItem.receipt_id, ReceiptItem.service_id,
+                ReceiptItem.quantity, ReceiptItem.rate, ReceiptItem.amount
+            )
+            .join(Receipt, and_(Receipt.id == ReceiptItem.receipt_id, Receipt.period == ReceiptItem.period))
+            .where(Receipt.user_id == user_id)
+            .order_by(ReceiptItem.id)
+        )
+        items_by_receipt = defaultdict(list)
+        for item in items_result.all():
+            items_by_receipt[item.receipt_id].append(item)
+        return [
+            {**receipt._mapping, 'receipt_items': items_by_receipt.get(receipt.id, [])}
+            for receipt in receipts_result.all()
+        ]
     
     @staticmethod
-    async def get_previous_receipt(session: AsyncSession, user_id: int, current_period: datetime) -> Optional[Receipt]:
-        """Получить предыдущую квитанцию для сравнения"""
-        result = await session.execute(
-            select(Receipt)
-            .options(
-                selectinload(Receipt.receipt_items)
-                .selectinload(ReceiptItem.service)
-            )
+    async def get_receipt_trend(
+        session: AsyncSession,
+        user_id: int,
+        receipt_id: int,
+        period: datetime,
+        periods: int
+    ) -> List[Row]:
+        """Потребление по услугам за квитанцию и periods - 1 предыдущих.
+        
+        Изменения относительно предыдущей квитанции считаются в том же
+        запросе оконной функцией LAG() по receipt_items каждой услуги.
+        Каждая строка несет и поля квитанции и элемента, чтобы из них
+        можно было собрать квитанции целиком; квитанция без элементов
+        дает одну строку с пустыми полями элемента (item_id is None).
+        Строки упорядочены от старых квитанций к новым.
+        """
+        receipts = (
+            select(Receipt.id, Receipt.period, Receipt.total_amount, Receipt.generated_date, Receipt.status)
             .where(
                 Receipt.user_id == user_id,
-                Receipt.period < current_period
+                or_(Receipt.id == receipt_id, Receipt.period < period)
             )
-            .order_by(Receipt.period.desc())
+            .order_by(Receipt.period.desc(), Receipt.id.desc())
+            .limit(periods)
+            .subquery('trend_receipts')
+        )
+        window = {
+            'partition_by': ReceiptItem.service_id,
+            'order_by': (receipts.c.period, receipts.c.id)
+        }
+        previous_quantity = func.lag(ReceiptItem.quantity).over(**window)
+        previous_amount = func.lag(ReceiptItem.amount).over(**window)
+        
+        result = await session.execute(
+            select(
+                receipts.c.id.label('receipt_id'),
+                receipts.c.period,
+                receipts.c.total_amount,
+                receipts.c.generated_date,
+                receipts.c.status,
+                ReceiptItem.id.label('item_id'),
+                ReceiptItem.service_id,
+                UtilityService.name.label('service_name'),
+                ReceiptItem.quantity,
+                ReceiptItem.rate,
+                ReceiptItem.amount,
+                previous_quantity.label('previous_quantity'),
+                (ReceiptItem.quantity - previous_quantity).label('quantity_change'),
+                (ReceiptItem.amount - previous_amount).label('amount_change'),
+                case(
+                    (previous_quantity > 0, (ReceiptItem.quantity - previous_quantity) * 100 / previous_quantity),
+                    else_=0
+                ).label('change_percentage')
+            )
+            .select_from(receipts)
+            .outerjoin(ReceiptItem, and_(ReceiptItem.receipt_id == receipts.c.id, ReceiptItem.period == receipts.c.period))
+            .outerjoin(UtilityService, UtilityService.id == ReceiptItem.service_id)
+            .order_by(receipts.c.period, receipts.c.id, UtilityService.name)
         )
-        return result.scalars().first()
+        return result.all()
     
     @staticmethod
-    async def compare_receipts(session: AsyncSession, receipt_id: int) -> Dict:
-        """Сравнить квитанцию с предыдущей"""
-        current_receipt = await ReceiptRepository.get_receipt_with_details(session, receipt_id)
-        if not current_receipt:
-            return {}
-        
-        previous_receipt = await ReceiptRepository.get_previous_receipt(
-            session, current_receipt.user_id, current_receipt.period
+    async def compare_receipts(
+        session: AsyncSession,
+        current_receipt: Row,
+        services: Dict[int, Any],
+        include_previous: bool = True
+    ) -> Dict:
+        """Сравнить квитанцию с предыдущей.
+
+        current_receipt - строка с полями квитанции. Обе квитанции и их
+        элементы собираются из одного запроса get_receipt_trend(periods=2),
+        услуги элементов берутся из справочника services
+        (services_cache.schemas_by_id).
+        """
+        rows = await ReceiptRepository.get_receipt_trend(
+            session, current_receipt.user_id, current_receipt.id, current_receipt.period, 2
         )
         
-        comparison_data = {
-            'current_receipt': current_receipt,
-            'previous_receipt': previous_receipt,
-            'consumption_changes': {}
-        }
-        
-        if previous_receipt:
-            # Сравниваем потребление по услугам
-            current_items = {item.service.name: item for item in current_receipt.receipt_items}
-            previous_items = {item.service.name: item for item in previous_receipt.receipt_items}
-            
-            for service_name, current_item in current_items.items():
-                if service_name in previous_items:
-                    previous_item = previous_items[service_name]
-                    
-                    quantity_change = float(current_item.quantity) - float(previous_item.quantity)
-                    amount_change = float(current_item.amount) - float(previous_item.amount)
-                    change_percentage = (quantity_change / float(previous_item.quantity)) * 100 if float(previous_item.quantity) > 0 else 0
-                    
-                    comparison_data['consumption_changes'][service_name] = {
-                        'quantity_change': quantity_change,
-                        'amount_change': amount_change,
-                        'change_percentage': change_percentage,
-                        'current_quantity': float(current_item.quantity),
-                        'previous_quantity': float(previous_item.quantity)
+        current = {**current_receipt._mapping, 'receipt_items': []}
+        previous = None
+        consumption_changes = {}
+        for row in rows:
+            if row.receipt_id == current_receipt.id:
+                receipt = current
+            else:
+                if previous is None:
+                    previous = {
+                        'id': row.receipt_id,
+                        'user_id': current_receipt.user_id,
+                        'total_amount': row.total_amount,
+                        'period': row.period,
+                        'generated_date': row.generated_date,
+                        'status': row.status,
+                        'receipt_items': []
                     }
+                receipt = previous
+            if row.item_id is None:
+                continue
+            receipt['receipt_items'].append({
+                'id': row.item_id,
+                'receipt_id': row.receipt_id,
+                'service_id': row.service_id,
+                'quantity': row.quantity,
+                'rate': row.rate,
+                'amount': row.amount,
+                'service': services.get(row.service_id)
+            })
+            if receipt is current and row.previous_quantity is not None:
+                # Сравниваем потребление по услугам
+                consumption_changes[row.service_name] = {
+                    'quantity_change': float(row.quantity_change),
+                    'amount_change': float(row.amount_change),
+                    'change_percentage': float(row.change_percentage),
+                    'current_quantity': float(row.quantity),
+                    'previous_quantity': float(row.previous_quantity)
+                }
+        
+        # Элементы - в порядке создания, как у квитанции из get_receipt_with_details
+        for receipt in (current, previous):
+            if receipt is not None:
+                receipt['receipt_items'].sort(key=lambda item: item['id'])
         
-        return comparison_data
+        return {
+            'current_receipt': current,
+            'previous_receipt': previous if include_previous else None,
+            'consumption_changes': consumption_changes
+        }
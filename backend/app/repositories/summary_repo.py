@@ -0,0 +1,293 @@
+# app/repositories/summary_repo.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import update, func, cast, or_, bindparam, String, Numeric, DateTime
+from sqlalchemy.engine import Row
+from app.models.users import Users
+from app.models.payments import Receipt, MeterReading, BalanceTransaction
+from app.models.summaries import UserSummary
+from typing import Dict, Iterable, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
+
+SUMMARY_COLUMNS = (
+    UserSummary.unpaid_receipts_count, UserSummary.unpaid_receipts_total,
+    UserSummary.last_payment_amount, UserSummary.last_payment_date, UserSummary.last_payment_description,
+    UserSummary.latest_readings, UserSummary.rebuilt_at, UserSummary.updated_at
+)
+
+def _reading_entry(value, period, reading_date):
+    """Элемент latest_readings: последнее показание по услуге"""
+    return func.jsonb_build_object('value', value, 'period', period, 'reading_date', reading_date)
+
+class SummaryRepository:
+    """Сводка пользователя для /dashboard/summary.
+
+    Строка создается полным расчетом (rebuild) при первом запросе сводки
+    или командой manage.py rebuild-summaries. Дальше ее поддерживают
+    события в тех же транзакциях, что и сами изменения: оплаты,
+    генерация квитанций, подача и загрузка показаний. События только
+    обновляют существующие строки - пользователей без сводки они не трогают.
+    """
+
+    @staticmethod
+    async def get_summary(session: AsyncSession, user_id: int) -> Optional[Row]:
+        """Баланс и сводка пользователя одним запросом по первичным ключам"""
+        result = await session.execute(
+            select(Users.id.label('user_id'), Users.balance, *SUMMARY_COLUMNS)
+            .outerjoin(UserSummary, UserSummary.user_id == Users.id)
+            .where(Users.id == user_id)
+        )
+        return result.one_or_none()
+
+    @staticmethod
+    async def rebuild(session: AsyncSession, low: int, high: int) -> int:
+        """Полностью пересчитать сводки пользователей с id в [low, high), с коммитом.
+
+        Недостающие строки сначала создаются и фиксируются, затем
+        блокируются на время расчета: событие, изменившее данные
+        параллельно, ждет блокировку и применяет свою поправку уже
+        поверх пересчитанных значений.
+        """
+        await session.execute(
+            insert(UserSummary)
+            .from_select(['user_id'], select(Users.id).where(Users.id >= low, Users.id < high))
+            .on_conflict_do_nothing(index_elements=['user_id'])
+        )
+        await session.commit()
+
+        try:
+            await session.execute(
+                select(UserSummary.id)
+                .where(UserSummary.user_id >= low, UserSummary.user_id < high)
+                .order_by(UserSummary.user_id)
+                .with_for_update()
+            )
+
+            unpaid = (
+                select(
+                    Receipt.user_id,
+                    func.count(Receipt.id).label('count'),
+                    func.sum(Receipt.total_amount).label('total')
+                )
+                .where(Receipt.user_id >= low, Receipt.user_id < high, Receipt.status != 'paid')
+                .group_by(Receipt.user_id)
+                .subquery()
+            )
+            last_payment = (
+                select(
+                    BalanceTransaction.user_id,
+                    BalanceTransaction.amount,
+                    BalanceTransaction.transaction_date,
+                    BalanceTransaction.description
+                )
+                .where(
+                    BalanceTransaction.user_id >= low,
+                    BalanceTransaction.user_id < high,
+                    BalanceTransaction.transaction_type == 'payment'
+                )
+                .distinct(BalanceTransaction.user_id)
+                .order_by(
+                    BalanceTransaction.user_id,
+                    BalanceTransaction.transaction_date.desc(),
+                    BalanceTransaction.id.desc()
+                )
+                .subquery()
+            )
+            # Последнее показание по каждой услуге - как при генерации квитанций
+            latest = (
+                select(
+                    MeterReading.user_id,
+                    MeterReading.service_id,
+                    MeterReading.value,
+                    MeterReading.period,
+                    MeterReading.reading_date
+                )
+                .where(MeterReading.user_id >= low, MeterReading.user_id < high)
+                .distinct(MeterReading.user_id, MeterReading.service_id)
+                .order_by(
+                    MeterReading.user_id,
+                    MeterReading.service_id,
+                    MeterReading.reading_date.desc(),
+                    MeterReading.id.desc()
+                )
+                .subquery()
+            )
+            readings = (
+                select(
+                    latest.c.user_id,
+                    func.jsonb_object_agg(
+                        cast(latest.c.service_id, String),
+                        _reading_entry(latest.c.value, latest.c.period, latest.c.reading_date)
+                    ).label('latest_readings')
+                )
+                .group_by(latest.c.user_id)
+                .subquery()
+            )
+            computed = (
+                select(
+                    Users.id.label('user_id'),
+                    func.coalesce(unpaid.c.count, 0).label('unpaid_receipts_count'),
+                    func.coalesce(unpaid.c.total, 0).label('unpaid_receipts_total'),
+                    last_payment.c.amount,
+                    last_payment.c.transaction_date,
+                    last_payment.c.description,
+                    func.coalesce(readings.c.latest_readings, func.jsonb_build_object()).label('latest_readings')
+                )
+                .outerjoin(unpaid, unpaid.c.user_id == Users.id)
+                .outerjoin(last_payment, last_payment.c.user_id == Users.id)
+                .outerjoin(readings, readings.c.user_id == Users.id)
+                .where(Users.id >= low, Users.id < high)
+                .subquery()
+            )
+
+            now = datetime.utcnow()
+            result = await session.execute(
+                update(UserSummary)
+                .where(UserSummary.user_id == computed.c.user_id)
+                .values(
+                    unpaid_receipts_count=computed.c.unpaid_receipts_count,
+                    unpaid_receipts_total=computed.c.unpaid_receipts_total,
+                    last_payment_amount=computed.c.amount,
+                    last_payment_date=computed.c.transaction_date,
+                    last_payment_description=computed.c.description,
+                    latest_readings=computed.c.latest_readings,
+                    rebuilt_at=now,
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        return result.rowcount
+
+    @staticmethod
+    async def rebuild_all(session: AsyncSession, batch_size: int = 10000) -> int:
+        """Пересчитать сводки всех пользователей пачками по диапазонам id"""
+        bounds = await session.execute(select(func.min(Users.id), func.max(Users.id)))
+        min_user_id, max_user_id = bounds.one()
+        await session.commit()
+        if min_user_id is None:
+            return 0
+
+        rebuilt = 0
+        for low in range(min_user_id, max_user_id + 1, batch_size):
+            rebuilt += await SummaryRepository.rebuild(session, low, low + batch_size)
+        return rebuilt
+
+    @staticmethod
+    async def record_payment(
+        session: AsyncSession,
+        user_id: int,
+        amount: Decimal,
+        description: Optional[str],
+        paid_at: datetime
+    ) -> None:
+        """Событие: списание с баланса стало последним платежом (без коммита)"""
+        await session.execute(
+            update(UserSummary)
+            .where(UserSummary.user_id == user_id)
+            .values(
+                last_payment_amount=amount,
+                last_payment_date=paid_at,
+                last_payment_description=description,
+                updated_at=paid_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def record_receipt_paid(session: AsyncSession, user_id: int, amount: Decimal) -> None:
+        """Событие: квитанция оплачена (без коммита)"""
+        await session.execute(
+            update(UserSummary)
+            .where(UserSummary.user_id == user_id)
+            .values(
+                unpaid_receipts_count=UserSummary.unpaid_receipts_count - 1,
+                unpaid_receipts_total=UserSummary.unpaid_receipts_total - amount,
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def adjust_unpaid_receipts(session: AsyncSession, sign: int, *criteria) -> None:
+        """Событие для пачки квитанций: прибавить (sign=1) или вычесть (sign=-1)
+        неоплаченные квитанции, отобранные criteria, из сводок их владельцев (без коммита)"""
+        totals = (
+            select(
+                Receipt.user_id,
+                func.count(Receipt.id).label('count'),
+                func.sum(Receipt.total_amount).label('total')
+            )
+            .where(Receipt.status != 'paid', *criteria)
+            .group_by(Receipt.user_id)
+            .subquery()
+        )
+        await session.execute(
+            update(UserSummary)
+            .where(UserSummary.user_id == totals.c.user_id)
+            .values(
+                unpaid_receipts_count=UserSummary.unpaid_receipts_count + sign * totals.c.count,
+                unpaid_receipts_total=UserSummary.unpaid_receipts_total + sign * totals.c.total,
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def merge_readings(session: AsyncSession, readings: Iterable[Dict]) -> None:
+        """Событие: новые показания (словари с user_id, service_id, value, period, reading_date).
+
+        По каждой услуге в сводку попадает самое позднее по reading_date
+        показание; более старое, чем уже записанное, сводку не меняет
+        (загрузка архива). Без коммита.
+        """
+        latest: Dict[Tuple[int, int], Dict] = {}
+        for reading in readings:
+            key = (reading['user_id'], reading['service_id'])
+            # При равных датах побеждает показание, вставленное позже
+            if key not in latest or reading['reading_date'] >= latest[key]['reading_date']:
+                latest[key] = reading
+        if not latest:
+            return
+
+        summaries = UserSummary.__table__
+        current = summaries.c.latest_readings.op('->')(bindparam('reading_key', type_=String))
+        reading_date = bindparam('reading_date', type_=DateTime)
+        now = datetime.utcnow()
+        # Core-таблица, а не модель: список параметров выполняется как executemany
+        await session.execute(
+            update(summaries)
+            .where(
+                summaries.c.user_id == bindparam('summary_user_id'),
+                or_(current.is_(None), cast(current.op('->>')('reading_date'), DateTime) <= reading_date)
+            )
+            .values(
+                latest_readings=summaries.c.latest_readings.op('||')(
+                    func.jsonb_build_object(
+                        bindparam('reading_key', type_=String),
+                        _reading_entry(
+                            bindparam('reading_value', type_=Numeric(10, 2)),
+                            bindparam('reading_period', type_=DateTime),
+                            reading_date
+                        )
+                    )
+                ),
+                updated_at=bindparam('summary_updated_at', type_=DateTime)
+            ),
+            [
+                {
+                    'summary_user_id': reading['user_id'],
+                    'reading_key': str(reading['service_id']),
+                    'reading_value': reading['value'],
+                    'reading_period': reading['period'],
+                    'reading_date': reading['reading_date'],
+                    'summary_updated_at': now
+                }
+                for reading in latest.values()
+            ]
+        )
@@ -1,19 +1,72 @@
 # app/repositories/user_repo.py
+import asyncio
+import hmac
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update
+from sqlalchemy.engine import Row
 from app.models.users import Users
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Стоимость bcrypt и число потоков для хеширования: bcrypt отпускает GIL,
+# поэтому проверка паролей в пуле не блокирует event loop
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+_dummy_hash: Optional[str] = None
+
+def _password_bytes(password: str) -> bytes:
+    # bcrypt учитывает только первые 72 байта; bcrypt>=5 требует обрезать их явно
+    return password.encode('utf-8')[:72]
+
+async def _in_hash_pool(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, function, *args)
 
 class UserRepository:
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Просто возвращаем пароль без хеширования"""
-        return password
+        """Хеш bcrypt (блокирует поток на время хеширования)"""
+        return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(BCRYPT_ROUNDS)).decode('ascii')
+
+    @staticmethod
+    def is_hashed(stored_password: str) -> bool:
+        return stored_password.startswith(('$2a$', '$2b$', '$2y$'))
+
+    @staticmethod
+    def needs_rehash(stored_password: str) -> bool:
+        """Пароль хранится открытым текстом или с другой стоимостью bcrypt"""
+        if not UserRepository.is_hashed(stored_password):
+            return True
+        return stored_password[4:6] != f'{BCRYPT_ROUNDS:02d}'
+
+    @staticmethod
+    def verify_password(plain_password: str, stored_password: str) -> bool:
+        """Сравнить пароль с хешем bcrypt или со старой записью открытым текстом"""
+        if UserRepository.is_hashed(stored_password):
+            try:
+                return bcrypt.checkpw(_password_bytes(plain_password), stored_password.encode('ascii'))
+            except ValueError:
+                return False
+        return hmac.compare_digest(plain_password.encode('utf-8'), stored_password.encode('utf-8'))
+
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        return await _in_hash_pool(UserRepository.hash_password, password)
 
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Просто сравниваем пароли без хеширования"""
-        return plain_password == hashed_password
+    async def verify_password_async(plain_password: str, stored_password: str) -> bool:
+        return await _in_hash_pool(UserRepository.verify_password, plain_password, stored_password)
         
     @staticmethod
     async def get_user_by_email(session: AsyncSession, email: str) -> Users | None:
@@ -25,19 +78,54 @@ class UserRepository:
         result = await session.execute(select(Users).where(Users.id == user_id))
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_users_page(session: AsyncSession, after_id: Optional[int], limit: int) -> List[Row]:
+        """Страница пользователей по id (возвращает до limit + 1 строк, без паролей)"""
+        query = (
+            select(
+                Users.id, Users.email, Users.full_name, Users.role,
+                Users.address, Users.phone, Users.balance
+            )
+            .order_by(Users.id)
+            .limit(limit + 1)
+        )
+        if after_id is not None:
+            query = query.where(Users.id > after_id)
+        result = await session.execute(query)
+        return result.all()
+    
     @staticmethod
     async def verify_user_credentials(session: AsyncSession, email: str, password: str) -> Users | None:
+        """Проверить email и пароль; старые открытые пароли перехешируются при входе"""
+        global _dummy_hash
         user = await UserRepository.get_user_by_email(session, email)
-        if user and UserRepository.verify_password(password, user.password):
-            return user
-        return None
+        if user is None:
+            # Тратим то же время, что и на проверку, чтобы не выдавать наличие email
+            if _dummy_hash is None:
+                _dummy_hash = await UserRepository.hash_password_async('dummy-password')
+            await UserRepository.verify_password_async(password, _dummy_hash)
+            return None
+
+        if not await UserRepository.verify_password_async(password, user.password):
+            return None
+
+        if UserRepository.needs_rehash(user.password):
+            old_password = user.password
+            new_password = await UserRepository.hash_password_async(password)
+            # Условие на старое значение: параллельный вход не перезапишет чужой хеш
+            await session.execute(
+                update(Users)
+                .where(Users.id == user.id, Users.password == old_password)
+                .values(password=new_password)
+            )
+            await session.commit()
+        return user
     
     @staticmethod
     async def create_user(session: AsyncSession, user_data: dict) -> Users:
-        # Сохраняем пароль как есть, без хеширования
         user = Users(
             email=user_data['email'],
-            password=user_data['password'],
+            password=await UserRepository.hash_password_async(user_data['password']),
             full_name=user_data['full_name'],
             role=user_data.get('role', 'user'),
             address=user_data.get('address'),
@@ -47,3 +135,28 @@ class UserRepository:
         await session.commit()
         await session.refresh(user)
         return user
+
+    @staticmethod
+    async def hash_plaintext_passwords(session: AsyncSession, batch_size: int = 100) -> int:
+        """Захешировать все пароли, которые еще хранятся открытым текстом"""
+        hashed = 0
+        last_id = 0
+        while True:
+            result = await session.execute(
+                select(Users.id, Users.password)
+                .where(Users.id > last_id, ~Users.password.startswith('$2'))
+                .order_by(Users.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                return hashed
+            hashes = await asyncio.gather(*[UserRepository.hash_password_async(password) for _, password in rows])
+            await session.execute(
+                update(Users),
+                [{'id': user_id, 'password': new_password} for (user_id, _), new_password in zip(rows, hashes)]
+            )
+            await session.commit()
+            hashed += len(rows)
+            last_id = rows[-1].id
+            logger.info("Захешировано паролей: %d", hashed)
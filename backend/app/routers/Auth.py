@@ -6,6 +6,7 @@ from sqlalchemy import select, func
 from app.schemas.users import UserCreateSchema, UserResponseSchema, UserLoginSchema
 from app.repositories.user_repo import UserRepository
 from app.models.users import Users
+from app.caches.user_cache import user_cache
 from fastapi import APIRouter, HTTPException, Response, Depends, status
 
 config = AuthXConfig()
@@ -53,13 +54,14 @@ async def get_current_user(db: AsyncSession = Depends(get_db),
             detail='Неверный токен'
         )
     
-    user = await UserRepository.get_user_by_id(db, int(user_id))
+    # Профиль отдается из кэша процесса; баланс сбрасывает кэш после коммита
+    profile = await user_cache.get_profile(db, int(user_id))
     
-    if not user:
+    if profile is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail='Пользователь не найден')
     
-    return UserResponseSchema.model_validate(user)
+    return Response(content=profile, media_type='application/json')
 
 @router.get('/Protected', dependencies=[Depends(security.access_token_required)])
 async def protected():
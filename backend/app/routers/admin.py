@@ -1,19 +1,31 @@
 # app/routers/admin.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy import func
-from app.database import get_db
+from app.database import get_db, get_read_db, get_pool_stats, get_read_sessionmaker
 from app.repositories.user_repo import UserRepository
 from app.repositories.payment_repo import PaymentRepository, MeterReadingRepository, ReceiptRepository
+from app.repositories.billing_repo import BillingRepository
+from app.repositories.export_repo import ExportRepository, format_csv, format_ndjson
+from app.caches.services_cache import services_cache
+from app.serialization import json_response, with_service
+from app.repositories.import_repo import ImportRepository
+from app.repositories.analytics_repo import AnalyticsRepository
+from app.repositories.ledger_repo import LedgerRepository
+from app.repositories.pagination import (
+    ADMIN_PAGE_SIZE, ADMIN_MAX_PAGE_SIZE, decode_id_cursor, decode_period_cursor, split_page
+)
 from app.schemas.payments import *
 from app.schemas.users import UserResponseSchema
+from app.schemas.pagination import CursorPageSchema
 from app.routers.Auth import security
 from app.models.users import Users
 from app.models.payments import Payment, MeterReading, UtilityService, Receipt
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(prefix='/admin', tags=['Admin'])
 
@@ -23,43 +35,62 @@ def require_admin(token_payload = Depends(security.access_token_required)):
         raise HTTPException(status_code=403, detail="Требуются права администратора")
     return token_payload
 
-@router.get('/users', response_model=List[UserResponseSchema])
+@router.get('/users', response_model=CursorPageSchema[UserResponseSchema])
 async def get_all_users(
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(require_admin)
 ):
-    """Получить список всех пользователей"""
-    result = await db.execute(select(Users))
-    users = result.scalars().all()
-    return [UserResponseSchema.model_validate(user) for user in users]
+    """Получить список пользователей (постранично по id)"""
+    try:
+        after_id = decode_id_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    users = await UserRepository.get_users_page(db, after_id, limit)
+    items, next_cursor = split_page(users, limit, lambda user: (user.id,))
+    return json_response(CursorPageSchema[UserResponseSchema], {'items': items, 'next_cursor': next_cursor})
 
-@router.get('/payments', response_model=List[PaymentResponseSchema])
+@router.get('/payments', response_model=CursorPageSchema[PaymentResponseSchema])
 async def get_all_payments(
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(require_admin)
 ):
-    """Получить все платежи"""
-    result = await db.execute(
-        select(Payment)
-        .options(selectinload(Payment.service))
-        .order_by(Payment.period.desc())
+    """Получить платежи (постранично по периоду, от новых к старым)"""
+    try:
+        after = decode_period_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    payments = await PaymentRepository.get_payments_page(db, after, limit)
+    items, next_cursor = split_page(payments, limit, lambda payment: (payment.period, payment.id))
+    return json_response(
+        CursorPageSchema[PaymentResponseSchema],
+        {'items': with_service(items, await services_cache.schemas_by_id(db)), 'next_cursor': next_cursor}
     )
-    payments = result.scalars().all()
-    return [PaymentResponseSchema.model_validate(payment) for payment in payments]
 
-@router.get('/meter-readings', response_model=List[MeterReadingResponseSchema])
+@router.get('/meter-readings', response_model=CursorPageSchema[MeterReadingResponseSchema])
 async def get_all_readings(
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(require_admin)
 ):
-    """Получить все показания счетчиков"""
-    result = await db.execute(
-        select(MeterReading)
-        .options(selectinload(MeterReading.service))
-        .order_by(MeterReading.period.desc())
+    """Получить показания счетчиков (постранично по периоду, от новых к старым)"""
+    try:
+        after = decode_period_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    readings = await MeterReadingRepository.get_readings_page(db, after, limit)
+    items, next_cursor = split_page(readings, limit, lambda reading: (reading.period, reading.id))
+    return json_response(
+        CursorPageSchema[MeterReadingResponseSchema],
+        {'items': with_service(items, await services_cache.schemas_by_id(db)), 'next_cursor': next_cursor}
     )
-    readings = result.scalars().all()
-    return [MeterReadingResponseSchema.model_validate(reading) for reading in readings]
 
 @router.get('/utility-services', response_model=List[UtilityServiceResponseSchema])
 async def get_all_utility_services(
@@ -67,11 +98,8 @@ async def get_all_utility_services(
     token_payload = Depends(require_admin)
 ):
     """Получить все услуги ЖКХ (включая неактивные) для админки"""
-    result = await db.execute(
-        select(UtilityService).order_by(UtilityService.is_active.desc(), UtilityService.name)
-    )
-    services = result.scalars().all()
-    return [UtilityServiceResponseSchema.model_validate(service) for service in services]
+    body, etag = await services_cache.serialized(db, active_only=False)
+    return Response(content=body, media_type='application/json', headers={'ETag': etag})
 
 @router.post('/utility-services', response_model=UtilityServiceResponseSchema)
 async def create_utility_service(
@@ -82,7 +110,9 @@ async def create_utility_service(
     """Создать услугу ЖКХ"""
     service = UtilityService(**service_data.model_dump())
     db.add(service)
+    await services_cache.notify(db)
     await db.commit()
+    services_cache.invalidate()
     await db.refresh(service)
     return UtilityServiceResponseSchema.model_validate(service)
 
@@ -102,7 +132,9 @@ async def update_utility_service(
     for field, value in service_data.model_dump().items():
         setattr(service, field, value)
     
+    await services_cache.notify(db)
     await db.commit()
+    services_cache.invalidate()
     await db.refresh(service)
     return UtilityServiceResponseSchema.model_validate(service)
 
@@ -126,22 +158,190 @@ async def delete_utility_service(
     payments_count = payments_count_result.scalar()
     readings_count = readings_count_result.scalar()
     
+    await services_cache.notify(db)
     if payments_count > 0 or readings_count > 0:
         # Вместо удаления делаем услугу неактивной
         service.is_active = False
         await db.commit()
+        services_cache.invalidate()
         return {"message": "Услуга деактивирована (есть связанные данные)"}
     else:
         # Если нет связанных данных - удаляем полностью
         await db.delete(service)
         await db.commit()
+        services_cache.invalidate()
         return {"message": "Услуга удалена"}
 
-@router.post('/generate-receipts')
+@router.get('/db/pool')
+async def get_db_pool_stats(token_payload = Depends(require_admin)):
+    """Состояние пула соединений с БД в этом воркере"""
+    return get_pool_stats()
+
+@router.post('/generate-receipts', response_model=ReceiptGenerationJobSchema, status_code=202)
 async def generate_receipts(
-    period: datetime,
+    generation_data: ReceiptGenerationSchema,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    token_payload = Depends(require_admin)
+):
+    """Сгенерировать квитанции для всех пользователей за период.
+
+    Генерация идет в фоне, прогресс - GET /admin/generate-receipts/{job_id}.
+    """
+    job = await BillingRepository.create_job(db, generation_data.period, int(token_payload.sub))
+    background_tasks.add_task(BillingRepository.run_generation_job, job.id, job.period)
+    return ReceiptGenerationJobSchema.model_validate(job)
+
+@router.get('/generate-receipts/{job_id}', response_model=ReceiptGenerationJobSchema)
+async def get_receipt_generation_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    token_payload = Depends(require_admin)
+):
+    """Состояние фоновой генерации квитанций"""
+    job = await BillingRepository.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Генерация не найдена")
+    return ReceiptGenerationJobSchema.model_validate(job)
+
+def _analytics_bounds(period_from: Optional[datetime], period_to: Optional[datetime]):
+    """Месяцы с period_from по period_to включительно -> [начало, конец)"""
+    start = BillingRepository.period_bounds(period_from)[0] if period_from else None
+    end = BillingRepository.period_bounds(period_to)[1] if period_to else None
+    return start, end
+
+@router.get('/analytics/services', response_model=List[ServicePeriodStatsSchema])
+async def get_service_analytics(
+    period_from: Optional[datetime] = None,
+    period_to: Optional[datetime] = None,
+    service_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    token_payload = Depends(require_admin)
+):
+    """Потребление и выручка по услугам помесячно (из агрегатов)"""
+    start, end = _analytics_bounds(period_from, period_to)
+    stats = await AnalyticsRepository.get_service_stats(db, start, end, service_id)
+    return json_response(List[ServicePeriodStatsSchema], with_service(stats, await services_cache.schemas_by_id(db)))
+
+@router.get('/analytics/debt', response_model=List[PeriodDebtStatsSchema])
+async def get_debt_analytics(
+    period_from: Optional[datetime] = None,
+    period_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db),
+    token_payload = Depends(require_admin)
+):
+    """Начисления и задолженность по квитанциям помесячно (из агрегатов)"""
+    start, end = _analytics_bounds(period_from, period_to)
+    stats = await AnalyticsRepository.get_debt_stats(db, start, end)
+    return json_response(List[PeriodDebtStatsSchema], stats)
+
+@router.get('/users/{user_id}/balance-ledger', response_model=BalanceLedgerSchema)
+async def get_user_balance_ledger(
+    user_id: int,
+    as_of: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db),
+    token_payload = Depends(require_admin)
+):
+    """Баланс пользователя по журналу транзакций на as_of (по умолчанию - сейчас)"""
+    as_of = (as_of or datetime.utcnow()).replace(tzinfo=None)
+    ledger = await LedgerRepository.get_balance_as_of(db, user_id, as_of)
+    if ledger is None:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    return BalanceLedgerSchema(as_of=as_of, **ledger._mapping)
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+def _export_response(query, export_format: str, filename: str) -> StreamingResponse:
+    """Потоковая выгрузка результата запроса в NDJSON или CSV"""
+    columns = list(query.selected_columns.keys())
+
+    async def generate():
+        # Сессия живет столько же, сколько ответ: зависимость get_db
+        # закрывается раньше, чем начинается отдача тела
+        session_factory = await get_read_sessionmaker()
+        async with session_factory() as session:
+            if export_format == 'csv':
+                yield format_csv(columns, [], header=True)
+            async for rows in ExportRepository.stream_rows(session, query):
+                if export_format == 'csv':
+                    yield format_csv(columns, rows)
+                else:
+                    yield format_ndjson(columns, rows)
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{export_format}"'}
+    )
+
+def _export_bounds(period: Optional[datetime]):
+    if period is None:
+        return None, None
+    return BillingRepository.period_bounds(period)
+
+@router.get('/export/payments')
+async def export_payments(
+    period: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    export_format: str = Query('ndjson', alias='format', pattern='^(ndjson|csv)$'),
+    token_payload = Depends(require_admin)
+):
+    """Выгрузить платежи (весь месяц period, опционально один пользователь)"""
+    start, end = _export_bounds(period)
+    return _export_response(ExportRepository.payments_query(start, end, user_id), export_format, 'payments')
+
+@router.get('/export/meter-readings')
+async def export_meter_readings(
+    period: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    export_format: str = Query('ndjson', alias='format', pattern='^(ndjson|csv)$'),
+    token_payload = Depends(require_admin)
+):
+    """Выгрузить показания счетчиков"""
+    start, end = _export_bounds(period)
+    return _export_response(ExportRepository.readings_query(start, end, user_id), export_format, 'meter_readings')
+
+@router.get('/export/balance-transactions')
+async def export_balance_transactions(
+    period: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    export_format: str = Query('ndjson', alias='format', pattern='^(ndjson|csv)$'),
+    token_payload = Depends(require_admin)
+):
+    """Выгрузить транзакции баланса"""
+    start, end = _export_bounds(period)
+    return _export_response(ExportRepository.transactions_query(start, end, user_id), export_format, 'balance_transactions')
+
+@router.post('/imports/meter-readings', response_model=ImportJobResponseSchema, status_code=202)
+async def import_meter_readings(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    filename: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    token_payload = Depends(require_admin)
+):
+    """Загрузить CSV показаний от поставщика (тело запроса - файл text/csv).
+
+    Колонки: account (email пользователя), service (название услуги),
+    value, period и необязательная reading_date. Загрузка идет в фоне,
+    прогресс - GET /admin/imports/{job_id}.
+    """
+    path = await ImportRepository.save_upload(request.stream())
+    job = await ImportRepository.create_job(db, 'meter_readings', int(token_payload.sub), filename)
+    background_tasks.add_task(ImportRepository.import_meter_readings, job.id, path)
+    return ImportJobResponseSchema.model_validate(job)
+
+@router.get('/imports/{job_id}', response_model=ImportJobResponseSchema)
+async def get_import_job(
+    job_id: int,
     db: AsyncSession = Depends(get_db),
     token_payload = Depends(require_admin)
 ):
-    """Сгенерировать квитанции для всех пользователей (заглушка)"""
-    return {"message": "Квитанции сгенерированы", "period": period}
+    """Состояние фоновой загрузки"""
+    job = await ImportRepository.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Загрузка не найдена")
+    return ImportJobResponseSchema.model_validate(job)
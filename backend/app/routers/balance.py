@@ -1,11 +1,14 @@
 # app/routers/balance.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.repositories.balance_repo import BalanceRepository
+from app.repositories.idempotency_repo import IdempotencyRepository
 from app.schemas.payments import BalanceDepositSchema, BalanceTransactionResponseSchema, BalanceInfoResponseSchema
 from app.routers.Auth import security
-from typing import List
+from app.metrics import DEPOSITS, DEPOSITS_AMOUNT
+from app.serialization import json_response
+from typing import List, Optional
 from decimal import Decimal
 
 router = APIRouter(prefix='/balance', tags=['Balance'])
@@ -29,11 +32,18 @@ async def get_my_balance(
 @router.post('/deposit')
 async def deposit_balance(
     deposit_data: BalanceDepositSchema,
+    idempotency_key: Optional[str] = Header(None, alias='Idempotency-Key', max_length=100),
     db: AsyncSession = Depends(get_db),
     token_payload = Depends(security.access_token_required)
 ):
     """Пополнить баланс"""
     user_id = int(token_payload.sub)
+    request_hash = IdempotencyRepository.request_hash(deposit_data.model_dump())
+    
+    if idempotency_key:
+        replay = await IdempotencyRepository.get_response(db, user_id, 'balance.deposit', idempotency_key, request_hash)
+        if replay:
+            return replay
     
     if deposit_data.amount <= 0:
         raise HTTPException(
@@ -42,39 +52,44 @@ async def deposit_balance(
         )
     
     try:
-        user = await BalanceRepository.deposit_balance(
+        new_balance = await BalanceRepository.deposit_balance(
             db, 
             user_id, 
             deposit_data.amount,  # передаем float, репозиторий конвертирует в Decimal
-            deposit_data.description
+            deposit_data.description,
+            commit=False
         )
-        
-        return {
-            "message": "Баланс успешно пополнен",
-            "new_balance": float(user.balance),  # Конвертируем Decimal в float
-            "deposited_amount": deposit_data.amount
-        }
-    
     except ValueError as e:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    
+    response = {
+        "message": "Баланс успешно пополнен",
+        "new_balance": float(new_balance),  # Конвертируем Decimal в float
+        "deposited_amount": deposit_data.amount
+    }
+    
+    # Ответ сохраняется в той же транзакции, что и пополнение
+    if idempotency_key and not await IdempotencyRepository.save_response(
+        db, user_id, 'balance.deposit', idempotency_key, request_hash, response
+    ):
+        await db.rollback()
+        return await IdempotencyRepository.get_response(db, user_id, 'balance.deposit', idempotency_key, request_hash)
+    
+    await db.commit()
+    DEPOSITS.inc()
+    DEPOSITS_AMOUNT.inc(deposit_data.amount)
+    return response
 
 @router.get('/transactions', response_model=List[BalanceTransactionResponseSchema])
 async def get_my_transactions(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(security.access_token_required)
 ):
     """Получить историю транзакций"""
     user_id = int(token_payload.sub)
     transactions = await BalanceRepository.get_user_transactions(db, user_id)
-    
-    # Конвертируем Decimal в float для каждого объекта
-    response_transactions = []
-    for transaction in transactions:
-        transaction_dict = BalanceTransactionResponseSchema.model_validate(transaction).dict()
-        transaction_dict['amount'] = float(transaction.amount)  # Конвертируем Decimal в float
-        response_transactions.append(transaction_dict)
-    
-    return response_transactions
+    return json_response(List[BalanceTransactionResponseSchema], transactions)
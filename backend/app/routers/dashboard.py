@@ -0,0 +1,50 @@
+# app/routers/dashboard.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.repositories.summary_repo import SummaryRepository
+from app.schemas.payments import DashboardSummarySchema
+from app.routers.Auth import security
+from app.caches.services_cache import services_cache
+from app.serialization import json_response
+
+router = APIRouter(prefix='/dashboard', tags=['Dashboard'])
+
+@router.get('/summary', response_model=DashboardSummarySchema)
+async def get_dashboard_summary(
+    db: AsyncSession = Depends(get_db),
+    token_payload = Depends(security.access_token_required)
+):
+    """Баланс, неоплаченные квитанции, последний платеж и показания одним чтением"""
+    user_id = int(token_payload.sub)
+    summary = await SummaryRepository.get_summary(db, user_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    
+    # Первый запрос пользователя: сводку считаем по истории один раз
+    if summary.rebuilt_at is None:
+        await SummaryRepository.rebuild(db, user_id, user_id + 1)
+        summary = await SummaryRepository.get_summary(db, user_id)
+    
+    services = await services_cache.schemas_by_id(db)
+    latest_readings = [
+        dict(reading, service_id=int(service_id), service=services.get(int(service_id)))
+        for service_id, reading in sorted(summary.latest_readings.items(), key=lambda item: int(item[0]))
+    ]
+    last_payment = None
+    if summary.last_payment_date is not None:
+        last_payment = {
+            'amount': summary.last_payment_amount,
+            'payment_date': summary.last_payment_date,
+            'description': summary.last_payment_description
+        }
+    
+    return json_response(DashboardSummarySchema, {
+        'user_id': user_id,
+        'balance': summary.balance or 0,
+        'unpaid_receipts_count': summary.unpaid_receipts_count,
+        'unpaid_receipts_total': summary.unpaid_receipts_total,
+        'last_payment': last_payment,
+        'latest_readings': latest_readings,
+        'updated_at': summary.updated_at
+    })
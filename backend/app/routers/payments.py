@@ -1,25 +1,31 @@
 # app/routers/payments.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.repositories.payment_repo import PaymentRepository, MeterReadingRepository, ReceiptRepository
 from app.repositories.balance_repo import BalanceRepository
+from app.repositories.idempotency_repo import IdempotencyRepository
+from app.caches.services_cache import services_cache
 from app.schemas.payments import *
 from app.routers.Auth import security
 from app.models.payments import Receipt
+from app.metrics import PAYMENTS, PAYMENTS_AMOUNT
+from app.serialization import json_response, with_service
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from decimal import Decimal
 from sqlalchemy.orm import selectinload
 
 router = APIRouter(prefix='/payments', tags=['Payments'])
 
 @router.get('/services', response_model=List[UtilityServiceResponseSchema])
-async def get_utility_services(db: AsyncSession = Depends(get_db)):
-    """Получить список услуг ЖКХ"""
-    services = await PaymentRepository.get_utility_services(db)
-    return [UtilityServiceResponseSchema.model_validate(service) for service in services]
+async def get_utility_services(request: Request, db: AsyncSession = Depends(get_db)):
+    """Получить список услуг ЖКХ (из кэша справочника)"""
+    body, etag = await services_cache.serialized(db, active_only=True)
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={'ETag': etag})
+    return Response(content=body, media_type='application/json', headers={'ETag': etag})
 
 @router.post('/submit-reading')
 async def submit_meter_reading(
@@ -35,35 +41,85 @@ async def submit_meter_reading(
     reading = await MeterReadingRepository.submit_reading(db, reading_dict)
     return {"message": "Показания успешно поданы", "reading_id": reading.id}
 
+@router.post('/submit-readings', response_model=MeterReadingBatchResultSchema)
+async def submit_meter_readings(
+    batch: MeterReadingBatchSchema,
+    db: AsyncSession = Depends(get_db),
+    token_payload = Depends(security.access_token_required)
+):
+    """Подать пачку показаний счетчиков (ошибки возвращаются по каждому показанию)"""
+    user_id = int(token_payload.sub)
+    
+    # Справочник услуг берем из кэша - проверка не ходит в базу
+    active_services = {service.id for service in await services_cache.get_active(db)}
+    
+    results = []
+    valid_rows = []
+    valid_indexes = []
+    seen = set()
+    for index, reading in enumerate(batch.readings):
+        if reading.service_id not in active_services:
+            error = "Услуга не найдена или неактивна"
+        elif reading.value < 0:
+            error = "Показание не может быть отрицательным"
+        elif (reading.service_id, reading.period) in seen:
+            error = "Повторное показание по услуге за период в этом запросе"
+        else:
+            error = None
+        
+        if error:
+            results.append(MeterReadingBatchItemResultSchema(index=index, error=error))
+            continue
+        
+        seen.add((reading.service_id, reading.period))
+        reading_dict = reading.model_dump()
+        reading_dict['user_id'] = user_id
+        valid_rows.append(reading_dict)
+        valid_indexes.append(index)
+    
+    reading_ids = await MeterReadingRepository.submit_readings_bulk(db, valid_rows)
+    results.extend(
+        MeterReadingBatchItemResultSchema(index=index, reading_id=reading_id)
+        for index, reading_id in zip(valid_indexes, reading_ids)
+    )
+    results.sort(key=lambda item: item.index)
+    
+    return MeterReadingBatchResultSchema(
+        message="Показания обработаны",
+        submitted=len(reading_ids),
+        failed=len(results) - len(reading_ids),
+        results=results
+    )
+
 @router.get('/my-payments', response_model=List[PaymentResponseSchema])
 async def get_my_payments(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(security.access_token_required)
 ):
     """Получить историю платежей пользователя"""
     user_id = int(token_payload.sub)
     payments = await PaymentRepository.get_user_payments(db, user_id)
-    return [PaymentResponseSchema.model_validate(payment) for payment in payments]
+    return json_response(List[PaymentResponseSchema], with_service(payments, await services_cache.schemas_by_id(db)))
 
 @router.get('/my-readings', response_model=List[MeterReadingResponseSchema])
 async def get_my_readings(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(security.access_token_required)
 ):
     """Получить показания пользователя"""
     user_id = int(token_payload.sub)
     readings = await MeterReadingRepository.get_user_readings(db, user_id)
-    return [MeterReadingResponseSchema.model_validate(reading) for reading in readings]
+    return json_response(List[MeterReadingResponseSchema], with_service(readings, await services_cache.schemas_by_id(db)))
 
 @router.get('/my-receipts', response_model=List[ReceiptResponseSchema])
 async def get_my_receipts(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(security.access_token_required)
 ):
     """Получить квитанции пользователя"""
     user_id = int(token_payload.sub)
     receipts = await ReceiptRepository.get_user_receipts(db, user_id)
-    return [ReceiptResponseSchema.model_validate(receipt) for receipt in receipts]
+    return json_response(List[ReceiptResponseSchema], receipts)
 
 @router.post('/create-payment')
 async def create_payment(
@@ -82,90 +138,72 @@ async def create_payment(
 @router.post('/process-payment')
 async def process_payment(
     payment_info: PaymentProcessingSchema,
+    idempotency_key: Optional[str] = Header(None, alias='Idempotency-Key', max_length=100),
     db: AsyncSession = Depends(get_db),
     token_payload = Depends(security.access_token_required)
 ):
-    """Обработать платеж с использованием баланса"""
+    """Обработать платеж с использованием баланса (одна транзакция)"""
     user_id = int(token_payload.sub)
+    request_hash = IdempotencyRepository.request_hash(payment_info.model_dump())
     
-    # Получаем информацию о платеже
-    payment = await PaymentRepository.get_payment_by_id(db, payment_info.payment_id)
-    if not payment:
-        raise HTTPException(status_code=404, detail="Платеж не найден")
-    
-    if payment.user_id != user_id:
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
+    if idempotency_key:
+        replay = await IdempotencyRepository.get_response(db, user_id, 'payments.process_payment', idempotency_key, request_hash)
+        if replay:
+            return replay
     
-    if payment.status == 'completed':
+    # Статус платежа меняется условным UPDATE: повторная обработка невозможна
+    payment = await PaymentRepository.complete_payment(db, payment_info.payment_id, user_id)
+    if not payment:
+        await db.rollback()
+        existing = await PaymentRepository.get_payment_by_id(db, payment_info.payment_id)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Платеж не найден")
+        if existing.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Доступ запрещен")
+        # Параллельный повтор с тем же ключом мог успеть провести платеж
+        if idempotency_key:
+            replay = await IdempotencyRepository.get_response(db, user_id, 'payments.process_payment', idempotency_key, request_hash)
+            if replay:
+                return replay
         raise HTTPException(status_code=400, detail="Платеж уже обработан")
     
-    # Проверяем баланс пользователя
-    user_balance = await BalanceRepository.get_user_balance(db, user_id)
-    
-    if user_balance < payment.amount:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Недостаточно средств на балансе. Требуется: {float(payment.amount)}, доступно: {float(user_balance)}"
-        )
-    
     try:
         # Списание средств с баланса
-        await BalanceRepository.withdraw_balance(
+        new_balance = await BalanceRepository.withdraw_balance(
             db,
             user_id,
-            float(payment.amount),  # Конвертируем Decimal в float
-            description=f"Оплата услуги: {payment.service.name if payment.service else 'Услуга'}",
-            reference_id=f"payment_{payment.id}"
+            payment.amount,
+            description=f"Оплата услуги: {payment.service_name or 'Услуга'}",
+            reference_id=f"payment_{payment.id}",
+            commit=False
         )
-        
-        # Обновление статуса платежа
-        await PaymentRepository.update_payment_status(
-            db, 
-            payment_info.payment_id, 
-            'completed', 
-            f"balance_{payment.id}"
-        )
-        
-        # ✅ АВТОМАТИЧЕСКОЕ ОБНОВЛЕНИЕ СТАТУСА КВИТАНЦИИ
-        # Ищем квитанцию по периоду и сумме (примерное соответствие)
-        result = await db.execute(
-            select(Receipt)
-            .where(
-                Receipt.user_id == user_id,
-                Receipt.period == payment.period,
-                Receipt.status == 'generated'
-            )
-        )
-        receipts = result.scalars().all()
-        
-        receipt_updated = False
-        if receipts:
-            # Находим наиболее подходящую квитанцию по сумме
-            target_receipt = None
-            for receipt in receipts:
-                # Сравниваем суммы с допуском (на случай округления)
-                if abs(float(receipt.total_amount) - float(payment.amount)) < 1.0:
-                    target_receipt = receipt
-                    break
-            
-            # Если нашли подходящую квитанцию - обновляем статус
-            if target_receipt:
-                target_receipt.status = 'paid'
-                receipt_updated = True
-                print(f"Статус квитанции {target_receipt.id} обновлен на 'paid'")
-        
-        await db.commit()
-        
-        return {
-            "message": "Платеж успешно обработан", 
-            "status": "completed",
-            "amount": float(payment.amount),
-            "payment_method": "balance",
-            "receipt_updated": receipt_updated
-        }
-    
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=await _withdraw_error_detail(db, user_id, payment.amount, e))
+    
+    # ✅ АВТОМАТИЧЕСКОЕ ОБНОВЛЕНИЕ СТАТУСА КВИТАНЦИИ
+    # Ищем квитанцию по периоду и сумме (примерное соответствие)
+    receipt_id = await ReceiptRepository.mark_matching_receipt_paid(db, user_id, payment.period, payment.amount)
+    
+    response = {
+        "message": "Платеж успешно обработан", 
+        "status": "completed",
+        "amount": float(payment.amount),
+        "payment_method": "balance",
+        "receipt_updated": receipt_id is not None,
+        "new_balance": float(new_balance)
+    }
+    
+    if idempotency_key and not await IdempotencyRepository.save_response(
+        db, user_id, 'payments.process_payment', idempotency_key, request_hash, response
+    ):
+        await db.rollback()
+        return await IdempotencyRepository.get_response(db, user_id, 'payments.process_payment', idempotency_key, request_hash)
+    
+    await db.commit()
+    PAYMENTS.inc(kind='payment')
+    PAYMENTS_AMOUNT.inc(payment.amount, kind='payment')
+    return response
 
 @router.post('/verify-receipt')
 async def verify_receipt(
@@ -191,7 +229,7 @@ async def verify_receipt(
         raise HTTPException(status_code=403, detail="Доступ запрещен")
     
     # Получаем АКТУАЛЬНЫЕ тарифы услуг
-    services = await PaymentRepository.get_utility_services(db)
+    services = await services_cache.get_active(db)
     service_rates = {service.id: service.rate for service in services}
     service_names = {service.id: service.name for service in services}
     service_units = {service.id: service.unit for service in services}
@@ -269,55 +307,72 @@ async def verify_receipt(
 @router.post('/pay-receipt')
 async def pay_receipt(
     payment_data: dict,
+    idempotency_key: Optional[str] = Header(None, alias='Idempotency-Key', max_length=100),
     db: AsyncSession = Depends(get_db),
     token_payload = Depends(security.access_token_required)
 ):
-    """Оплатить квитанцию через баланс"""
+    """Оплатить квитанцию через баланс (одна транзакция)"""
     user_id = int(token_payload.sub)
     receipt_id = payment_data.get('receipt_id')
+    request_hash = IdempotencyRepository.request_hash(payment_data)
     
-    # Получаем квитанцию
-    result = await db.execute(select(Receipt).where(Receipt.id == receipt_id))
-    receipt = result.scalar_one_or_none()
+    if idempotency_key:
+        replay = await IdempotencyRepository.get_response(db, user_id, 'payments.pay_receipt', idempotency_key, request_hash)
+        if replay:
+            return replay
     
+    # Статус квитанции меняется условным UPDATE: двойная оплата невозможна
+    receipt = await ReceiptRepository.mark_receipt_paid(db, receipt_id, user_id)
     if not receipt:
-        raise HTTPException(status_code=404, detail="Квитанция не найдена")
-    
-    if receipt.user_id != user_id:
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
-    
-    if receipt.status == 'paid':
+        await db.rollback()
+        result = await db.execute(select(Receipt.user_id).where(Receipt.id == receipt_id))
+        owner_id = result.scalar_one_or_none()
+        if owner_id is None:
+            raise HTTPException(status_code=404, detail="Квитанция не найдена")
+        if owner_id != user_id:
+            raise HTTPException(status_code=403, detail="Доступ запрещен")
+        # Параллельный повтор с тем же ключом мог успеть оплатить квитанцию
+        if idempotency_key:
+            replay = await IdempotencyRepository.get_response(db, user_id, 'payments.pay_receipt', idempotency_key, request_hash)
+            if replay:
+                return replay
         raise HTTPException(status_code=400, detail="Квитанция уже оплачена")
     
-    # Проверяем баланс
-    user_balance = await BalanceRepository.get_user_balance(db, user_id)
-    
-    if user_balance < receipt.total_amount:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Недостаточно средств на балансе. Требуется: {float(receipt.total_amount)}, доступно: {float(user_balance)}"
-        )
-    
     try:
         # Списание средств
-        await BalanceRepository.withdraw_balance(
+        new_balance = await BalanceRepository.withdraw_balance(
             db,
             user_id,
-            float(receipt.total_amount),
+            receipt.total_amount,
             description=f"Оплата квитанции за {receipt.period.strftime('%B %Y')}",
-            reference_id=f"receipt_{receipt.id}"
+            reference_id=f"receipt_{receipt.id}",
+            commit=False
         )
-        
-        # Обновляем статус квитанции
-        receipt.status = 'paid'
-        await db.commit()
-        
-        return {
-            "message": "Квитанция успешно оплачена",
-            "receipt_id": receipt.id,
-            "amount": float(receipt.total_amount),
-            "new_balance": float(user_balance - receipt.total_amount)
-        }
-    
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=await _withdraw_error_detail(db, user_id, receipt.total_amount, e))
+    
+    response = {
+        "message": "Квитанция успешно оплачена",
+        "receipt_id": receipt.id,
+        "amount": float(receipt.total_amount),
+        "new_balance": float(new_balance)
+    }
+    
+    if idempotency_key and not await IdempotencyRepository.save_response(
+        db, user_id, 'payments.pay_receipt', idempotency_key, request_hash, response
+    ):
+        await db.rollback()
+        return await IdempotencyRepository.get_response(db, user_id, 'payments.pay_receipt', idempotency_key, request_hash)
+    
+    await db.commit()
+    PAYMENTS.inc(kind='receipt')
+    PAYMENTS_AMOUNT.inc(receipt.total_amount, kind='receipt')
+    return response
+
+async def _withdraw_error_detail(db: AsyncSession, user_id: int, amount: Decimal, error: ValueError) -> str:
+    """Текст ошибки списания (баланс читается только на этом пути)"""
+    if str(error) != "Недостаточно средств на балансе":
+        return str(error)
+    user_balance = await BalanceRepository.get_user_balance(db, user_id)
+    return f"Недостаточно средств на балансе. Требуется: {float(amount)}, доступно: {float(user_balance)}"
@@ -1,10 +1,14 @@
 # app/routers/receipts.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from sqlalchemy import select
+from app.database import get_read_db
 from app.repositories.receipt_repo import ReceiptRepository
-from app.schemas.payments import ReceiptDetailResponseSchema, ReceiptComparisonSchema
+from app.schemas.payments import ReceiptDetailResponseSchema, ReceiptComparisonSchema, ReceiptTrendSchema, ReceiptTrendPointSchema
+from app.models.payments import Receipt
 from app.routers.Auth import security
+from app.caches.services_cache import services_cache
+from app.serialization import json_response, with_service
 from typing import List
 
 router = APIRouter(prefix='/receipts', tags=['Receipts'])
@@ -12,7 +16,7 @@ router = APIRouter(prefix='/receipts', tags=['Receipts'])
 @router.get('/{receipt_id}', response_model=ReceiptDetailResponseSchema)
 async def get_receipt_details(
     receipt_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(security.access_token_required)
 ):
     """Получить детальную информацию о квитанции"""
@@ -31,28 +35,77 @@ async def get_receipt_details(
 @router.get('/{receipt_id}/compare', response_model=ReceiptComparisonSchema)
 async def compare_receipts(
     receipt_id: int,
-    db: AsyncSession = Depends(get_db),
+    include_previous: bool = True,
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(security.access_token_required)
 ):
     """Сравнить квитанцию с предыдущей"""
     user_id = int(token_payload.sub)
     
     # Проверяем доступ к квитанции
-    receipt = await ReceiptRepository.get_receipt_with_details(db, receipt_id)
+    result = await db.execute(
+        select(
+            Receipt.id, Receipt.user_id, Receipt.total_amount, Receipt.period,
+            Receipt.generated_date, Receipt.status
+        )
+        .where(Receipt.id == receipt_id)
+    )
+    receipt = result.one_or_none()
+    if not receipt or (receipt.user_id != user_id and token_payload.role != 'admin'):
+        raise HTTPException(status_code=404, detail="Квитанция не найдена")
+    
+    services = await services_cache.schemas_by_id(db)
+    comparison_data = await ReceiptRepository.compare_receipts(db, receipt, services, include_previous)
+    
+    return json_response(ReceiptComparisonSchema, comparison_data)
+
+@router.get('/{receipt_id}/trend', response_model=ReceiptTrendSchema)
+async def get_receipt_trend(
+    receipt_id: int,
+    periods: int = Query(6, ge=2, le=36),
+    db: AsyncSession = Depends(get_read_db),
+    token_payload = Depends(security.access_token_required)
+):
+    """Динамика потребления по услугам за последние periods квитанций"""
+    user_id = int(token_payload.sub)
+    
+    result = await db.execute(select(Receipt.user_id, Receipt.period).where(Receipt.id == receipt_id))
+    receipt = result.one_or_none()
     if not receipt or (receipt.user_id != user_id and token_payload.role != 'admin'):
         raise HTTPException(status_code=404, detail="Квитанция не найдена")
     
-    comparison_data = await ReceiptRepository.compare_receipts(db, receipt_id)
+    rows = await ReceiptRepository.get_receipt_trend(db, receipt.user_id, receipt_id, receipt.period, periods)
+    
+    trend_periods = []
+    services = {}
+    for row in rows:
+        if row.item_id is None:
+            # Квитанция без элементов потребления не показывает
+            continue
+        if not trend_periods or trend_periods[-1] != row.period:
+            trend_periods.append(row.period)
+        services.setdefault(row.service_name, []).append(ReceiptTrendPointSchema(
+            receipt_id=row.receipt_id,
+            period=row.period,
+            quantity=float(row.quantity),
+            amount=float(row.amount),
+            quantity_change=float(row.quantity_change) if row.previous_quantity is not None else None,
+            amount_change=float(row.amount_change) if row.previous_quantity is not None else None,
+            change_percentage=float(row.change_percentage) if row.previous_quantity is not None else None
+        ))
     
-    return ReceiptComparisonSchema(**comparison_data)
+    return ReceiptTrendSchema(receipt_id=receipt_id, periods=trend_periods, services=services)
 
 @router.get('/user/my-receipts-detailed', response_model=List[ReceiptDetailResponseSchema])
 async def get_my_receipts_detailed(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token_payload = Depends(security.access_token_required)
 ):
     """Получить все квитанции пользователя с деталями"""
     user_id = int(token_payload.sub)
     
     receipts = await ReceiptRepository.get_user_receipts_with_details(db, user_id)
-    return [ReceiptDetailResponseSchema.model_validate(receipt) for receipt in receipts]
+    services = await services_cache.schemas_by_id(db)
+    for receipt in receipts:
+        receipt['receipt_items'] = with_service(receipt['receipt_items'], services)
+    return json_response(List[ReceiptDetailResponseSchema], receipts)
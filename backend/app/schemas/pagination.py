@@ -0,0 +1,9 @@
+# app/schemas/pagination.py
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+class CursorPageSchema(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None  # None - страниц больше нет
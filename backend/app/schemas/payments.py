@@ -1,5 +1,5 @@
 # app/schemas/payments.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, Optional, List
 from datetime import datetime
 from decimal import Decimal
@@ -26,6 +26,20 @@ class MeterReadingCreateSchema(BaseModel):
     value: float  # Frontend отправляет float
     period: datetime
 
+class MeterReadingBatchSchema(BaseModel):
+    readings: List[MeterReadingCreateSchema] = Field(min_length=1, max_length=5000)
+
+class MeterReadingBatchItemResultSchema(BaseModel):
+    index: int  # Позиция показания в запросе
+    reading_id: Optional[int] = None
+    error: Optional[str] = None
+
+class MeterReadingBatchResultSchema(BaseModel):
+    message: str
+    submitted: int
+    failed: int
+    results: List[MeterReadingBatchItemResultSchema]
+
 class MeterReadingResponseSchema(BaseModel):
     id: int
     user_id: int
@@ -100,6 +114,55 @@ class ReceiptComparisonSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class ReceiptGenerationSchema(BaseModel):
+    period: datetime  # Любая дата внутри расчетного месяца
+
+class ReceiptGenerationJobSchema(BaseModel):
+    id: int
+    period: datetime  # Начало расчетного месяца
+    status: str  # 'pending', 'running', 'completed', 'failed'
+    receipts_generated: int
+    items_generated: int
+    receipts_skipped: int  # Уже оплаченные или проверенные квитанции
+    error_message: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class ReceiptTrendPointSchema(BaseModel):
+    receipt_id: int
+    period: datetime
+    quantity: float
+    amount: float
+    quantity_change: Optional[float] = None  # None для первой квитанции в ряду
+    amount_change: Optional[float] = None
+    change_percentage: Optional[float] = None
+
+class ReceiptTrendSchema(BaseModel):
+    receipt_id: int
+    periods: List[datetime]  # Периоды квитанций от старых к новым
+    services: Dict[str, List[ReceiptTrendPointSchema]] = {}
+
+class ImportJobResponseSchema(BaseModel):
+    id: int
+    kind: str
+    status: str  # 'pending', 'running', 'completed', 'failed'
+    filename: Optional[str]
+    rows_processed: int
+    rows_imported: int  # Известно после завершения: файл загружается одной транзакцией
+    rows_rejected: int
+    errors: List[str] = []
+    error_message: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
 class PaymentProcessingSchema(BaseModel):
     payment_id: int
     card_number: str
@@ -160,3 +223,57 @@ class VerificationResult(BaseModel):
     calculation_details: List[Dict]
     receipt_status: str
     rate_info: RateInfoSchema
+
+# Сводка для главной страницы
+class LastPaymentSchema(BaseModel):
+    amount: float
+    payment_date: datetime
+    description: Optional[str] = None
+
+class LatestReadingSchema(BaseModel):
+    service_id: int
+    value: float
+    period: datetime
+    reading_date: datetime
+    service: Optional[UtilityServiceResponseSchema] = None
+
+class DashboardSummarySchema(BaseModel):
+    user_id: int
+    balance: float
+    currency: str = "RUB"
+    unpaid_receipts_count: int
+    unpaid_receipts_total: float
+    last_payment: Optional[LastPaymentSchema] = None
+    latest_readings: List[LatestReadingSchema] = []  # По одному на услугу
+    updated_at: Optional[datetime] = None
+
+# Отчеты администратора по агрегатам
+class ServicePeriodStatsSchema(BaseModel):
+    service_id: int
+    period: datetime
+    consumption: float
+    billed_amount: float
+    paid_amount: float  # Оплаченная часть начислений по квитанциям
+    payments_count: int
+    payments_amount: float  # Проведенные платежи по услуге
+    service: Optional[UtilityServiceResponseSchema] = None
+
+class PeriodDebtStatsSchema(BaseModel):
+    period: datetime
+    receipts_count: int
+    billed_total: float
+    unpaid_count: int
+    unpaid_total: float  # Задолженность по квитанциям месяца
+
+    class Config:
+        from_attributes = True
+
+class BalanceLedgerSchema(BaseModel):
+    user_id: int
+    as_of: datetime
+    balance: float  # Текущее значение users.balance
+    ledger_balance: float  # Баланс по журналу транзакций на as_of
+    snapshot_date: Optional[datetime] = None  # Снимок, от которого считали
+
+    class Config:
+        from_attributes = True
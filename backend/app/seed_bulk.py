@@ -0,0 +1,179 @@
+# app/seed_bulk.py
+"""Генератор большого синтетического набора данных для нагрузочных тестов.
+
+Использует справочник услуг, шаблоны потребления и вариацию из seed_data.
+Данные пишутся через asyncpg COPY пачками пользователей; при одинаковом
+seed содержимое набора повторяется (id зависят от состояния
+последовательностей). COPY обходит события репозиториев, поэтому
+агрегаты аналитики за месяцы набора в конце пересчитываются.
+
+    uv run python manage.py generate-dataset --users 100000 --months 12 --seed 42
+"""
+import random
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from app.models.payments import UtilityService
+from app.models.users import Users
+from app.repositories.user_repo import UserRepository
+from app.repositories.analytics_repo import AnalyticsRepository
+from app.partitions import add_months, ensure_partitions
+from app.seed_data import UTILITY_SERVICES_DATA, CONSUMPTION_PATTERNS, vary_quantity
+from typing import Dict, List, Sequence, Tuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Услуги со счетчиками: по ним подаются показания и создаются платежи
+METERED_SERVICES = ["Электроэнергия", "Водоснабжение", "Отопление", "Газоснабжение"]
+
+def month_starts(end_period: datetime, months: int) -> List[datetime]:
+    """months первых чисел месяцев, заканчивая месяцем end_period"""
+    year, month = end_period.year, end_period.month
+    periods = []
+    for _ in range(months):
+        periods.append(datetime(year, month, 1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return list(reversed(periods))
+
+async def _reserve_ids(session: AsyncSession, table: str, count: int) -> List[int]:
+    """Забрать count значений из последовательности id таблицы"""
+    if count == 0:
+        return []
+    result = await session.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+        {'table': table, 'count': count}
+    )
+    return list(result.scalars().all())
+
+async def _copy(session: AsyncSession, table: str, columns: Sequence[str], records: List[Tuple]) -> None:
+    if not records:
+        return
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(table, records=records, columns=list(columns))
+
+async def _ensure_services(session: AsyncSession) -> Dict[str, Tuple[int, Decimal]]:
+    """Справочник услуг (создается из seed_data, если пуст): имя -> (id, тариф)"""
+    result = await session.execute(select(UtilityService.name, UtilityService.id, UtilityService.rate))
+    services = {name: (service_id, rate) for name, service_id, rate in result.all()}
+    if not services:
+        session.add_all([UtilityService(**service_data) for service_data in UTILITY_SERVICES_DATA])
+        await session.commit()
+        return await _ensure_services(session)
+    return services
+
+async def generate_dataset(
+    session: AsyncSession,
+    users: int,
+    months: int,
+    seed: int = 42,
+    end_period: datetime = datetime(2024, 12, 1),
+    chunk_size: int = 1000
+) -> Dict[str, int]:
+    """Создать users пользователей с историей за months месяцев"""
+    email_prefix = f'load-{seed}-'
+    existing = await session.execute(select(Users.id).where(Users.email == f'{email_prefix}0@example.com'))
+    if existing.first() is not None:
+        raise ValueError(f"Набор с seed={seed} уже загружен")
+
+    services = await _ensure_services(session)
+    patterns = list(CONSUMPTION_PATTERNS.values())
+    periods = month_starts(end_period, months)
+    password = UserRepository.hash_password('loadtest')
+    rng = random.Random(seed)
+
+    # Секции на весь диапазон набора (пополнения - за день до первого месяца)
+    await ensure_partitions(session, add_months(periods[0], -1), add_months(periods[-1], 1))
+    await session.commit()
+
+    totals = {'users': 0, 'meter_readings': 0, 'receipts': 0, 'receipt_items': 0, 'payments': 0, 'balance_transactions': 0}
+    started = time.perf_counter()
+
+    for chunk_start in range(0, users, chunk_size):
+        chunk_users = min(chunk_size, users - chunk_start)
+        user_ids = await _reserve_ids(session, 'users', chunk_users)
+        receipt_ids = iter(await _reserve_ids(session, 'receipts', chunk_users * months))
+
+        user_rows, reading_rows, receipt_rows, item_rows, payment_rows, transaction_rows = [], [], [], [], [], []
+        for offset, user_id in enumerate(user_ids):
+            number = chunk_start + offset
+            # Шаблон семьи, масштабированный под размер квартиры
+            household = Decimal(str(round(rng.uniform(0.6, 1.6), 2)))
+            pattern = {
+                name: Decimal(str(base)) * (household if name != "Вывоз ТБО" else 1)
+                for name, base in rng.choice(patterns).items()
+                if name in services
+            }
+
+            paid_total = Decimal('0.0')
+            for index, period in enumerate(periods):
+                receipt_id = next(receipt_ids)
+                # Последний месяц не оплачен, остальные - почти все оплачены
+                is_paid = index < len(periods) - 1 and rng.random() < 0.9
+                total_amount = Decimal('0.0')
+
+                for name, base_quantity in pattern.items():
+                    service_id, rate = services[name]
+                    quantity = vary_quantity(base_quantity, rng)
+                    amount = round(quantity * rate, 2)
+                    total_amount += amount
+                    item_rows.append((receipt_id, period, service_id, quantity, rate, amount))
+
+                    if name in METERED_SERVICES:
+                        reading_rows.append((user_id, service_id, quantity, period + timedelta(days=rng.randint(0, 4)), period))
+                        if is_paid:
+                            payment_rows.append((
+                                user_id, service_id, amount, period, 'completed',
+                                period + timedelta(days=5), f'txn_{user_id}_{service_id}_{period:%Y%m}'
+                            ))
+
+                receipt_rows.append((
+                    receipt_id, user_id, total_amount, period, period + timedelta(days=2),
+                    'paid' if is_paid else 'generated', None, None
+                ))
+                if is_paid:
+                    paid_total += total_amount
+                    transaction_rows.append((
+                        user_id, total_amount, 'payment', f"Оплата квитанции за {period:%m.%Y}", 'completed',
+                        period + timedelta(days=5), f'receipt_{receipt_id}'
+                    ))
+
+            # Пополнение покрывает все оплаты, так что баланс совпадает с журналом
+            deposit = paid_total + Decimal(str(rng.randrange(0, 5000)))
+            transaction_rows.append((
+                user_id, deposit, 'deposit', 'Начальное пополнение баланса', 'completed',
+                periods[0] - timedelta(days=1), None
+            ))
+            user_rows.append((
+                user_id, f'{email_prefix}{number}@example.com', password, f'Нагрузочный Пользователь {number}',
+                'user', f'ул. Тестовая, д. {number // 100 + 1}, кв. {number % 100 + 1}', None, deposit - paid_total
+            ))
+
+        await _copy(session, 'users', ['id', 'email', 'password', 'full_name', 'role', 'address', 'phone', 'balance'], user_rows)
+        await _copy(session, 'receipts', ['id', 'user_id', 'total_amount', 'period', 'generated_date', 'status', 'verified_amount', 'verification_date'], receipt_rows)
+        await _copy(session, 'receipt_items', ['receipt_id', 'period', 'service_id', 'quantity', 'rate', 'amount'], item_rows)
+        await _copy(session, 'meter_readings', ['user_id', 'service_id', 'value', 'reading_date', 'period'], reading_rows)
+        await _copy(session, 'payments', ['user_id', 'service_id', 'amount', 'period', 'status', 'payment_date', 'transaction_id'], payment_rows)
+        await _copy(session, 'balance_transactions', ['user_id', 'amount', 'transaction_type', 'description', 'status', 'transaction_date', 'reference_id'], transaction_rows)
+        await session.commit()
+
+        totals['users'] += len(user_rows)
+        totals['receipts'] += len(receipt_rows)
+        totals['receipt_items'] += len(item_rows)
+        totals['meter_readings'] += len(reading_rows)
+        totals['payments'] += len(payment_rows)
+        totals['balance_transactions'] += len(transaction_rows)
+        print(
+            f"Пользователей: {totals['users']}/{users}, квитанций: {totals['receipts']} "
+            f"({time.perf_counter() - started:.1f} с)"
+        )
+
+    # Обновляем статистику планировщика после массовой загрузки
+    for table in ('users', 'receipts', 'receipt_items', 'meter_readings', 'payments', 'balance_transactions'):
+        await session.execute(text(f'ANALYZE {table}'))
+    await session.commit()
+
+    # Агрегаты /admin/analytics ведутся событиями репозиториев, которые COPY не вызывает
+    await AnalyticsRepository.rebuild(session, periods[0], add_months(periods[-1], 1))
+    print(f"Агрегаты пересчитаны ({time.perf_counter() - started:.1f} с)")
+    return totals
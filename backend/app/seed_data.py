@@ -4,68 +4,82 @@ from sqlalchemy import select
 from app.repositories.user_repo import UserRepository
 from app.models.payments import ReceiptItem, UtilityService, Payment, MeterReading, BalanceTransaction, Receipt
 from app.models.users import Users
+from app.partitions import ensure_partitions
 from datetime import datetime, timedelta
 from decimal import Decimal
 import random
 
+# Справочник услуг ЖКХ
+UTILITY_SERVICES_DATA = [
+    {'name': "Электроэнергия", 'description': "Подача электрической энергии", 'unit': "кВт·ч", 'rate': Decimal('4.5'), 'is_active': True},
+    {'name': "Водоснабжение", 'description': "Подача холодной воды", 'unit': "м³", 'rate': Decimal('35.2'), 'is_active': True},
+    {'name': "Отопление", 'description': "Обогрев помещений", 'unit': "Гкал", 'rate': Decimal('1800.0'), 'is_active': True},
+    {'name': "Газоснабжение", 'description': "Подача природного газа", 'unit': "м³", 'rate': Decimal('6.8'), 'is_active': True},
+    {'name': "Вывоз ТБО", 'description': "Вывоз твердых бытовых отходов", 'unit': "мес", 'rate': Decimal('150.0'), 'is_active': True},
+    {'name': "Капитальный ремонт", 'description': "Взнос на капитальный ремонт", 'unit': "м²", 'rate': Decimal('8.5'), 'is_active': True},
+]
+
+# Шаблоны потребления для разных пользователей
+CONSUMPTION_PATTERNS = {
+    'user1@example.com': {
+        'Электроэнергия': 250,  # кВт·ч
+        'Водоснабжение': 12.5,  # м³
+        'Отопление': 0.8,       # Гкал
+        'Газоснабжение': 25,    # м³
+        'Вывоз ТБО': 1,         # мес
+        'Капитальный ремонт': 45 # м²
+    },
+    'user2@example.com': {
+        'Электроэнергия': 180,
+        'Водоснабжение': 8.2,
+        'Отопление': 0.6,
+        'Газоснабжение': 18,
+        'Вывоз ТБО': 1,
+        'Капитальный ремонт': 35
+    },
+    'user3@example.com': {
+        'Электроэнергия': 320,
+        'Водоснабжение': 15.8,
+        'Отопление': 1.1,
+        'Газоснабжение': 32,
+        'Вывоз ТБО': 1,
+        'Капитальный ремонт': 55
+    },
+    'user4@example.com': {
+        'Электроэнергия': 210,
+        'Водоснабжение': 10.3,
+        'Отопление': 0.7,
+        'Газоснабжение': 22,
+        'Вывоз ТБО': 1,
+        'Капитальный ремонт': 40
+    }
+}
+
+def vary_quantity(base_quantity, rng: random.Random = random) -> Decimal:
+    """Потребление по шаблону с небольшой случайной вариацией"""
+    base_quantity = Decimal(str(base_quantity))
+    variation = Decimal(str(rng.uniform(-0.1, 0.1)))  # ±10% вариация
+    quantity = max(base_quantity * (Decimal('1') + variation), Decimal('0.1'))
+    return round(quantity, 2)
+
 async def seed_database(session: AsyncSession):
     """Заполнение базы данных начальными данными"""
     
-    # Проверяем, есть ли уже данные
-    result = await session.execute(select(Users))
-    users = result.scalars().all()
+    # Проверяем, есть ли уже данные (достаточно одной строки)
+    result = await session.execute(select(Users.id).limit(1))
     
-    if users:
+    if result.first() is not None:
         print("База данных уже содержит данные, пропускаем заполнение")
         return
     
     print("Заполняем базу данных начальными данными...")
     
+    # Секции под исторические данные (2024 год)
+    await ensure_partitions(session, datetime(2024, 1, 1), datetime(2025, 1, 1))
+    await session.commit()
+    
     # Создаем услуги ЖКХ
-    utility_services = [
-        UtilityService(
-            name="Электроэнергия",
-            description="Подача электрической энергии",
-            unit="кВт·ч",
-            rate=Decimal('4.5'),
-            is_active=True
-        ),
-        UtilityService(
-            name="Водоснабжение",
-            description="Подача холодной воды",
-            unit="м³",
-            rate=Decimal('35.2'),
-            is_active=True
-        ),
-        UtilityService(
-            name="Отопление",
-            description="Обогрев помещений",
-            unit="Гкал",
-            rate=Decimal('1800.0'),
-            is_active=True
-        ),
-        UtilityService(
-            name="Газоснабжение",
-            description="Подача природного газа",
-            unit="м³",
-            rate=Decimal('6.8'),
-            is_active=True
-        ),
-        UtilityService(
-            name="Вывоз ТБО",
-            description="Вывоз твердых бытовых отходов",
-            unit="мес",
-            rate=Decimal('150.0'),
-            is_active=True
-        ),
-        UtilityService(
-            name="Капитальный ремонт",
-            description="Взнос на капитальный ремонт",
-            unit="м²",
-            rate=Decimal('8.5'),
-            is_active=True
-        )
-    ]
+    utility_services = [UtilityService(**service_data) for service_data in UTILITY_SERVICES_DATA]
     
     for service in utility_services:
         session.add(service)
@@ -188,41 +202,7 @@ async def seed_database(session: AsyncSession):
         (datetime(2024, 4, 1), "Апрель 2024")
     ]
     
-    # Шаблоны потребления для разных пользователей
-    consumption_patterns = {
-        'user1@example.com': {
-            'Электроэнергия': 250,  # кВт·ч
-            'Водоснабжение': 12.5,  # м³
-            'Отопление': 0.8,       # Гкал
-            'Газоснабжение': 25,    # м³
-            'Вывоз ТБО': 1,         # мес
-            'Капитальный ремонт': 45 # м²
-        },
-        'user2@example.com': {
-            'Электроэнергия': 180,
-            'Водоснабжение': 8.2,
-            'Отопление': 0.6,
-            'Газоснабжение': 18,
-            'Вывоз ТБО': 1,
-            'Капитальный ремонт': 35
-        },
-        'user3@example.com': {
-            'Электроэнергия': 320,
-            'Водоснабжение': 15.8,
-            'Отопление': 1.1,
-            'Газоснабжение': 32,
-            'Вывоз ТБО': 1,
-            'Капитальный ремонт': 55
-        },
-        'user4@example.com': {
-            'Электроэнергия': 210,
-            'Водоснабжение': 10.3,
-            'Отопление': 0.7,
-            'Газоснабжение': 22,
-            'Вывоз ТБО': 1,
-            'Капитальный ремонт': 40
-        }
-    }
+    consumption_patterns = CONSUMPTION_PATTERNS
     
     receipt_count = 0
     for user in regular_users:
@@ -236,10 +216,7 @@ async def seed_database(session: AsyncSession):
             for service in utility_services:
                 if service.name in user_pattern:
                     # Добавляем небольшую случайную вариацию к потреблению
-                    base_quantity = Decimal(str(user_pattern[service.name]))
-                    variation = Decimal(str(random.uniform(-0.1, 0.1)))  # ±10% вариация
-                    quantity = max(base_quantity * (Decimal('1') + variation), Decimal('0.1'))
-                    quantity = round(quantity, 2)
+                    quantity = vary_quantity(user_pattern[service.name])
                     
                     rate = service.rate
                     amount = quantity * rate
@@ -271,6 +248,7 @@ async def seed_database(session: AsyncSession):
             for item_data in receipt_items:
                 receipt_item = ReceiptItem(
                     receipt_id=receipt.id,
+                    period=receipt.period,
                     service_id=item_data['service_id'],
                     quantity=item_data['quantity'],
                     rate=item_data['rate'],
@@ -287,11 +265,16 @@ async def seed_database(session: AsyncSession):
     # Создаем несколько транзакций баланса для истории
     print("Создаем историю транзакций баланса...")
     
-    for user in regular_users:
+    # Журнал в сумме дает установленный баланс: пополнения минус оплаты
+    for user in created_users:
+        is_regular = user.role == 'user'
+        extra_amount = Decimal('500.0') if is_regular and user.balance > Decimal('500.0') else Decimal('0.0')
+        payment_amount = Decimal('1200.0') if is_regular and user.balance > Decimal('1000.0') else Decimal('0.0')
+
         # Пополнения баланса
         deposit_transaction = BalanceTransaction(
             user_id=user.id,
-            amount=user.balance,  # Исходный баланс как пополнение
+            amount=user.balance - extra_amount + payment_amount,
             transaction_type='deposit',
             description='Начальное пополнение баланса',
             status='completed',
@@ -300,21 +283,22 @@ async def seed_database(session: AsyncSession):
         session.add(deposit_transaction)
         
         # Небольшое дополнительное пополнение
-        extra_deposit = BalanceTransaction(
-            user_id=user.id,
-            amount=Decimal('500.0'),
-            transaction_type='deposit',
-            description='Дополнительное пополнение',
-            status='completed',
-            transaction_date=datetime(2024, 1, 15)
-        )
-        session.add(extra_deposit)
+        if extra_amount:
+            extra_deposit = BalanceTransaction(
+                user_id=user.id,
+                amount=extra_amount,
+                transaction_type='deposit',
+                description='Дополнительное пополнение',
+                status='completed',
+                transaction_date=datetime(2024, 1, 15)
+            )
+            session.add(extra_deposit)
         
         # Оплата за январь (если баланс позволяет)
-        if user.balance > Decimal('1000.0'):
+        if payment_amount:
             payment_transaction = BalanceTransaction(
                 user_id=user.id,
-                amount=Decimal('1200.0'),
+                amount=payment_amount,
                 transaction_type='payment',
                 description='Оплата коммунальных услуг за Январь 2024',
                 status='completed',
@@ -0,0 +1,32 @@
+# app/serialization.py
+"""Быстрая отдача больших списков.
+
+Строки запросов по колонкам проверяются схемой ответа один раз и сразу
+сериализуются в JSON в pydantic-core, без промежуточных моделей на
+каждую строку и повторной проверки по response_model в FastAPI.
+"""
+from functools import lru_cache
+from fastapi import Response
+from pydantic import TypeAdapter
+from typing import Any, Dict, List, Sequence
+
+@lru_cache(maxsize=None)
+def _adapter(schema_type) -> TypeAdapter:
+    return TypeAdapter(schema_type)
+
+def json_response(schema_type, data: Any) -> Response:
+    """JSON-ответ: data (строки, словари, ORM-объекты) по схеме schema_type"""
+    adapter = _adapter(schema_type)
+    body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    return Response(content=body, media_type='application/json')
+
+def with_service(rows: Sequence, services: Dict[int, Any]) -> List[dict]:
+    """Добавить к строкам услугу из справочника вместо JOIN/selectinload.
+
+    services - готовые схемы ответа (services_cache.schemas_by_id): pydantic
+    принимает их без повторной проверки на каждой строке.
+    """
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row), service=services.get(row.service_id)) for row in rows]
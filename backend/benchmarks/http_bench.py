@@ -0,0 +1,322 @@
+# benchmarks/http_bench.py
+"""Нагрузочный прогон HTTP API с замером задержек.
+
+Гоняет настоящее FastAPI-приложение: по умолчанию в процессе через ASGI,
+с --base-url - по HTTP запущенный сервер. Для каждого эндпоинта
+печатает пропускную способность и p50/p95/p99; с --output сохраняет
+результат в JSON, с --compare сравнивает с сохраненным прогоном
+(например, с прошлого коммита) и завершается с кодом 1, если p95
+вырос больше --max-regression процентов или эндпоинт стал делать больше
+SQL-запросов (заголовок X-DB-Queries).
+
+Перед прогоном в БД из DATABASE_URL создаются временные пользователь и
+администратор с историей квитанций и квитанциями для оплаты; после
+прогона они удаляются, поэтому прогоны на одной базе сравнимы.
+Списки администратора зависят от объема базы - для нагрузки ее удобно
+заполнить через manage.py generate-dataset.
+
+Запуск (httpx - в группе зависимостей dev):
+    uv run python -m benchmarks.http_bench --requests 500 --concurrency 20 --output before.json
+    uv run python -m benchmarks.http_bench --requests 500 --concurrency 20 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import httpx
+from sqlalchemy import delete, insert, select
+
+from app.database import AsyncSessionLocal, engine
+from app.models.payments import BalanceTransaction, Receipt, ReceiptItem, UtilityService
+from app.models.users import Users
+from app.models.summaries import UserSummary
+from app.models.balances import BalanceSnapshot
+from app.partitions import ensure_partitions
+from app.repositories.user_repo import UserRepository
+from app.routers.Auth import config as auth_config
+
+BENCH_PASSWORD = 'bench-password'
+HISTORY_MONTHS = 6
+PAYABLE_AMOUNT = Decimal('1.00')
+
+
+async def _create_fixture(payable_receipts: int) -> dict:
+    """Временные пользователь и администратор с квитанциями"""
+    suffix = uuid.uuid4().hex[:12]
+    async with AsyncSessionLocal() as session:
+        services = (await session.execute(
+            select(UtilityService.id, UtilityService.rate)
+            .where(UtilityService.is_active == True)
+            .order_by(UtilityService.id)
+            .limit(4)
+        )).all()
+        if not services:
+            raise SystemExit('В БД нет услуг: выполните manage.py seed')
+        # Квитанции фикстуры - за 2000-2001 годы
+        await ensure_partitions(session, datetime(2000, 1, 1), datetime(2002, 1, 1), tables=('receipts', 'receipt_items'))
+
+        password = UserRepository.hash_password(BENCH_PASSWORD)
+        accounts = {}
+        for role in ('user', 'admin'):
+            result = await session.execute(
+                insert(Users).values(
+                    email=f'bench-{role}-{suffix}@example.com',
+                    password=password,
+                    full_name='Benchmark',
+                    role=role,
+                    balance=PAYABLE_AMOUNT * payable_receipts if role == 'user' else Decimal('0.00')
+                ).returning(Users.id)
+            )
+            accounts[role] = (result.scalar_one(), f'bench-{role}-{suffix}@example.com')
+        user_id = accounts['user'][0]
+
+        # История оплаченных квитанций с элементами - для сравнения с прошлым месяцем
+        history = [
+            {
+                'user_id': user_id,
+                'total_amount': sum(rate * (10 + month) for _, rate in services),
+                'period': datetime(2000 + month // 12, month % 12 + 1, 1),
+                'status': 'paid'
+            }
+            for month in range(HISTORY_MONTHS)
+        ]
+        history_ids = (await session.execute(
+            insert(Receipt).returning(Receipt.id, sort_by_parameter_order=True), history
+        )).scalars().all()
+        await session.execute(insert(ReceiptItem), [
+            {
+                'receipt_id': receipt_id,
+                'period': history[month]['period'],
+                'service_id': service_id,
+                'quantity': Decimal(10 + month),
+                'rate': rate,
+                'amount': rate * (10 + month)
+            }
+            for month, receipt_id in enumerate(history_ids)
+            for service_id, rate in services
+        ])
+
+        payable_ids = (await session.execute(
+            insert(Receipt).returning(Receipt.id, sort_by_parameter_order=True),
+            [
+                {'user_id': user_id, 'total_amount': PAYABLE_AMOUNT, 'period': datetime(2001, 1, 1), 'status': 'generated'}
+                for _ in range(payable_receipts)
+            ]
+        )).scalars().all()
+        await session.commit()
+
+    return {
+        'user_id': user_id,
+        'user_email': accounts['user'][1],
+        'admin_id': accounts['admin'][0],
+        'admin_email': accounts['admin'][1],
+        'compare_receipt_id': history_ids[-1],
+        'payable_receipt_ids': list(payable_ids)
+    }
+
+
+async def _drop_fixture(fixture: dict) -> None:
+    user_ids = [fixture['user_id'], fixture['admin_id']]
+    async with AsyncSessionLocal() as session:
+        receipts = select(Receipt.id).where(Receipt.user_id.in_(user_ids))
+        await session.execute(delete(ReceiptItem).where(ReceiptItem.receipt_id.in_(receipts)))
+        await session.execute(delete(Receipt).where(Receipt.user_id.in_(user_ids)))
+        await session.execute(delete(BalanceTransaction).where(BalanceTransaction.user_id.in_(user_ids)))
+        await session.execute(delete(UserSummary).where(UserSummary.user_id.in_(user_ids)))
+        await session.execute(delete(BalanceSnapshot).where(BalanceSnapshot.user_id.in_(user_ids)))
+        await session.execute(delete(Users).where(Users.id.in_(user_ids)))
+        await session.commit()
+
+
+async def _login(client: httpx.AsyncClient, email: str) -> httpx.Response:
+    return await client.post('/Authorization/login-cookie', json={'email': email, 'password': BENCH_PASSWORD})
+
+
+async def _authorize(client: httpx.AsyncClient, email: str) -> None:
+    """Войти и передавать токен cookie явно (cookie приложения помечена Secure)"""
+    response = await _login(client, email)
+    response.raise_for_status()
+    client.cookies.set(auth_config.JWT_ACCESS_COOKIE_NAME, response.json()['access_token'])
+
+
+def _scenarios(fixture: dict, anonymous: httpx.AsyncClient, user: httpx.AsyncClient, admin: httpx.AsyncClient) -> dict:
+    """Имя эндпоинта -> вызов(i); i - номер запроса в прогоне"""
+    payable = fixture['payable_receipt_ids']
+    compare_id = fixture['compare_receipt_id']
+    return {
+        'POST /Authorization/login-cookie': lambda i: _login(anonymous, fixture['user_email']),
+        'GET /Authorization/me': lambda i: user.get('/Authorization/me'),
+        'GET /dashboard/summary': lambda i: user.get('/dashboard/summary'),
+        'GET /payments/my-receipts': lambda i: user.get('/payments/my-receipts'),
+        'GET /receipts/{id}/compare': lambda i: user.get(f'/receipts/{compare_id}/compare'),
+        'POST /payments/pay-receipt': lambda i: user.post('/payments/pay-receipt', json={'receipt_id': payable[i]}),
+        'GET /admin/users': lambda i: admin.get('/admin/users'),
+        'GET /admin/payments': lambda i: admin.get('/admin/payments'),
+        'GET /admin/meter-readings': lambda i: admin.get('/admin/meter-readings'),
+    }
+
+
+def _percentile(ordered: list, q: float) -> float:
+    """Перцентиль по рангу (значения отсортированы)"""
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+async def _measure(name: str, call, requests: int, concurrency: int, warmup: int) -> dict:
+    for i in range(warmup):
+        response = await call(i)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: {response.status_code} {response.text[:200]}')
+
+    latencies = []
+    errors = 0
+    queries = 0
+    indexes = iter(range(warmup, warmup + requests))
+
+    async def worker():
+        nonlocal errors, queries
+        for i in indexes:
+            started = time.perf_counter()
+            response = await call(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+            queries = max(queries, int(response.headers.get('x-db-queries', 0)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2),
+        'db_queries': queries,
+    }
+
+
+async def run(args) -> dict:
+    fixture = await _create_fixture(args.requests + args.warmup)
+    try:
+        if args.base_url:
+            clients = [
+                httpx.AsyncClient(base_url=args.base_url, limits=httpx.Limits(max_connections=args.concurrency), timeout=60)
+                for _ in range(3)
+            ]
+            results = await _run_scenarios(args, fixture, clients)
+        else:
+            from main import app, lifespan
+            async with lifespan(app):
+                transport = httpx.ASGITransport(app=app)
+                clients = [httpx.AsyncClient(transport=transport, base_url='http://testserver', timeout=60) for _ in range(3)]
+                results = await _run_scenarios(args, fixture, clients)
+    finally:
+        await _drop_fixture(fixture)
+        await engine.dispose()
+
+    return {
+        'commit': _git_commit(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'target': args.base_url or 'asgi',
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'results': results
+    }
+
+
+async def _run_scenarios(args, fixture: dict, clients: list) -> dict:
+    anonymous, user, admin = clients
+    try:
+        await _authorize(user, fixture['user_email'])
+        await _authorize(admin, fixture['admin_email'])
+        scenarios = _scenarios(fixture, anonymous, user, admin)
+        results = {}
+        for name, call in scenarios.items():
+            if args.only and not any(part in name for part in args.only):
+                continue
+            results[name] = await _measure(name, call, args.requests, args.concurrency, args.warmup)
+            print(_format_row(name, results[name]))
+        return results
+    finally:
+        for client in clients:
+            await client.aclose()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _format_row(name: str, stats: dict) -> str:
+    return (
+        f"{name:<36} {stats['rps']:>8} rps  p50 {stats['p50_ms']:>8} ms  "
+        f"p95 {stats['p95_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms  sql {stats['db_queries']:>3}  errors {stats['errors']}"
+    )
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> bool:
+    """Напечатать изменения относительно базового прогона; False при регрессии p95 или росте числа SQL-запросов"""
+    ok = True
+    print(f"\nСравнение с {baseline.get('commit', '?')} ({baseline.get('started_at', '?')}):")
+    for name, stats in report['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        deltas = {
+            key: (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        }
+        more_queries = stats.get('db_queries', 0) > before.get('db_queries', stats.get('db_queries', 0))
+        regressed = deltas['p95_ms'] > max_regression or more_queries
+        ok = ok and not regressed
+        print(
+            f"{name:<36} p50 {deltas['p50_ms']:+7.1f}%  p95 {deltas['p95_ms']:+7.1f}%  "
+            f"p99 {deltas['p99_ms']:+7.1f}%  sql {before.get('db_queries', '?')} -> {stats.get('db_queries', '?')}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Задержки и пропускная способность HTTP API')
+    parser.add_argument('--base-url', help='адрес запущенного сервера; без него приложение запускается в процессе')
+    parser.add_argument('--requests', type=int, default=200, help='запросов на эндпоинт')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=10, help='запросов прогрева на эндпоинт (не учитываются)')
+    parser.add_argument('--only', nargs='*', help='только эндпоинты, имя которых содержит подстроку')
+    parser.add_argument('--output', help='сохранить результат в JSON')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--max-regression', type=float, default=20.0, help='допустимый рост p95, %%')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    ok = True
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            ok = compare(report, json.load(file), args.max_regression)
+    print('OK' if ok else 'FAILED')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
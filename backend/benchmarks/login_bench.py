@@ -0,0 +1,100 @@
+# benchmarks/login_bench.py
+"""Пропускная способность входа и отзывчивость event loop при bcrypt.
+
+Сравнивает проверку пароля прямо в корутине (inline) и в пуле потоков
+(pool, как в UserRepository.verify_user_credentials). Запрос к БД
+имитируется задержкой --db-ms, параллельно работает "пульс" - корутина,
+которая просыпается каждые 10 мс; его опоздание показывает, насколько
+вход задерживает остальные запросы воркера. БД не нужна.
+
+    uv run python -m benchmarks.login_bench --logins 64 --concurrency 16
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=8 uv run python -m benchmarks.login_bench
+
+Вход через настоящий HTTP-стек с БД меряет http_bench:
+    uv run python -m benchmarks.http_bench --only login
+"""
+import argparse
+import asyncio
+import math
+import time
+
+from app.repositories.user_repo import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, UserRepository
+
+PASSWORD = 'bench-password'
+HEARTBEAT_INTERVAL = 0.01
+
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+async def _heartbeat(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(time.perf_counter() - started - HEARTBEAT_INTERVAL)
+
+
+async def run_mode(mode: str, stored: str, logins: int, concurrency: int, db_seconds: float) -> dict:
+    async def login() -> bool:
+        await asyncio.sleep(db_seconds)
+        if mode == 'inline':
+            return UserRepository.verify_password(PASSWORD, stored)
+        return await UserRepository.verify_password_async(PASSWORD, stored)
+
+    latencies = []
+    remaining = iter(range(logins))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            if not await login():
+                raise RuntimeError('Пароль не прошел проверку')
+            latencies.append(time.perf_counter() - started)
+
+    lags = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+
+    latencies.sort()
+    lags.sort()
+    return {
+        'logins_per_second': round(logins / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+        'loop_lag_p95_ms': round(_percentile(lags, 95) * 1000, 1) if lags else None,
+        'loop_lag_max_ms': round(lags[-1] * 1000, 1) if lags else None,
+    }
+
+
+async def run(args) -> None:
+    stored = await UserRepository.hash_password_async(PASSWORD)
+    print(
+        f'bcrypt rounds={BCRYPT_ROUNDS}, hash workers={PASSWORD_HASH_WORKERS}, '
+        f'logins={args.logins}, concurrency={args.concurrency}, db={args.db_ms} ms'
+    )
+    for mode in args.modes:
+        stats = await run_mode(mode, stored, args.logins, args.concurrency, args.db_ms / 1000)
+        print(
+            f"{mode:<7} {stats['logins_per_second']:>7} logins/s  p50 {stats['p50_ms']:>8} ms  "
+            f"p95 {stats['p95_ms']:>8} ms  loop lag p95 {stats['loop_lag_p95_ms']} ms, "
+            f"max {stats['loop_lag_max_ms']} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Нагрузочная проверка входа с bcrypt')
+    parser.add_argument('--logins', type=int, default=32)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--db-ms', type=float, default=2.0, help='имитация запроса пользователя к БД')
+    parser.add_argument('--modes', nargs='+', choices=['inline', 'pool'], default=['inline', 'pool'])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/serialization_bench.py
+"""Время сериализации больших списков: ORM + response_model против json_response.
+
+Старый путь: ORM-объекты с загруженной услугой -> model_validate на каждую
+строку -> повторная проверка и сериализация FastAPI по response_model ->
+json.dumps. Новый путь: строки запроса по колонкам + готовая схема
+услуги из кэша -> одна проверка TypeAdapter и dump_json
+(app/serialization.py). Строки
+берутся из SQLite в памяти, чтобы у обоих путей были настоящие Row и
+Decimal; БД приложения не нужна.
+
+    uv run python -m benchmarks.serialization_bench --rows 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import DateTime, Integer, Numeric, String, create_engine, text
+
+from app.models.payments import Payment, UtilityService
+import app.models.users  # noqa: F401 - регистрация связей моделей
+from app.schemas.payments import PaymentResponseSchema, UtilityServiceResponseSchema
+from app.serialization import json_response, with_service
+
+
+def _service():
+    return UtilityService(id=1, name='Электроэнергия', description='Тариф', unit='кВт·ч', rate=Decimal('5.50'), is_active=True)
+
+
+def _orm_payments(count: int) -> list:
+    service = _service()
+    period = datetime(2024, 1, 1)
+    return [
+        Payment(
+            id=i, user_id=7, service_id=1, amount=Decimal('1234.56'), status='completed',
+            period=period - timedelta(days=30 * (i % 24)), payment_date=period, transaction_id=f'txn_{i}',
+            service=service
+        )
+        for i in range(count)
+    ]
+
+
+def _row_payments(count: int) -> list:
+    engine = create_engine('sqlite://')
+    query = text("""
+        WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < :last)
+        SELECT n AS id, 7 AS user_id, 1 AS service_id, 1234.56 AS amount, 'completed' AS status,
+               datetime('2024-01-01', '-' || (30 * (n % 24)) || ' days') AS period,
+               '2024-01-01 00:00:00' AS payment_date, 'txn_' || n AS transaction_id
+        FROM seq
+    """).columns(
+        id=Integer, user_id=Integer, service_id=Integer, amount=Numeric(10, 2), status=String,
+        period=DateTime, payment_date=DateTime, transaction_id=String
+    )
+    with engine.connect() as connection:
+        return connection.execute(query, {'last': count - 1}).all()
+
+
+async def _old_path(payments: list, field) -> bytes:
+    content = [PaymentResponseSchema.model_validate(payment) for payment in payments]
+    serialized = await serialize_response(field=field, response_content=content)
+    return json.dumps(serialized, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _new_path(rows: list, services: dict) -> bytes:
+    return json_response(List[PaymentResponseSchema], with_service(rows, services)).body
+
+
+async def _best(function, repeat: int) -> float:
+    """Лучшее время из repeat запусков (function может вернуть корутину)"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        if asyncio.iscoroutine(result):
+            await result
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Сериализация списков платежей')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    field = create_model_field(name='Response', type_=List[PaymentResponseSchema], mode='serialization')
+    orm_payments = _orm_payments(args.rows)
+    rows = _row_payments(args.rows)
+    services = {1: UtilityServiceResponseSchema.model_validate(_service())}
+
+    old_body = asyncio.run(_old_path(orm_payments, field))
+    new_body = _new_path(rows, services)
+    if json.loads(old_body) != json.loads(new_body):
+        raise SystemExit('Ответы старого и нового пути различаются')
+
+    old = asyncio.run(_best(lambda: _old_path(orm_payments, field), args.repeat))
+    new = asyncio.run(_best(lambda: _new_path(rows, services), args.repeat))
+    print(f'{args.rows} платежей: response_model {old * 1000:.2f} мс, json_response {new * 1000:.2f} мс, ускорение x{old / new:.1f}')
+
+
+if __name__ == '__main__':
+    main()
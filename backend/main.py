@@ -1,20 +1,59 @@
+import asyncio
+import logging
 import os
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from app.database import init_db
+from app.database import engine, read_engine, warm_up_pool, AsyncSessionLocal
+from app.caches.services_cache import services_cache
+from app.repositories.idempotency_repo import purge_expired_keys_forever
+from app.caches.services_cache import SERVICES_CACHE_NOTIFY, listen_for_invalidation
+from app.query_stats import QueryStatsMiddleware
+from app.metrics import METRICS_ENABLED, CONTENT_TYPE, MetricsMiddleware, render_metrics
 
 load_dotenv()
+
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Верхняя граница прогрева при старте; схема и начальные данные - в manage.py
+STARTUP_WARMUP_TIMEOUT = float(os.getenv('STARTUP_WARMUP_TIMEOUT', '5'))
+
+async def warm_up():
+    await warm_up_pool()
+    async with AsyncSessionLocal() as session:
+        await services_cache.get_all(session)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(warm_up(), timeout=STARTUP_WARMUP_TIMEOUT)
+    except Exception as e:
+        # Прогрев - оптимизация: воркер стартует и без него
+        logger.warning("Прогрев при старте не выполнен: %r", e)
+    app.state.startup_seconds = time.perf_counter() - started
+    logger.info("Воркер запущен за %.0f мс", app.state.startup_seconds * 1000)
+    
+    background_tasks = [asyncio.create_task(purge_expired_keys_forever())]
+    if SERVICES_CACHE_NOTIFY:
+        background_tasks.append(asyncio.create_task(listen_for_invalidation()))
     yield
+    for task in background_tasks:
+        task.cancel()
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
+# Число SQL-запросов и время в БД на каждый HTTP-запрос (заголовки X-DB-*)
+app.add_middleware(QueryStatsMiddleware)
+# Гистограммы времени ответа по маршрутам для /metrics
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -28,18 +67,29 @@ app.add_middleware(
 )
 
 # Импортируем новые роутеры
-from app.routers import payments, admin, Auth, balance, receipts
+from app.routers import payments, admin, Auth, balance, receipts, dashboard
 
 routers = [
     Auth.router,
     payments.router,
     admin.router,
     balance.router,
-    receipts.router
+    receipts.router,
+    dashboard.router
 ]
 
 [app.include_router(router) for router in routers]
 
 @app.get("/")
 async def root():
-    return {"message": "API is running", "status": "success"}
+    return {
+        "message": "API is running",
+        "status": "success",
+        "startup_seconds": round(getattr(app.state, 'startup_seconds', 0.0), 3)
+    }
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Метрики воркера в формате Prometheus"""
+        return Response(render_metrics(), media_type=CONTENT_TYPE)
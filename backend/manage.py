@@ -0,0 +1,183 @@
+# manage.py
+"""Служебные команды: схема БД и данные.
+
+    uv run python manage.py migrate            # alembic upgrade head
+    uv run python manage.py create-schema      # metadata.create_all без миграций
+    uv run python manage.py seed               # начальные данные в пустую базу
+    uv run python manage.py init-db            # create-schema + seed
+    uv run python manage.py generate-dataset --users 100000 --months 12 --seed 42
+    uv run python manage.py hash-passwords     # перевести открытые пароли на bcrypt
+    uv run python manage.py rebuild-summaries  # пересчитать сводки /dashboard/summary
+    uv run python manage.py rebuild-aggregates --period-from 2024-01-01 --period-to 2024-12-01
+    uv run python manage.py maintain-partitions --ahead-months 3 --retention-months 36
+    uv run python manage.py snapshot-balances     # снимки балансов на начало текущих суток (UTC)
+    uv run python manage.py reconcile-balances    # сверить users.balance с журналом транзакций
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime
+
+from app.database import create_schema, seed, init_db, engine, AsyncSessionLocal
+from app.partitions import PARTITIONS_AHEAD_MONTHS, PARTITION_RETENTION_MONTHS
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alembic.ini')), 'head')
+
+
+async def run_async(action) -> None:
+    try:
+        await action()
+    finally:
+        await engine.dispose()
+
+
+async def generate_dataset(args: argparse.Namespace) -> None:
+    from app.seed_bulk import generate_dataset as generate
+
+    async with AsyncSessionLocal() as session:
+        totals = await generate(
+            session,
+            users=args.users,
+            months=args.months,
+            seed=args.seed,
+            end_period=args.end_period,
+            chunk_size=args.chunk_size
+        )
+    print(', '.join(f'{table}: {count}' for table, count in totals.items()))
+
+
+async def hash_passwords() -> None:
+    from app.models import payments  # Связи Users ссылаются на модели платежей
+    from app.repositories.user_repo import UserRepository
+
+    async with AsyncSessionLocal() as session:
+        hashed = await UserRepository.hash_plaintext_passwords(session)
+    print(f'Паролей переведено на bcrypt: {hashed}')
+
+
+async def rebuild_summaries(args: argparse.Namespace) -> None:
+    from app.repositories.summary_repo import SummaryRepository
+
+    async with AsyncSessionLocal() as session:
+        rebuilt = await SummaryRepository.rebuild_all(session, batch_size=args.batch_size)
+    print(f'Сводок пересчитано: {rebuilt}')
+
+
+async def rebuild_aggregates(args: argparse.Namespace) -> None:
+    from app.repositories.analytics_repo import AnalyticsRepository
+    from app.repositories.billing_repo import BillingRepository
+
+    start = BillingRepository.period_bounds(args.period_from)[0] if args.period_from else None
+    end = BillingRepository.period_bounds(args.period_to)[1] if args.period_to else None
+    async with AsyncSessionLocal() as session:
+        await AnalyticsRepository.rebuild(session, start, end)
+    print(f"Агрегаты пересчитаны: {start or 'начало'} - {end or 'конец'}")
+
+
+async def maintain_partitions(args: argparse.Namespace) -> None:
+    from app.partitions import check_id_sequences, maintain_partitions as maintain, retention_cutoff
+    from app.repositories.ledger_repo import LedgerRepository
+
+    async with AsyncSessionLocal() as session:
+        if args.retention_months > 0:
+            # Баланс по журналу после отсоединения старых транзакций считается от этих снимков
+            cutoff = retention_cutoff(args.retention_months)
+            taken = await LedgerRepository.take_all_snapshots(session, cutoff)
+            print(f'Снимков балансов на {cutoff}: {taken}')
+        changes = await maintain(session, ahead_months=args.ahead_months, retention_months=args.retention_months)
+        problems = await check_id_sequences(session)
+        await session.commit()
+    print(f"Созданы секции: {', '.join(changes['created']) or 'нет'}")
+    print(f"Отсоединены секции: {', '.join(changes['detached']) or 'нет'}")
+    for problem in problems:
+        print(f'id не уникален между секциями: {problem}')
+    if problems:
+        raise SystemExit(1)
+
+
+async def snapshot_balances(args: argparse.Namespace) -> None:
+    from app.repositories.ledger_repo import LedgerRepository
+
+    snapshot_date = args.date or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    async with AsyncSessionLocal() as session:
+        taken = await LedgerRepository.take_all_snapshots(session, snapshot_date, batch_size=args.batch_size)
+    print(f'Снимков балансов на {snapshot_date}: {taken}')
+
+
+async def reconcile_balances(args: argparse.Namespace) -> None:
+    from app.repositories.ledger_repo import LedgerRepository
+
+    async with AsyncSessionLocal() as session:
+        mismatches = await LedgerRepository.reconcile_all(session, batch_size=args.batch_size)
+    for row in mismatches:
+        print(
+            f'user {row.user_id}: balance={row.balance}, по журналу={row.ledger_balance} '
+            f'(снимок: {row.snapshot_date or "нет"})'
+        )
+    print(f'Расхождений: {len(mismatches)}')
+    if mismatches:
+        raise SystemExit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Управление базой данных')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate')
+    commands.add_parser('create-schema')
+    commands.add_parser('seed')
+    commands.add_parser('init-db')
+    commands.add_parser('hash-passwords', help='захешировать пароли, хранящиеся открытым текстом')
+
+    summaries = commands.add_parser('rebuild-summaries', help='пересчитать сводки пользователей по истории')
+    summaries.add_argument('--batch-size', type=int, default=10000)
+
+    aggregates = commands.add_parser('rebuild-aggregates', help='пересчитать агрегаты отчетов (месяцы включительно)')
+    aggregates.add_argument('--period-from', type=datetime.fromisoformat, default=None)
+    aggregates.add_argument('--period-to', type=datetime.fromisoformat, default=None)
+
+    partitions = commands.add_parser('maintain-partitions', help='создать будущие секции и отсоединить старые')
+    partitions.add_argument('--ahead-months', type=int, default=PARTITIONS_AHEAD_MONTHS)
+    partitions.add_argument('--retention-months', type=int, default=PARTITION_RETENTION_MONTHS, help='0 - не отсоединять')
+
+    snapshots = commands.add_parser('snapshot-balances', help='снимки балансов по журналу транзакций')
+    snapshots.add_argument('--date', type=datetime.fromisoformat, default=None, help='учесть транзакции раньше даты (по умолчанию - начало суток UTC)')
+    snapshots.add_argument('--batch-size', type=int, default=10000)
+
+    reconcile = commands.add_parser('reconcile-balances', help='сверить балансы с журналом (код 1 при расхождениях)')
+    reconcile.add_argument('--batch-size', type=int, default=10000)
+
+    dataset = commands.add_parser('generate-dataset', help='синтетические данные для нагрузочных тестов')
+    dataset.add_argument('--users', type=int, default=10000)
+    dataset.add_argument('--months', type=int, default=12)
+    dataset.add_argument('--seed', type=int, default=42)
+    dataset.add_argument('--end-period', type=datetime.fromisoformat, default=datetime(2024, 12, 1))
+    dataset.add_argument('--chunk-size', type=int, default=1000)
+
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrate()
+    elif args.command == 'generate-dataset':
+        asyncio.run(run_async(lambda: generate_dataset(args)))
+    elif args.command == 'rebuild-summaries':
+        asyncio.run(run_async(lambda: rebuild_summaries(args)))
+    elif args.command == 'rebuild-aggregates':
+        asyncio.run(run_async(lambda: rebuild_aggregates(args)))
+    elif args.command == 'maintain-partitions':
+        asyncio.run(run_async(lambda: maintain_partitions(args)))
+    elif args.command == 'snapshot-balances':
+        asyncio.run(run_async(lambda: snapshot_balances(args)))
+    elif args.command == 'reconcile-balances':
+        asyncio.run(run_async(lambda: reconcile_balances(args)))
+    else:
+        actions = {'create-schema': create_schema, 'seed': seed, 'init-db': init_db, 'hash-passwords': hash_passwords}
+        asyncio.run(run_async(actions[args.command]))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,13 @@ from dotenv import load_dotenv
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from app.models.users import *
+from app.models.payments import *
+from app.models.idempotency import *
+from app.models.imports import *
+from app.models.summaries import *
+from app.models.analytics import *
+from app.models.balances import *
+from app.models.billing import *
 from app.database import AbstractModel
 from alembic import context
 
@@ -0,0 +1,137 @@
+"""initial schema
+
+Revision ID: 0001_initial_schema
+Revises: 
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_initial_schema'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Базы, созданные через metadata.create_all, уже содержат эти таблицы
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('email', sa.String(length=255), nullable=False),
+            sa.Column('password', sa.String(length=255), nullable=False),
+            sa.Column('full_name', sa.String(length=255), nullable=False),
+            sa.Column('role', sa.String(length=20), nullable=False),
+            sa.Column('address', sa.String(length=500), nullable=True),
+            sa.Column('phone', sa.String(length=20), nullable=True),
+            sa.Column('balance', sa.Numeric(10, 2), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    if 'utility_services' not in existing:
+        op.create_table(
+            'utility_services',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('unit', sa.String(length=20), nullable=False),
+            sa.Column('rate', sa.Numeric(10, 2), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if 'payments' not in existing:
+        op.create_table(
+            'payments',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('service_id', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+            sa.Column('period', sa.DateTime(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('payment_date', sa.DateTime(), nullable=True),
+            sa.Column('transaction_id', sa.String(length=100), nullable=True),
+            sa.ForeignKeyConstraint(['service_id'], ['utility_services.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if 'meter_readings' not in existing:
+        op.create_table(
+            'meter_readings',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('service_id', sa.Integer(), nullable=False),
+            sa.Column('value', sa.Numeric(10, 2), nullable=False),
+            sa.Column('reading_date', sa.DateTime(), nullable=False),
+            sa.Column('period', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['service_id'], ['utility_services.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if 'receipts' not in existing:
+        op.create_table(
+            'receipts',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('total_amount', sa.Numeric(10, 2), nullable=False),
+            sa.Column('period', sa.DateTime(), nullable=False),
+            sa.Column('generated_date', sa.DateTime(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('verified_amount', sa.Numeric(10, 2), nullable=True),
+            sa.Column('verification_date', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if 'balance_transactions' not in existing:
+        op.create_table(
+            'balance_transactions',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+            sa.Column('transaction_type', sa.String(length=20), nullable=False),
+            sa.Column('description', sa.String(length=500), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('transaction_date', sa.DateTime(), nullable=False),
+            sa.Column('reference_id', sa.String(length=100), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if 'receipt_items' not in existing:
+        op.create_table(
+            'receipt_items',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('receipt_id', sa.Integer(), nullable=False),
+            sa.Column('service_id', sa.Integer(), nullable=False),
+            sa.Column('quantity', sa.Numeric(10, 2), nullable=False),
+            sa.Column('rate', sa.Numeric(10, 2), nullable=False),
+            sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+            sa.ForeignKeyConstraint(['receipt_id'], ['receipts.id']),
+            sa.ForeignKeyConstraint(['service_id'], ['utility_services.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('receipt_items')
+    op.drop_table('balance_transactions')
+    op.drop_table('receipts')
+    op.drop_table('meter_readings')
+    op.drop_table('payments')
+    op.drop_table('utility_services')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,30 @@
+"""admin keyset pagination indexes
+
+Revision ID: 0002_admin_keyset_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_admin_keyset_indexes'
+down_revision: Union[str, Sequence[str], None] = '0001_initial_schema'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_payments_period_id', 'payments', ['period', 'id'], if_not_exists=True)
+    op.create_index('ix_meter_readings_period_id', 'meter_readings', ['period', 'id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_meter_readings_period_id', table_name='meter_readings', if_exists=True)
+    op.drop_index('ix_payments_period_id', table_name='payments', if_exists=True)
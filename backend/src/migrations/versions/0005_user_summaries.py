@@ -0,0 +1,47 @@
+"""user summaries
+
+Revision ID: 0005_user_summaries
+Revises: 0004_import_jobs
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_user_summaries'
+down_revision: Union[str, Sequence[str], None] = '0004_import_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('user_summaries'):
+        return
+    op.create_table(
+        'user_summaries',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unpaid_receipts_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('unpaid_receipts_total', sa.Numeric(precision=12, scale=2), server_default='0', nullable=False),
+        sa.Column('last_payment_amount', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('last_payment_date', sa.DateTime(), nullable=True),
+        sa.Column('last_payment_description', sa.String(length=500), nullable=True),
+        sa.Column('latest_readings', postgresql.JSONB(), server_default=sa.text("'{}'"), nullable=False),
+        sa.Column('rebuilt_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ux_user_summaries_user_id', 'user_summaries', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_user_summaries_user_id', table_name='user_summaries')
+    op.drop_table('user_summaries')
@@ -0,0 +1,60 @@
+"""analytics aggregates
+
+Revision ID: 0006_analytics_aggregates
+Revises: 0005_user_summaries
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_analytics_aggregates'
+down_revision: Union[str, Sequence[str], None] = '0005_user_summaries'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('service_period_stats'):
+        op.create_table(
+            'service_period_stats',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('service_id', sa.Integer(), nullable=False),
+            sa.Column('period', sa.DateTime(), nullable=False),
+            sa.Column('shard', sa.Integer(), nullable=False),
+            sa.Column('consumption', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+            sa.Column('billed_amount', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+            sa.Column('paid_amount', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+            sa.Column('payments_count', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('payments_amount', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+            sa.ForeignKeyConstraint(['service_id'], ['utility_services.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ux_service_period_stats_key', 'service_period_stats', ['period', 'service_id', 'shard'], unique=True)
+    if not inspector.has_table('period_debt_stats'):
+        op.create_table(
+            'period_debt_stats',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('period', sa.DateTime(), nullable=False),
+            sa.Column('shard', sa.Integer(), nullable=False),
+            sa.Column('receipts_count', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('billed_total', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+            sa.Column('unpaid_count', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('unpaid_total', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ux_period_debt_stats_key', 'period_debt_stats', ['period', 'shard'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_period_debt_stats_key', table_name='period_debt_stats')
+    op.drop_table('period_debt_stats')
+    op.drop_index('ux_service_period_stats_key', table_name='service_period_stats')
+    op.drop_table('service_period_stats')
@@ -0,0 +1,144 @@
+"""time partitions
+
+Revision ID: 0007_time_partitions
+Revises: 0006_analytics_aggregates
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_time_partitions'
+down_revision: Union[str, Sequence[str], None] = '0006_analytics_aggregates'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Внешние ключи таблиц, кроме receipt_items -> receipts
+FOREIGN_KEYS = {
+    'receipts': [('user_id', 'users')],
+    'receipt_items': [('service_id', 'utility_services')],
+    'meter_readings': [('user_id', 'users'), ('service_id', 'utility_services')],
+    'balance_transactions': [('user_id', 'users')],
+}
+
+# Снимок app/partitions.py на момент миграции: таблица -> (ключ секционирования, шаг, есть ли секция DEFAULT)
+PARTITIONED_TABLES = {
+    'receipts': ('period', 'year', False),
+    'receipt_items': ('period', 'year', False),
+    'meter_readings': ('period', 'month', True),
+    'balance_transactions': ('transaction_date', 'month', True),
+}
+PARTITIONS_AHEAD_MONTHS = 3
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def partition_start(step: str, value: datetime) -> datetime:
+    start = value.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    return start.replace(month=1) if step == 'year' else start
+
+
+def next_start(step: str, start: datetime) -> datetime:
+    return add_months(start, 12 if step == 'year' else 1)
+
+
+def partition_name(table: str, step: str, start: datetime) -> str:
+    return f'{table}_y{start:%Y}' if step == 'year' else f'{table}_p{start:%Y_%m}'
+
+
+def _literal(value: datetime) -> str:
+    return f"'{value:%Y-%m-%d %H:%M:%S}'"
+
+
+def _replace_table(table: str, suffix: str, partition_by: Union[str, None], primary_key: str) -> None:
+    """Переименовать таблицу и создать на ее месте пустую с тем же набором колонок"""
+    old = f'{table}_{suffix}'
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+    partitioning = f' PARTITION BY RANGE ({partition_by})' if partition_by else ''
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS){partitioning}')
+    op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})')
+    # Последовательность id переходит к новой таблице и не удаляется вместе со старой
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+
+def _copy_and_drop(table: str, suffix: str) -> None:
+    old = f'{table}_{suffix}'
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old}')
+    for column, referred in FOREIGN_KEYS[table]:
+        op.create_foreign_key(f'{table}_{column}_fkey', table, referred, [column], ['id'])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    already = bind.execute(sa.text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid
+            WHERE c.relname = 'receipts' AND pg_table_is_visible(c.oid)
+        )
+    """)).scalar()
+    if already:
+        return
+
+    # receipt_items получает копию периода квитанции: ключ секций и часть внешнего ключа
+    op.add_column('receipt_items', sa.Column('period', sa.DateTime(), nullable=True))
+    op.execute('UPDATE receipt_items i SET period = r.period FROM receipts r WHERE r.id = i.receipt_id')
+    op.alter_column('receipt_items', 'period', nullable=False)
+    op.drop_constraint('receipt_items_receipt_id_fkey', 'receipt_items', type_='foreignkey')
+    # Ключ секций входит в первичный ключ и не может быть NULL
+    op.execute('UPDATE balance_transactions SET transaction_date = now() WHERE transaction_date IS NULL')
+
+    this_month = partition_start('month', datetime.utcnow())
+    for table, (key, step, has_default) in PARTITIONED_TABLES.items():
+        low, high = bind.execute(sa.text(f'SELECT min({key}), max({key}) FROM {table}')).one()
+        _replace_table(table, 'unpartitioned', key, f'id, {key}')
+
+        # Секции на все имеющиеся данные и PARTITIONS_AHEAD_MONTHS месяцев вперед
+        current = partition_start(step, min(low or this_month, this_month))
+        end = add_months(this_month, PARTITIONS_AHEAD_MONTHS + 1)
+        if high is not None:
+            end = max(end, next_start(step, partition_start(step, high)))
+        while current < end:
+            following = next_start(step, current)
+            op.execute(
+                f'CREATE TABLE {partition_name(table, step, current)} PARTITION OF {table} '
+                f'FOR VALUES FROM ({_literal(current)}) TO ({_literal(following)})'
+            )
+            current = following
+        if has_default:
+            op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+        _copy_and_drop(table, 'unpartitioned')
+        op.execute(f'ANALYZE {table}')
+
+    op.create_foreign_key(
+        'receipt_items_receipt_id_period_fkey', 'receipt_items', 'receipts',
+        ['receipt_id', 'period'], ['id', 'period']
+    )
+    op.create_index('ix_meter_readings_period_id', 'meter_readings', ['period', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Отсоединенные архивные секции остаются отдельными таблицами.
+    """
+    op.drop_constraint('receipt_items_receipt_id_period_fkey', 'receipt_items', type_='foreignkey')
+    op.drop_index('ix_meter_readings_period_id', table_name='meter_readings')
+    for table in PARTITIONED_TABLES:
+        _replace_table(table, 'partitioned', None, 'id')
+        _copy_and_drop(table, 'partitioned')
+
+    op.drop_column('receipt_items', 'period')
+    op.create_foreign_key('receipt_items_receipt_id_fkey', 'receipt_items', 'receipts', ['receipt_id'], ['id'])
+    op.create_index('ix_meter_readings_period_id', 'meter_readings', ['period', 'id'])
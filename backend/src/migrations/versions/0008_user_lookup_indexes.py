@@ -0,0 +1,38 @@
+"""user lookup indexes
+
+Revision ID: 0008_user_lookup_indexes
+Revises: 0007_time_partitions
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008_user_lookup_indexes'
+down_revision: Union[str, Sequence[str], None] = '0007_time_partitions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Индексы секционированных таблиц создаются на родителе и наследуются секциями
+INDEXES = [
+    ('ix_payments_user_id_period', 'payments', ['user_id', 'period']),
+    ('ix_meter_readings_user_id_period', 'meter_readings', ['user_id', 'period']),
+    ('ix_receipts_user_id_period', 'receipts', ['user_id', 'period']),
+    ('ix_receipt_items_receipt_id_period', 'receipt_items', ['receipt_id', 'period']),
+    ('ix_balance_transactions_user_id_date', 'balance_transactions', ['user_id', 'transaction_date']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,41 @@
+"""balance snapshots
+
+Revision ID: 0009_balance_snapshots
+Revises: 0008_user_lookup_indexes
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_balance_snapshots'
+down_revision: Union[str, Sequence[str], None] = '0008_user_lookup_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('balance_snapshots'):
+        return
+    op.create_table(
+        'balance_snapshots',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('snapshot_date', sa.DateTime(), nullable=False),
+        sa.Column('balance', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ux_balance_snapshots_user_id_date', 'balance_snapshots', ['user_id', 'snapshot_date'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_balance_snapshots_user_id_date', table_name='balance_snapshots')
+    op.drop_table('balance_snapshots')
@@ -0,0 +1,45 @@
+"""receipt generation jobs
+
+Revision ID: 0010_receipt_generation_jobs
+Revises: 0009_balance_snapshots
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010_receipt_generation_jobs'
+down_revision: Union[str, Sequence[str], None] = '0009_balance_snapshots'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('receipt_generation_jobs'):
+        return
+    op.create_table(
+        'receipt_generation_jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('period', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=False),
+        sa.Column('receipts_generated', sa.Integer(), nullable=False),
+        sa.Column('items_generated', sa.Integer(), nullable=False),
+        sa.Column('receipts_skipped', sa.Integer(), nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('receipt_generation_jobs')
@@ -0,0 +1,32 @@
+"""idempotency request hash
+
+Revision ID: 0011_idempotency_request_hash
+Revises: 0010_receipt_generation_jobs
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011_idempotency_request_hash'
+down_revision: Union[str, Sequence[str], None] = '0010_receipt_generation_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('idempotency_keys')}
+    if 'request_hash' in columns:
+        return
+    # Сохраненные ранее ключи остаются без хэша и сверяются только по ключу
+    op.add_column('idempotency_keys', sa.Column('request_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('idempotency_keys', 'request_hash')
@@ -0,0 +1,140 @@
+# tests/conftest.py
+"""Общие фикстуры тестов.
+
+Тесты работают с настоящей PostgreSQL из DATABASE_URL (лучше отдельной
+тестовой БД): схема создается через create_schema, каждый тест заводит
+своих пользователей и удаляет их вместе с их данными. Модули, которым
+нужна БД, пропускаются, если DATABASE_URL не задан в окружении.
+Приложение импортируется внутри фикстур: app.database создает движок
+при импорте.
+"""
+import uuid
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+async def database():
+    """Схема БД на время сессии тестов; в конце закрываются пулы соединений"""
+    from app.database import create_schema, engine, read_engine
+
+    await create_schema()
+    yield engine
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await engine.dispose()
+
+
+@pytest.fixture
+async def make_user(database):
+    """Фабрика временных пользователей.
+
+    Начальный баланс проводится депозитом в balance_transactions, чтобы
+    баланс сходился с журналом. После теста пользователи удаляются со
+    всеми платежами, показаниями, квитанциями, транзакциями и задачами.
+    """
+    from sqlalchemy import delete, insert, select
+    from app.database import AsyncSessionLocal
+    from app.models.users import Users
+    from app.models.payments import BalanceTransaction, MeterReading, Payment, Receipt, ReceiptItem
+    from app.models.balances import BalanceSnapshot
+    from app.models.summaries import UserSummary
+    from app.models.idempotency import IdempotencyKey
+    from app.models.imports import ImportJob
+    from app.models.billing import ReceiptGenerationJob
+
+    created = []
+
+    async def create(balance: Decimal = Decimal('0.00'), role: str = 'user') -> int:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                insert(Users).values(
+                    email=f'test-{uuid.uuid4().hex}@example.com',
+                    password='test',
+                    full_name='Test User',
+                    role=role,
+                    balance=balance
+                ).returning(Users.id)
+            )
+            user_id = result.scalar_one()
+            if balance:
+                await session.execute(
+                    insert(BalanceTransaction).values(
+                        user_id=user_id,
+                        amount=balance,
+                        transaction_type='deposit',
+                        description='Начальный баланс',
+                        status='completed'
+                    )
+                )
+            await session.commit()
+        created.append(user_id)
+        return user_id
+
+    yield create
+
+    if not created:
+        return
+    async with AsyncSessionLocal() as session:
+        receipts = select(Receipt.id).where(Receipt.user_id.in_(created))
+        await session.execute(delete(ReceiptItem).where(ReceiptItem.receipt_id.in_(receipts)))
+        for model in (Payment, MeterReading, Receipt, BalanceTransaction, BalanceSnapshot, UserSummary, IdempotencyKey):
+            await session.execute(delete(model).where(model.user_id.in_(created)))
+        for model in (ImportJob, ReceiptGenerationJob):
+            await session.execute(delete(model).where(model.created_by.in_(created)))
+        await session.execute(delete(Users).where(Users.id.in_(created)))
+        await session.commit()
+
+
+@pytest.fixture
+async def service(database):
+    """Временная активная услуга: тесты не зависят от справочника из manage.py seed.
+
+    После теста удаляется вместе с платежами, показаниями, элементами
+    квитанций и агрегатами по ней; кэш справочника сбрасывается.
+    """
+    from sqlalchemy import delete, insert
+    from app.database import AsyncSessionLocal
+    from app.models.analytics import ServicePeriodStats
+    from app.models.payments import MeterReading, Payment, ReceiptItem, UtilityService
+    from app.caches.services_cache import services_cache
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            insert(UtilityService).values(
+                name=f'test-{uuid.uuid4().hex[:8]}',
+                description='Тестовая услуга',
+                unit='ед.',
+                rate=Decimal('10.00'),
+                is_active=True
+            ).returning(UtilityService.id, UtilityService.name, UtilityService.rate)
+        )
+        created = result.one()
+        await session.commit()
+    services_cache.invalidate()
+
+    yield created
+
+    async with AsyncSessionLocal() as session:
+        for model in (ReceiptItem, Payment, MeterReading, ServicePeriodStats):
+            await session.execute(delete(model).where(model.service_id == created.id))
+        await session.execute(delete(UtilityService).where(UtilityService.id == created.id))
+        await session.commit()
+    services_cache.invalidate()
+
+
+@pytest.fixture
+async def client(database):
+    """HTTP-клиент приложения без сервера; login(user_id, role) выставляет cookie с токеном"""
+    from httpx import ASGITransport, AsyncClient
+    from main import app
+    from app.routers.Auth import config, security
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as http_client:
+        def login(user_id: int, role: str = 'user') -> None:
+            token = security.create_access_token(uid=str(user_id), data={'role': role})
+            http_client.cookies.set(config.JWT_ACCESS_COOKIE_NAME, token)
+
+        http_client.login = login
+        yield http_client
@@ -0,0 +1,54 @@
+# tests/test_balance_concurrency.py
+"""Параллельные списания с баланса: баланс не уходит в минус и сходится с журналом"""
+import asyncio
+import os
+from decimal import Decimal
+
+import pytest
+
+if not os.getenv('DATABASE_URL'):
+    pytest.skip('DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import case, func, select
+
+from app.database import AsyncSessionLocal
+from app.models.payments import BalanceTransaction
+from app.models.users import Users
+from app.repositories.balance_repo import BalanceRepository
+
+START_BALANCE = Decimal('1000.00')
+AMOUNT = Decimal('30.00')
+WORKERS = 100
+
+
+async def _withdraw(user_id: int, reference: str) -> bool:
+    async with AsyncSessionLocal() as session:
+        try:
+            await BalanceRepository.withdraw_balance(
+                session, user_id, AMOUNT, description='Тест', reference_id=reference
+            )
+            return True
+        except ValueError:
+            return False
+
+
+async def test_parallel_withdrawals(make_user):
+    user_id = await make_user(balance=START_BALANCE)
+
+    outcomes = await asyncio.gather(*[_withdraw(user_id, f'test_withdraw_{i}') for i in range(WORKERS)])
+
+    signed = case(
+        (BalanceTransaction.transaction_type == 'payment', -BalanceTransaction.amount),
+        else_=BalanceTransaction.amount
+    )
+    async with AsyncSessionLocal() as session:
+        balance = (await session.execute(select(Users.balance).where(Users.id == user_id))).scalar_one()
+        ledger = (await session.execute(
+            select(func.coalesce(func.sum(signed), 0))
+            .where(BalanceTransaction.user_id == user_id, BalanceTransaction.status == 'completed')
+        )).scalar_one()
+
+    assert balance >= 0
+    assert balance == ledger
+    assert sum(outcomes) == START_BALANCE // AMOUNT
+    assert balance == START_BALANCE - AMOUNT * sum(outcomes)
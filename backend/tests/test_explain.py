@@ -0,0 +1,127 @@
+# tests/test_explain.py
+"""Планы запросов репозиториев: нет Seq Scan по большим таблицам.
+
+Каждый метод вызывается для пользователя с самой свежей квитанцией, его
+SQL перехватывается и для каждого запроса выполняется EXPLAIN (FORMAT
+JSON) с теми же параметрами. Seq Scan по таблице (секции), в которой по
+статистике больше EXPLAIN_MIN_ROWS строк (по умолчанию 10000), - ошибка.
+Изменения, сделанные методами, откатываются. Осмысленно на БД с данными
+(manage.py generate-dataset); без квитанций тесты пропускаются.
+"""
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+if not os.getenv('DATABASE_URL'):
+    pytest.skip('DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import event, select, text
+
+from app.database import AsyncSessionLocal
+from app.models.payments import Receipt
+from app.repositories.balance_repo import BalanceRepository
+from app.repositories.payment_repo import MeterReadingRepository, PaymentRepository
+from app.repositories.payment_repo import ReceiptRepository as PaymentReceiptRepository
+from app.repositories.receipt_repo import ReceiptRepository
+
+MIN_ROWS = int(os.getenv('EXPLAIN_MIN_ROWS', '10000'))
+CHECKED_TABLES = ('users', 'payments', 'meter_readings', 'receipts', 'receipt_items', 'balance_transactions')
+
+# (название, вызов метода репозитория с (session, user_id, receipt_id, period))
+SCENARIOS = [
+    ('PaymentRepository.get_user_payments', lambda s, u, r, p: PaymentRepository.get_user_payments(s, u)),
+    ('PaymentRepository.get_payments_page', lambda s, u, r, p: PaymentRepository.get_payments_page(s, (p, r), 50)),
+    ('PaymentRepository.complete_payment', lambda s, u, r, p: PaymentRepository.complete_payment(s, 0, u)),
+    ('MeterReadingRepository.get_user_readings', lambda s, u, r, p: MeterReadingRepository.get_user_readings(s, u)),
+    ('MeterReadingRepository.get_readings_page', lambda s, u, r, p: MeterReadingRepository.get_readings_page(s, (p, 0), 50)),
+    ('payment_repo.ReceiptRepository.get_user_receipts', lambda s, u, r, p: PaymentReceiptRepository.get_user_receipts(s, u)),
+    (
+        'payment_repo.ReceiptRepository.mark_receipt_paid',
+        lambda s, u, r, p: PaymentReceiptRepository.mark_receipt_paid(s, 0, u)
+    ),
+    (
+        'payment_repo.ReceiptRepository.mark_matching_receipt_paid',
+        lambda s, u, r, p: PaymentReceiptRepository.mark_matching_receipt_paid(s, u, p, Decimal('-1000'))
+    ),
+    ('ReceiptRepository.get_receipt_with_details', lambda s, u, r, p: ReceiptRepository.get_receipt_with_details(s, r)),
+    (
+        'ReceiptRepository.get_user_receipts_with_details',
+        lambda s, u, r, p: ReceiptRepository.get_user_receipts_with_details(s, u)
+    ),
+    ('ReceiptRepository.get_receipt_trend', lambda s, u, r, p: ReceiptRepository.get_receipt_trend(s, u, r, p, 6)),
+    ('BalanceRepository.get_user_balance', lambda s, u, r, p: BalanceRepository.get_user_balance(s, u)),
+    ('BalanceRepository.get_user_transactions', lambda s, u, r, p: BalanceRepository.get_user_transactions(s, u)),
+]
+
+
+def _seq_scans(node: dict):
+    """Таблицы, которые план читает последовательным сканированием"""
+    if node.get('Node Type') == 'Seq Scan':
+        yield node['Relation Name']
+    for child in node.get('Plans', []):
+        yield from _seq_scans(child)
+
+
+@pytest.fixture(scope='module')
+async def sample(database):
+    """(user_id, receipt_id, period) самой свежей квитанции и размеры таблиц по статистике"""
+    async with database.begin() as conn:
+        await conn.execute(text(f"ANALYZE {', '.join(CHECKED_TABLES)}"))
+    async with AsyncSessionLocal() as session:
+        receipt = (await session.execute(
+            select(Receipt.user_id, Receipt.id, Receipt.period).order_by(Receipt.period.desc()).limit(1)
+        )).one_or_none()
+        sizes = dict((await session.execute(
+            text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")
+        )).all())
+    if receipt is None:
+        pytest.skip('В БД нет квитанций: выполните manage.py generate-dataset')
+    return tuple(receipt), sizes
+
+
+@pytest.fixture
+def captured_sql(database):
+    """Запросы, выполненные движком, пока captured_sql.enabled"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if capture.enabled and not executemany:
+            captured.append((statement, parameters))
+    capture.enabled = False
+    capture.statements = captured
+    event.listen(database.sync_engine, 'before_cursor_execute', capture)
+    yield capture
+    event.remove(database.sync_engine, 'before_cursor_execute', capture)
+
+
+@pytest.mark.parametrize('call', [call for _, call in SCENARIOS], ids=[name for name, _ in SCENARIOS])
+async def test_repository_query_avoids_seq_scan_on_large_tables(call, sample, captured_sql):
+    receipt, sizes = sample
+    async with AsyncSessionLocal() as session:
+        captured_sql.enabled = True
+        try:
+            await call(session, *receipt)
+        finally:
+            captured_sql.enabled = False
+
+        connection = await session.connection()
+        failures = []
+        for statement, parameters in captured_sql.statements:
+            plan = (await connection.exec_driver_sql(
+                f'EXPLAIN (FORMAT JSON) {statement}', tuple(parameters)
+            )).scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = [
+                f'{table} (~{int(sizes.get(table, 0))} строк)'
+                for table in _seq_scans(plan[0]['Plan'])
+                if sizes.get(table, 0) > MIN_ROWS
+            ]
+            if scans:
+                failures.append(f"Seq Scan {', '.join(scans)}: {' '.join(statement.split())[:200]}")
+        await session.rollback()
+
+    assert captured_sql.statements, 'метод не выполнил ни одного запроса'
+    assert not failures, '\n'.join(failures)
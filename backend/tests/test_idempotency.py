@@ -0,0 +1,48 @@
+# tests/test_idempotency.py
+"""Повторы запросов с заголовком Idempotency-Key"""
+import os
+import uuid
+from decimal import Decimal
+
+import pytest
+
+if not os.getenv('DATABASE_URL'):
+    pytest.skip('DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models.users import Users
+
+
+async def _balance(user_id: int) -> Decimal:
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(select(Users.balance).where(Users.id == user_id))).scalar_one()
+
+
+async def test_repeated_deposit_is_replayed(client, make_user):
+    user_id = await make_user()
+    client.login(user_id)
+    headers = {'Idempotency-Key': uuid.uuid4().hex}
+
+    first = await client.post('/balance/deposit', json={'amount': 100}, headers=headers)
+    second = await client.post('/balance/deposit', json={'amount': 100}, headers=headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.headers.get('Idempotent-Replayed') == 'true'
+    assert second.json() == first.json()
+    assert await _balance(user_id) == Decimal('100.00')
+
+
+async def test_key_reused_with_other_payload_is_rejected(client, make_user):
+    user_id = await make_user()
+    client.login(user_id)
+    headers = {'Idempotency-Key': uuid.uuid4().hex}
+
+    first = await client.post('/balance/deposit', json={'amount': 100}, headers=headers)
+    second = await client.post('/balance/deposit', json={'amount': 500}, headers=headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 422
+    assert await _balance(user_id) == Decimal('100.00')
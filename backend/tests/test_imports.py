@@ -0,0 +1,102 @@
+# tests/test_imports.py
+"""Фоновая загрузка CSV показаний"""
+import os
+
+import pytest
+
+if not os.getenv('DATABASE_URL'):
+    pytest.skip('DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import func, select
+
+from app.database import AsyncSessionLocal
+from app.models.payments import MeterReading
+from app.models.users import Users
+from app.repositories.import_repo import ImportRepository
+
+
+async def _chunks(body: bytes):
+    yield body[:20]
+    yield body[20:]
+
+
+async def _prepare(make_user, service):
+    admin_id = await make_user(role='admin')
+    user_id = await make_user()
+    async with AsyncSessionLocal() as session:
+        email = (await session.execute(select(Users.email).where(Users.id == user_id))).scalar_one()
+    return admin_id, user_id, email, service.name
+
+
+async def _readings_count(user_id: int) -> int:
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(
+            select(func.count(MeterReading.id)).where(MeterReading.user_id == user_id)
+        )).scalar_one()
+
+
+async def _upload(client, body: str) -> dict:
+    response = await client.post(
+        '/admin/imports/meter-readings', content=body.encode('utf-8'), headers={'Content-Type': 'text/csv'}
+    )
+    assert response.status_code == 202
+    # Фоновая задача выполняется до возврата ответа транспортом ASGI
+    job = await client.get(f"/admin/imports/{response.json()['id']}")
+    return job.json()
+
+
+async def test_import_is_not_duplicated_on_retry(client, make_user, service):
+    admin_id, user_id, email, service_name = await _prepare(make_user, service)
+    client.login(admin_id, role='admin')
+    body = (
+        'account,service,value,period,reading_date\n'
+        f'{email},{service_name},10.5,2024-11-01,2024-11-25T10:00:00\n'
+        f'{email},{service_name},12.5,2024-12-01,2024-12-25T10:00:00\n'
+        f'unknown@example.com,{service_name},1,2024-12-01,\n'
+    )
+
+    first = await _upload(client, body)
+    second = await _upload(client, body)
+
+    assert first['status'] == 'completed'
+    assert (first['rows_processed'], first['rows_imported'], first['rows_rejected']) == (3, 2, 1)
+    assert second['status'] == 'completed'
+    assert second['rows_imported'] == 0
+    assert await _readings_count(user_id) == 2
+
+
+async def test_import_without_reading_date_is_not_duplicated_on_retry(client, make_user, service):
+    admin_id, user_id, email, service_name = await _prepare(make_user, service)
+    client.login(admin_id, role='admin')
+    body = (
+        'account,service,value,period\n'
+        f'{email},{service_name},10.5,2024-11-01\n'
+    )
+
+    first = await _upload(client, body)
+    second = await _upload(client, body)
+
+    assert (first['status'], first['rows_imported']) == ('completed', 1)
+    assert (second['status'], second['rows_imported']) == ('completed', 0)
+    assert await _readings_count(user_id) == 1
+
+
+async def test_failed_import_leaves_no_rows(make_user, service):
+    admin_id, user_id, email, service_name = await _prepare(make_user, service)
+    # Значение не помещается в numeric(10, 2): вторая пачка падает после первой
+    body = (
+        'account,service,value,period,reading_date\n'
+        f'{email},{service_name},10.5,2024-11-01,2024-11-25T10:00:00\n'
+        f'{email},{service_name},1000000000000,2024-12-01,2024-12-25T10:00:00\n'
+    )
+    async with AsyncSessionLocal() as session:
+        job = await ImportRepository.create_job(session, 'meter_readings', admin_id)
+    path = await ImportRepository.save_upload(_chunks(body.encode('utf-8')))
+
+    await ImportRepository.import_meter_readings(job.id, path, chunk_size=1)
+
+    async with AsyncSessionLocal() as session:
+        job = await ImportRepository.get_job(session, job.id)
+    assert job.status == 'failed'
+    assert job.rows_processed == 1
+    assert await _readings_count(user_id) == 0
@@ -0,0 +1,92 @@
+# tests/test_partitions.py
+"""Отсоединение старых секций и баланс по журналу"""
+import asyncio
+import os
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+if not os.getenv('DATABASE_URL'):
+    pytest.skip('DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import delete, insert, text
+
+from app.database import AsyncSessionLocal
+from app.models.balances import BalanceSnapshot
+from app.models.payments import BalanceTransaction, Receipt
+from app.partitions import check_id_sequences, detach_partitions, ensure_partitions, list_partitions
+from app.repositories.ledger_repo import LedgerRepository
+from app.repositories.payment_repo import ReceiptRepository
+
+OLD_MONTH = datetime(2001, 1, 1)
+CUTOFF = datetime(2001, 2, 1)
+PARTITION = 'balance_transactions_p2001_01'
+
+
+async def test_balance_partition_detached_only_after_snapshot(make_user):
+    user_id = await make_user()
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(BalanceTransaction).values(
+            user_id=user_id, amount=Decimal('250.00'), transaction_type='deposit',
+            status='completed', transaction_date=datetime(2001, 1, 15)
+        ))
+        await session.execute(text('UPDATE users SET balance = 250 WHERE id = :id'), {'id': user_id})
+        await ensure_partitions(session, OLD_MONTH, CUTOFF, tables=('balance_transactions',))
+        await session.commit()
+
+    try:
+        async with AsyncSessionLocal() as session:
+            # Без снимка секция нужна для баланса по журналу
+            assert PARTITION not in await detach_partitions(session, CUTOFF)
+            await session.rollback()
+
+            await LedgerRepository.take_snapshots(session, CUTOFF, user_id, user_id + 1)
+            assert PARTITION in await detach_partitions(session, CUTOFF)
+            assert await LedgerRepository.reconcile(session, user_id, user_id + 1) == []
+            # Секция остается на месте: DDL откатывается вместе с транзакцией
+            await session.rollback()
+    finally:
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(BalanceTransaction).where(BalanceTransaction.user_id == user_id))
+            await session.execute(delete(BalanceSnapshot).where(BalanceSnapshot.user_id == user_id))
+            await session.execute(text(f'DROP TABLE IF EXISTS {PARTITION}'))
+            await session.commit()
+
+
+async def test_receipt_insert_creates_missing_year_partition(make_user):
+    user_id = await make_user()
+
+    async def generate(month: int) -> Receipt:
+        async with AsyncSessionLocal() as session:
+            return await ReceiptRepository.generate_receipt(session, {
+                'user_id': user_id,
+                'total_amount': 100.0,
+                'period': datetime(2003, month, 1),
+                'generated_date': datetime(2003, month, 3),
+                'status': 'generated'
+            })
+
+    try:
+        # Параллельные вставки в год без секции создают ее один раз
+        receipts = await asyncio.gather(generate(5), generate(6))
+        assert {receipt.period.month for receipt in receipts} == {5, 6}
+    finally:
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Receipt).where(Receipt.user_id == user_id))
+            await session.execute(text('DROP TABLE IF EXISTS receipt_items_y2003'))
+            # На секции receipts ссылается внешний ключ: удалить можно только отсоединенную
+            if 'receipts_y2003' in await list_partitions(session, 'receipts'):
+                await session.execute(text('ALTER TABLE receipts DETACH PARTITION receipts_y2003'))
+            await session.execute(text('DROP TABLE IF EXISTS receipts_y2003'))
+            await session.commit()
+
+
+async def test_partitioned_ids_come_from_shared_sequence(database):
+    # Поиски квитанции по одному id рассчитывают на уникальность id между секциями
+    async with AsyncSessionLocal() as session:
+        assert await check_id_sequences(session) == []
+        duplicates = await session.execute(
+            text('SELECT id FROM receipts GROUP BY id HAVING count(*) > 1 LIMIT 1')
+        )
+        assert duplicates.first() is None
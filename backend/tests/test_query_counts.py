@@ -0,0 +1,119 @@
+# tests/test_query_counts.py
+"""Число SQL-запросов на основных маршрутах.
+
+Пороги зафиксированы по текущим реализациям: рост числа запросов
+(например, N+1 по элементам квитанций) роняет тест.
+"""
+import os
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+if not os.getenv('DATABASE_URL'):
+    pytest.skip('DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import delete, insert
+
+from app.database import AsyncSessionLocal
+from app.models.payments import Payment, Receipt, ReceiptItem
+from app.partitions import add_months, ensure_partitions
+from app.query_stats import assert_max_queries
+from app.caches.services_cache import services_cache
+from app.repositories.billing_repo import BillingRepository
+
+
+async def _create_receipts(user_id: int, service, months: int = 3) -> list:
+    """Квитанции за последние months месяцев с элементом по услуге service"""
+    this_month, _ = BillingRepository.period_bounds(datetime.utcnow())
+    receipt_ids = []
+    async with AsyncSessionLocal() as session:
+        await ensure_partitions(session, add_months(this_month, -months), this_month, tables=('receipts', 'receipt_items'))
+        for offset in range(months, 0, -1):
+            period = add_months(this_month, -offset)
+            receipt_id = (await session.execute(
+                insert(Receipt).values(
+                    user_id=user_id,
+                    total_amount=Decimal('100.00'),
+                    period=period,
+                    generated_date=period,
+                    status='generated'
+                ).returning(Receipt.id)
+            )).scalar_one()
+            await session.execute(insert(ReceiptItem).values(
+                receipt_id=receipt_id,
+                period=period,
+                service_id=service.id,
+                quantity=Decimal(10 + offset),
+                rate=service.rate,
+                amount=Decimal('100.00')
+            ))
+            receipt_ids.append(receipt_id)
+        await session.commit()
+    return receipt_ids
+
+
+@pytest.fixture
+async def user_with_receipts(client, make_user, service):
+    user_id = await make_user(balance=Decimal('10000.00'))
+    receipt_ids = await _create_receipts(user_id, service)
+    client.login(user_id)
+    async with AsyncSessionLocal() as session:
+        # Справочник услуг в кэше: его загрузка не входит в число запросов маршрута
+        await services_cache.get_all(session)
+    return user_id, receipt_ids
+
+
+async def test_process_payment(client, user_with_receipts, service):
+    user_id, _ = user_with_receipts
+    async with AsyncSessionLocal() as session:
+        payment_id = (await session.execute(
+            insert(Payment).values(
+                user_id=user_id, service_id=service.id, amount=Decimal('100.00'),
+                period=datetime.utcnow(), status='pending'
+            ).returning(Payment.id)
+        )).scalar_one()
+        await session.commit()
+
+    with assert_max_queries(6):
+        response = await client.post('/payments/process-payment', json={
+            'payment_id': payment_id, 'card_number': '4111111111111111', 'expiry_date': '12/30', 'cvv': '123'
+        })
+    assert response.status_code == 200
+
+
+async def test_compare_receipts(client, user_with_receipts):
+    _, receipt_ids = user_with_receipts
+    with assert_max_queries(2):
+        response = await client.get(f'/receipts/{receipt_ids[-1]}/compare')
+    assert response.status_code == 200
+    assert response.json()['previous_receipt']['id'] == receipt_ids[-2]
+
+
+async def test_compare_receipts_with_empty_previous(client, user_with_receipts):
+    _, receipt_ids = user_with_receipts
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(ReceiptItem).where(ReceiptItem.receipt_id == receipt_ids[-2]))
+        await session.commit()
+    with assert_max_queries(2):
+        response = await client.get(f'/receipts/{receipt_ids[-1]}/compare')
+    assert response.status_code == 200
+    previous = response.json()['previous_receipt']
+    assert previous['id'] == receipt_ids[-2]
+    assert previous['receipt_items'] == []
+
+
+async def test_dashboard_summary(client, user_with_receipts):
+    # Первый запрос пересчитывает сводку, дальше она читается одним запросом
+    await client.get('/dashboard/summary')
+    with assert_max_queries(1):
+        response = await client.get('/dashboard/summary')
+    assert response.status_code == 200
+
+
+async def test_my_receipts_detailed(client, user_with_receipts):
+    _, receipt_ids = user_with_receipts
+    with assert_max_queries(2):
+        response = await client.get('/receipts/user/my-receipts-detailed')
+    assert response.status_code == 200
+    assert len(response.json()) == len(receipt_ids)
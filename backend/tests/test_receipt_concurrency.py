@@ -0,0 +1,88 @@
+# tests/test_receipt_concurrency.py
+"""Параллельная оплата одной квитанции: сводки и агрегаты меняются один раз"""
+import asyncio
+import os
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+if not os.getenv('DATABASE_URL'):
+    pytest.skip('DATABASE_URL не задан', allow_module_level=True)
+
+from sqlalchemy import delete, func, insert, select, text
+
+from app.database import AsyncSessionLocal
+from app.models.analytics import PeriodDebtStats
+from app.models.payments import Receipt
+from app.partitions import add_months, ensure_partitions
+from app.repositories.analytics_repo import AnalyticsRepository
+from app.repositories.billing_repo import BillingRepository
+from app.repositories.payment_repo import ReceiptRepository
+
+AMOUNT = Decimal('150.00')
+
+
+async def _wait_for_lock(session, timeout: float = 5.0) -> None:
+    """Дождаться, пока другое соединение встанет в ожидание блокировки"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        waiting = await session.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_stat_activity
+                WHERE datname = current_database() AND wait_event_type = 'Lock' AND query LIKE 'UPDATE receipts%'
+            )
+        """))
+        if waiting.scalar():
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError('запрос не встал в ожидание блокировки квитанции')
+
+
+async def _unpaid_count(period: datetime) -> int:
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(
+            select(func.coalesce(func.sum(PeriodDebtStats.unpaid_count), 0)).where(PeriodDebtStats.period == period)
+        )).scalar_one()
+
+
+async def test_matching_payment_skips_receipt_paid_concurrently(make_user):
+    user_id = await make_user()
+    period = add_months(BillingRepository.period_bounds(datetime.utcnow())[0], -1)
+    async with AsyncSessionLocal() as session:
+        await ensure_partitions(session, period, add_months(period, 1), tables=('receipts', 'receipt_items'))
+        receipt_id = (await session.execute(
+            insert(Receipt).values(
+                user_id=user_id, total_amount=AMOUNT, period=period, generated_date=period, status='generated'
+            ).returning(Receipt.id)
+        )).scalar_one()
+        # Квитанция учитывается в агрегатах, как при генерации
+        await AnalyticsRepository.add_receipts(session, 1, Receipt.id == receipt_id, Receipt.period == period)
+        await session.commit()
+    unpaid_before = await _unpaid_count(period)
+
+    async def match() -> int:
+        async with AsyncSessionLocal() as session:
+            matched = await ReceiptRepository.mark_matching_receipt_paid(session, user_id, period, AMOUNT)
+            await session.commit()
+            return matched
+
+    try:
+        async with AsyncSessionLocal() as paying, AsyncSessionLocal() as observer:
+            paid = await ReceiptRepository.mark_receipt_paid(paying, receipt_id, user_id)
+            matching = asyncio.create_task(match())
+            await _wait_for_lock(observer)
+            await paying.commit()
+            matched = await matching
+
+        assert paid is not None and paid.id == receipt_id
+        assert matched is None
+        # Оплата вычтена из задолженности один раз
+        assert await _unpaid_count(period) == unpaid_before - 1
+    finally:
+        # Агрегаты месяца пересчитываются без тестовой квитанции
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Receipt).where(Receipt.id == receipt_id, Receipt.period == period))
+            await session.commit()
+            await AnalyticsRepository.rebuild(session, period, add_months(period, 1))
@@ -0,0 +1,76 @@
+# tests/test_user_cache.py
+"""Сброс кэша профилей после изменений баланса"""
+import os
+from decimal import Decimal
+
+import pytest
+
+if not os.getenv('DATABASE_URL'):
+    pytest.skip('DATABASE_URL не задан', allow_module_level=True)
+
+from app.database import AsyncSessionLocal
+from app.caches.user_cache import UserProfileCache, user_cache
+from app.repositories.balance_repo import BalanceRepository
+
+
+async def test_other_users_invalidation_does_not_block_store(make_user):
+    cache = UserProfileCache(ttl=60)
+    user_id = await make_user()
+    other_id = await make_user()
+
+    async with AsyncSessionLocal() as session:
+        original_execute = session.execute
+
+        async def execute_with_concurrent_write(*args, **kwargs):
+            # Пока профиль читается, меняется баланс другого пользователя
+            cache.invalidate(other_id)
+            return await original_execute(*args, **kwargs)
+
+        session.execute = execute_with_concurrent_write
+        await cache.get_profile(session, user_id)
+
+    assert user_id in cache._entries
+
+
+async def test_invalidation_during_load_skips_store(make_user):
+    cache = UserProfileCache(ttl=60)
+    user_id = await make_user()
+
+    async with AsyncSessionLocal() as session:
+        original_execute = session.execute
+
+        async def execute_with_concurrent_write(*args, **kwargs):
+            cache.invalidate(user_id)
+            return await original_execute(*args, **kwargs)
+
+        session.execute = execute_with_concurrent_write
+        await cache.get_profile(session, user_id)
+
+    assert user_id not in cache._entries
+
+
+async def test_balance_change_outside_routers_resets_profile(client, make_user):
+    user_id = await make_user(balance=Decimal('100.00'))
+    client.login(user_id)
+    assert (await client.get('/Authorization/me')).json()['balance'] == 100.0
+
+    # Списание без коммита в репозитории: профиль сбрасывается при коммите вызывающего
+    async with AsyncSessionLocal() as session:
+        await BalanceRepository.withdraw_balance(session, user_id, 40, commit=False)
+        assert user_id in user_cache._entries
+        await session.commit()
+
+    assert (await client.get('/Authorization/me')).json()['balance'] == 60.0
+
+
+async def test_rolled_back_change_keeps_profile(client, make_user):
+    user_id = await make_user(balance=Decimal('100.00'))
+    client.login(user_id)
+    await client.get('/Authorization/me')
+
+    async with AsyncSessionLocal() as session:
+        await BalanceRepository.deposit_balance(session, user_id, 50, commit=False)
+        await session.rollback()
+
+    assert user_id in user_cache._entries
+    assert (await client.get('/Authorization/me')).json()['balance'] == 100.0
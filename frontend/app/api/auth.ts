@@ -31,12 +31,38 @@ export interface User {
   balance: number;
 }
 
+export interface CursorPage<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
 export interface BalanceInfo {
   user_id: number;
   balance: number;
   currency: string;
 }
 
+export interface DashboardSummary {
+  user_id: number;
+  balance: number;
+  currency: string;
+  unpaid_receipts_count: number;
+  unpaid_receipts_total: number;
+  last_payment: {
+    amount: number;
+    payment_date: string;
+    description: string | null;
+  } | null;
+  latest_readings: {
+    service_id: number;
+    value: number;
+    period: string;
+    reading_date: string;
+    service: UtilityService | null;
+  }[];
+  updated_at: string | null;
+}
+
 export interface BalanceDepositData {
   amount: number;
   description?: string;
@@ -87,6 +113,22 @@ export interface ReceiptComparison {
   consumption_changes: { [serviceName: string]: ConsumptionChange };
 }
 
+export interface ReceiptTrendPoint {
+  receipt_id: number;
+  period: string;
+  quantity: number;
+  amount: number;
+  quantity_change: number | null;
+  amount_change: number | null;
+  change_percentage: number | null;
+}
+
+export interface ReceiptTrend {
+  receipt_id: number;
+  periods: string[];
+  services: { [serviceName: string]: ReceiptTrendPoint[] };
+}
+
 export interface UtilityService {
   id: number;
   name: string;
@@ -281,6 +323,13 @@ class ApiClient {
     });
   }
 
+  async submitMeterReadings(readings: MeterReadingCreateData[]): Promise<any> {
+    return this.request('/payments/submit-readings', {
+      method: 'POST',
+      body: JSON.stringify({ readings }),
+    });
+  }
+
   async getMyPayments(): Promise<Payment[]> {
     return this.request('/payments/my-payments', {
       method: 'GET',
@@ -314,20 +363,23 @@ class ApiClient {
   }
 
   // Админ методы
-  async getAllUsers(): Promise<User[]> {
-    return this.request('/admin/users', {
+  async getAllUsers(cursor?: string): Promise<CursorPage<User>> {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    return this.request(`/admin/users${query}`, {
       method: 'GET',
     });
   }
 
-  async getAllPayments(): Promise<Payment[]> {
-    return this.request('/admin/payments', {
+  async getAllPayments(cursor?: string): Promise<CursorPage<Payment>> {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    return this.request(`/admin/payments${query}`, {
       method: 'GET',
     });
   }
 
-  async getAllMeterReadings(): Promise<MeterReading[]> {
-    return this.request('/admin/meter-readings', {
+  async getAllMeterReadings(cursor?: string): Promise<CursorPage<MeterReading>> {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    return this.request(`/admin/meter-readings${query}`, {
       method: 'GET',
     });
   }
@@ -376,6 +428,13 @@ class ApiClient {
     });
   }
 
+  // Сводка для главной страницы одним запросом
+  async getDashboardSummary(): Promise<DashboardSummary> {
+    return this.request('/dashboard/summary', {
+      method: 'GET',
+    });
+  }
+
   async depositBalance(depositData: BalanceDepositData): Promise<any> {
     return this.request('/balance/deposit', {
       method: 'POST',
@@ -424,6 +483,13 @@ class ApiClient {
     });
   }
 
+  // Динамика потребления за несколько квитанций одним запросом
+  async getReceiptTrend(receiptId: number, periods: number = 6): Promise<ReceiptTrend> {
+    return this.request(`/receipts/${receiptId}/trend?periods=${periods}`, {
+      method: 'GET',
+    });
+  }
+
   // Все квитанции с деталями
   async getMyReceiptsDetailed(): Promise<ReceiptDetail[]> {
     return this.request('/receipts/user/my-receipts-detailed', {
@@ -10,7 +10,12 @@ export default function AdminPanel() {
   const [services, setServices] = useState<UtilityService[]>([]);
   const [payments, setPayments] = useState<Payment[]>([]);
   const [readings, setReadings] = useState<MeterReading[]>([]);
+  // Курсоры следующих страниц списков (null - страниц больше нет)
+  const [usersCursor, setUsersCursor] = useState<string | null>(null);
+  const [paymentsCursor, setPaymentsCursor] = useState<string | null>(null);
+  const [readingsCursor, setReadingsCursor] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   // Состояния для формы добавления/редактирования услуги
@@ -35,15 +40,18 @@ export default function AdminPanel() {
     }
   }, [activeTab]);
 
-  const fetchUsers = async () => {
+  // Первая страница заменяет список, следующие (с курсором) дописываются в конец
+  const fetchUsers = async (cursor?: string) => {
+    const setLoading = cursor ? setIsLoadingMore : setIsLoading;
     try {
-      setIsLoading(true);
-      const data = await apiClient.getAllUsers();
-      setUsers(data);
+      setLoading(true);
+      const data = await apiClient.getAllUsers(cursor);
+      setUsers(prev => cursor ? [...prev, ...data.items] : data.items);
+      setUsersCursor(data.next_cursor);
     } catch (err: any) {
       setError(err.message);
     } finally {
-      setIsLoading(false);
+      setLoading(false);
     }
   };
 
@@ -61,30 +69,48 @@ export default function AdminPanel() {
     }
   };
 
-  const fetchPayments = async () => {
+  const fetchPayments = async (cursor?: string) => {
+    const setLoading = cursor ? setIsLoadingMore : setIsLoading;
     try {
-      setIsLoading(true);
-      const data = await apiClient.getAllPayments();
-      setPayments(data);
+      setLoading(true);
+      const data = await apiClient.getAllPayments(cursor);
+      setPayments(prev => cursor ? [...prev, ...data.items] : data.items);
+      setPaymentsCursor(data.next_cursor);
     } catch (err: any) {
       setError(err.message);
     } finally {
-      setIsLoading(false);
+      setLoading(false);
     }
   };
 
-  const fetchReadings = async () => {
+  const fetchReadings = async (cursor?: string) => {
+    const setLoading = cursor ? setIsLoadingMore : setIsLoading;
     try {
-      setIsLoading(true);
-      const data = await apiClient.getAllMeterReadings();
-      setReadings(data);
+      setLoading(true);
+      const data = await apiClient.getAllMeterReadings(cursor);
+      setReadings(prev => cursor ? [...prev, ...data.items] : data.items);
+      setReadingsCursor(data.next_cursor);
     } catch (err: any) {
       setError(err.message);
     } finally {
-      setIsLoading(false);
+      setLoading(false);
     }
   };
 
+  const renderLoadMore = (cursor: string | null, loadMore: (cursor: string) => void) => (
+    cursor ? (
+      <div className="mt-4 text-center">
+        <button
+          onClick={() => loadMore(cursor)}
+          disabled={isLoadingMore}
+          className="bg-blue-500 text-white px-4 py-2 rounded-lg hover:bg-blue-600 disabled:bg-gray-300"
+        >
+          {isLoadingMore ? 'Загрузка...' : 'Загрузить еще'}
+        </button>
+      </div>
+    ) : null
+  );
+
   // Функции для работы с услугами
   const handleAddService = () => {
     setEditingService(null);
@@ -243,6 +269,7 @@ export default function AdminPanel() {
                     </tbody>
                   </table>
                 </div>
+                {renderLoadMore(usersCursor, fetchUsers)}
               </div>
             )}
 
@@ -433,6 +460,7 @@ export default function AdminPanel() {
                     </tbody>
                   </table>
                 </div>
+                {renderLoadMore(paymentsCursor, fetchPayments)}
               </div>
             )}
 
@@ -474,6 +502,7 @@ export default function AdminPanel() {
                     </tbody>
                   </table>
                 </div>
+                {renderLoadMore(readingsCursor, fetchReadings)}
               </div>
             )}
           </>